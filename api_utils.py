@@ -0,0 +1,216 @@
+# api_utils.py - Pagination par curseur, sélection de champs, gzip et ETag pour l'API
+import json
+import gzip
+import zlib
+import base64
+import hashlib
+from bisect import bisect_left
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import Response, request, jsonify, make_response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MIN_GZIP_SIZE = 1024
+
+
+class ApiQueryError(ValueError):
+    """Paramètre de requête invalide (réponse 400)"""
+
+
+def encode_cursor(payload: Dict) -> str:
+    """Encode un curseur opaque (base64 url-safe)"""
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """Décode un curseur produit par encode_cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ApiQueryError(f"Curseur invalide: {cursor}")
+    if not isinstance(payload, dict):
+        raise ApiQueryError(f"Curseur invalide: {cursor}")
+    return payload
+
+
+def parse_limit(value: Optional[str]) -> int:
+    """Taille de page demandée, bornée à MAX_PAGE_SIZE"""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiQueryError(f"limit invalide: {value}")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Liste de champs ?fields=a,b,c (None = tous les champs)"""
+    if not value:
+        return None
+    return [field.strip() for field in value.split(',') if field.strip()]
+
+
+def parse_since(value: Optional[str]) -> Optional[str]:
+    """
+    Horodatage ISO ?since=..., normalisé pour comparaison lexicographique
+
+    Les horodatages stockés sont en heure locale naïve (datetime.now().isoformat()):
+    une valeur avec fuseau est convertie en heure locale avant de retirer tzinfo.
+    """
+    if not value:
+        return None
+    try:
+        since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ApiQueryError(f"since invalide: {value}")
+    if since.tzinfo is not None:
+        since = since.astimezone()
+    return since.replace(tzinfo=None).isoformat()
+
+
+def select_fields(item: Dict, fields: Optional[List[str]]) -> Dict:
+    """Ne garde que les champs demandés"""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def paginate_by_key(items: Iterable[Dict], key_fields: List[str], cursor: Optional[Dict], limit: int):
+    """
+    Pagination par clé (keyset): stable même si des éléments sont retirés entre deux pages
+
+    Args:
+        items: Éléments à paginer
+        key_fields: Champs formant la clé de tri
+        cursor: Dernière clé renvoyée ({'k': [...]}) ou None
+        limit: Taille de page
+    Returns:
+        tuple: (page, next_cursor)
+    """
+    def sort_key(item):
+        return tuple(str(item.get(field, '')) for field in key_fields)
+
+    ordered = sorted(items, key=sort_key)
+    start = 0
+    if cursor is not None:
+        last_key = tuple(cursor.get('k', []))
+        start = bisect_left([sort_key(item) for item in ordered], last_key)
+        if start < len(ordered) and sort_key(ordered[start]) == last_key:
+            start += 1
+    page = ordered[start:start + limit]
+    next_cursor = None
+    if start + limit < len(ordered):
+        next_cursor = encode_cursor({'k': list(sort_key(page[-1]))})
+    return page, next_cursor
+
+
+def first_index_since(entries: List[Dict], since: Optional[str], field: str = 'processed_at') -> int:
+    """
+    Premier index dont l'horodatage est >= since
+
+    L'historique est ajouté chronologiquement: une recherche dichotomique suffit.
+    """
+    if since is None:
+        return 0
+    lo, hi = 0, len(entries)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (entries[mid].get(field) or '') < since:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def accepts_gzip() -> bool:
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def finalize_api_response(response: Response) -> Response:
+    """Ajoute un ETag faible, gère If-None-Match et compresse en gzip si possible"""
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+    response.add_etag(weak=True)
+    response.make_conditional(request)
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or not accepts_gzip():
+        return response
+    body = response.get_data()
+    if len(body) < MIN_GZIP_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def api_endpoint(view):
+    """Décorateur des routes d'API: erreurs 400, ETag et compression gzip"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            response = view(*args, **kwargs)
+        except ApiQueryError as e:
+            return jsonify({"error": str(e)}), 400
+        if not isinstance(response, Response):
+            response = make_response(response)
+        return finalize_api_response(response)
+    return wrapper
+
+
+def ndjson_response(records: Iterator[Dict], etag_source: str, headers: Optional[Dict] = None) -> Response:
+    """
+    Réponse NDJSON en streaming, compressée à la volée si le client accepte gzip
+
+    Args:
+        records: Itérateur des objets à émettre (un par ligne)
+        etag_source: Chaîne déterminant entièrement le contenu (pour l'ETag)
+        headers: En-têtes supplémentaires
+    """
+    etag = hashlib.sha1(etag_source.encode('utf-8')).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    use_gzip = accepts_gzip()
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        buffer = []
+        size = 0
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= 64 * 1024:
+                chunk = ''.join(buffer).encode('utf-8')
+                buffer, size = [], 0
+                if compressor is None:
+                    yield chunk
+                else:
+                    compressed = compressor.compress(chunk)
+                    if compressed:
+                        yield compressed
+        chunk = ''.join(buffer).encode('utf-8')
+        if compressor is None:
+            if chunk:
+                yield chunk
+        else:
+            yield compressor.compress(chunk) + compressor.flush()
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
@@ -1,18 +1,111 @@
 # app_liked_system.py - Application Flask pour le système YouTube Liked
-from flask import Flask, request, jsonify, redirect, render_template_string
+from flask import Flask, Response, g, request, session, jsonify, redirect, send_file
 from flask_cors import CORS
-from youtube_liked_system import YouTubeLikedSystem
+from youtube_liked_system import (
+    YouTubeLikedSystem, YouTubeSystemRegistry, InvalidAccountError, AccountAccessError, DEFAULT_ACCOUNT,
+    account_from_oauth_state, validate_account_id
+)
 from pathlib import Path
+from itertools import islice
+from typing import List, Optional, Tuple
 import os
+import json
+import time
+import secrets
+import threading
 from dotenv import load_dotenv
-from obsidian_generator import ObsidianGenerator
+from obsidian_generator import ObsidianGenerator, OBSIDIAN_CATEGORIES
+from note_renderer import NoteRenderer
+from metrics import registry as metrics_registry, QUEUE_DEPTH, StageTimer, stage_summary
+from profiling import install_profiling
+from thumbnail_cache import get_thumbnail_cache
+from api_utils import (
+    api_endpoint, ndjson_response, encode_cursor, decode_cursor, parse_limit, parse_fields,
+    parse_since, select_fields, paginate_by_key, first_index_since, ApiQueryError
+)
 
 load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Initialiser le système
-youtube_system = YouTubeLikedSystem()
+# Cookie de session signé: comptes liés à ce navigateur par OAuth.
+# Clé à fixer (FLASK_SECRET_KEY) dès qu'il y a plusieurs workers ou redémarrages.
+app.secret_key = os.getenv('FLASK_SECRET_KEY') or secrets.token_hex(32)
+app.config.update(SESSION_COOKIE_HTTPONLY=True, SESSION_COOKIE_SAMESITE='Lax')
+if not os.getenv('FLASK_SECRET_KEY'):
+    print("⚠️ FLASK_SECRET_KEY absent: clé de session aléatoire (sessions perdues au redémarrage)")
+
+# Registre des systèmes par compte (cache Gemini et limiteur partagés)
+system_registry = YouTubeSystemRegistry(
+    max_instances=int(os.getenv('YOUTUBE_MAX_ACCOUNTS', '32')),
+    idle_timeout=float(os.getenv('YOUTUBE_ACCOUNT_IDLE_TIMEOUT', '1800'))
+)
+
+# En-tête Server-Timing sur toutes les réponses chronométrées (sinon via X-Debug-Timing: 1)
+STAGE_TIMING_HEADER = os.getenv('STAGE_TIMING_HEADER', '').lower() in ('1', 'true', 'yes')
+
+# Miniatures servies depuis le cache local; copie dans le coffre si OBSIDIAN_EMBED_THUMBNAILS=1
+thumbnail_cache = get_thumbnail_cache(Path(system_registry.data_root) / "thumbnails")
+EMBED_THUMBNAILS = os.getenv('OBSIDIAN_EMBED_THUMBNAILS', '').lower() in ('1', 'true', 'yes')
+
+# Page de staging: cartes chargées par pages depuis /api/staging, mises à jour via /api/staging/events
+STAGING_PAGE_SIZE = int(os.getenv('STAGING_PAGE_SIZE', '20'))
+STAGING_EVENTS_INTERVAL = float(os.getenv('STAGING_EVENTS_INTERVAL', '2'))
+# Durée d'une connexion SSE: le navigateur se reconnecte ensuite (libère le thread du worker)
+STAGING_EVENTS_MAX_AGE = float(os.getenv('STAGING_EVENTS_MAX_AGE', '300'))
+# Flux SSE servis en WSGI: chacun garde un thread, au-delà réponse 503 (asgi_app n'a pas de limite)
+STAGING_EVENTS_MAX_STREAMS = int(os.getenv('STAGING_EVENTS_MAX_STREAMS', '4'))
+STAGING_EVENTS_KEEPALIVE = 15
+staging_event_streams = threading.BoundedSemaphore(STAGING_EVENTS_MAX_STREAMS)
+
+def resolve_account(requested: Optional[str], session_data) -> str:
+    """
+    Compte d'une requête d'après la session signée
+    
+    ?account= (ou X-Account-Id) ne choisit que parmi les comptes liés à la session
+    par OAuth; le compte par défaut reste ouvert (mode mono-utilisateur).
+    """
+    if not requested:
+        return session_data.get('account') or DEFAULT_ACCOUNT
+    account = validate_account_id(requested)
+    if account != DEFAULT_ACCOUNT and account not in session_data.get('accounts', []):
+        raise AccountAccessError(f"Compte non authentifié dans cette session: {account}")
+    return account
+
+def current_account() -> str:
+    """Compte de la requête: paramètre ?account=, en-tête X-Account-Id ou session"""
+    if 'account' not in g:
+        g.account = resolve_account(request.args.get('account') or request.headers.get('X-Account-Id'), session)
+    return g.account
+
+def get_youtube_system() -> YouTubeLikedSystem:
+    """Retourne le système YouTube du compte courant"""
+    return system_registry.get(current_account())
+
+@app.errorhandler(InvalidAccountError)
+def handle_invalid_account(e):
+    return jsonify({"error": str(e)}), 403 if isinstance(e, AccountAccessError) else 400
+
+@app.after_request
+def report_stage_timings(response):
+    """Log JSON des étapes chronométrées de la requête, et en-tête Server-Timing si demandé"""
+    timer = g.pop('stage_timer', None)
+    if timer is not None:
+        timer.finish(response.status_code, account=g.get('account', DEFAULT_ACCOUNT))
+        if STAGE_TIMING_HEADER or request.headers.get('X-Debug-Timing'):
+            response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+@app.after_request
+def remember_account(response):
+    """Mémorise dans la session le compte choisi via ?account= (déjà vérifié)"""
+    account = g.get('account')
+    if request.args.get('account') and account and response.status_code < 400 and account != session.get('account'):
+        session['account'] = account
+    return response
+
+# Profilage à la demande (PROFILING=header|all, PROFILING_TOKEN obligatoire); sans effet s'il est désactivé
+install_profiling(app)
 
 # Template HTML simple pour la page de staging
 STAGING_TEMPLATE = '''
@@ -37,6 +130,8 @@ STAGING_TEMPLATE = '''
         .video-info { flex: 1; }
         .video-title { font-size: 18px; font-weight: bold; margin-bottom: 8px; }
         .video-meta { color: #666; font-size: 14px; margin-bottom: 15px; }
+        .prediction { color: #1565c0; font-size: 14px; margin-bottom: 10px; }
+        .duplicate-warning { background: #fff8e1; border-left: 4px solid #ffb300; padding: 8px 12px; margin-bottom: 15px; font-size: 14px; }
         .categories { display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 10px; }
         .category-option { 
             padding: 10px; 
@@ -63,6 +158,8 @@ STAGING_TEMPLATE = '''
         .btn-danger { background: #f44336; color: white; }
         .stats { background: white; padding: 15px; border-radius: 8px; margin-bottom: 20px; }
         .thumbnail { width: 120px; height: 90px; border-radius: 4px; object-fit: cover; }
+        .loading { text-align: center; color: #666; padding: 20px; }
+        [hidden] { display: none !important; }
         
         /* Notifications */
         .notification {
@@ -96,72 +193,237 @@ STAGING_TEMPLATE = '''
         <h1>🎬 YouTube Liked Videos - Staging</h1>
         
         <div class="stats">
-            <strong>📊 Stats:</strong> 
-            {{ stats.staging_videos }} vidéos en staging | 
-            {{ stats.processed_videos }} vidéos traitées | 
+            <strong>📊 Stats:</strong>
+            <span id="staging-count">{{ stats.staging_videos }}</span> vidéos en staging |
+            {{ stats.processed_videos }} vidéos traitées |
             Auth: {{ "✅" if stats.authenticated else "❌" }}
         </div>
-        
-        {% if not videos %}
-            <div class="video-card">
-                <div class="video-info">
-                    <h3>Aucune vidéo en staging</h3>
-                    <p>Utilisez <code>/sync</code> pour récupérer les nouvelles vidéos likées</p>
-                </div>
+
+        <div class="video-card" id="empty-state" hidden>
+            <div class="video-info">
+                <h3>Aucune vidéo en staging</h3>
+                <p>Utilisez <code>/sync</code> pour récupérer les nouvelles vidéos likées</p>
             </div>
-        {% endif %}
-        
-        {% for video in videos %}
-        <div class="video-card" data-video-id="{{ video.video_id }}">
-            <img src="{{ video.thumbnail }}" alt="Thumbnail" class="thumbnail">
-            
+        </div>
+
+        <div id="video-list"></div>
+        <div id="sentinel" class="loading">🔄 Chargement...</div>
+
+        <div id="bulk-actions" style="text-align: center; margin: 30px 0;" hidden>
+            <button class="btn btn-primary" data-action="accept-predictions">🤖 Accepter les suggestions (≥ 90%)</button>
+            <button class="btn btn-danger" data-action="clear-staging">🧹 Clear All Staging</button>
+        </div>
+    </div>
+
+    <!-- Carte vidéo, clonée côté client pour chaque vidéo chargée -->
+    <template id="video-card-template">
+        <div class="video-card">
+            <img alt="Thumbnail" class="thumbnail" loading="lazy">
+
             <div class="video-info">
-                <div class="video-title">{{ video.title }}</div>
-                <div class="video-meta">
-                    📺 {{ video.channel }} | 
-                    ⏱️ {{ video.duration }} | 
-                    📅 {{ video.detected_at[:10] }}
+                <div class="video-title"></div>
+                <div class="video-meta"></div>
+                <div class="prediction" hidden></div>
+                <div class="duplicate-warning" hidden>
+                    <span class="duplicate-text"></span>
+                    <button class="btn btn-secondary" data-action="reuse" hidden>♻️ Réutiliser le résultat</button>
                 </div>
-                
+
                 <div class="categories">
                     {% for cat_id, cat_info in categories.items() %}
-                    <div class="category-option" 
-                         data-category="{{ cat_id }}"
-                         onclick="selectCategory('{{ video.video_id }}', '{{ cat_id }}')">
-                        {{ cat_info.name }}
-                    </div>
+                    <div class="category-option" data-category="{{ cat_id }}">{{ cat_info.name }}</div>
                     {% endfor %}
-                    <div class="category-option" 
-                         data-category="skip"
-                         onclick="selectCategory('{{ video.video_id }}', 'skip')" 
-                         style="border-color: #f44336; color: #f44336;">
-                        ❌ Skip
-                    </div>
+                    <div class="category-option" data-category="skip" style="border-color: #f44336; color: #f44336;">❌ Skip</div>
                 </div>
-                
+
                 <div class="actions">
-                    <button class="btn btn-secondary" onclick="previewVideo('{{ video.url }}')">👁️ Preview</button>
-                    <button class="btn btn-primary" onclick="processVideo('{{ video.video_id }}')">✅ Process</button>
-                    <button class="btn btn-danger" onclick="skipVideo('{{ video.video_id }}')">⏭️ Skip</button>
+                    <button class="btn btn-secondary" data-action="preview">👁️ Preview</button>
+                    <button class="btn btn-primary" data-action="process">✅ Process</button>
+                    <button class="btn btn-danger" data-action="skip">⏭️ Skip</button>
                 </div>
             </div>
         </div>
-        {% endfor %}
-        
-        {% if videos %}
-        <div style="text-align: center; margin: 30px 0;">
-            <button class="btn btn-danger" onclick="clearStaging()">🧹 Clear All Staging</button>
-        </div>
-        {% endif %}
-    </div>
+    </template>
 
     <script>
+        const PAGE_SIZE = {{ page_size }};
+        const categories = {{ categories|tojson }};
+        const videoList = document.getElementById('video-list');
+        const sentinel = document.getElementById('sentinel');
+        const cardTemplate = document.getElementById('video-card-template');
         let selectedCategories = {};
+        let stagingCount = {{ stats.staging_videos }};
+        let nextCursor = null;
+        let allLoaded = false;
+        let loading = false;
+
+        function findCard(videoId) {
+            return [...videoList.children].find(card => card.dataset.videoId === videoId);
+        }
+
+        function renderCard(video) {
+            const card = cardTemplate.content.firstElementChild.cloneNode(true);
+            card.dataset.videoId = video.video_id;
+            card.dataset.url = video.url;
+
+            const img = card.querySelector('.thumbnail');
+            if (video.thumbnail_local) {
+                img.onerror = () => { img.onerror = null; img.src = video.thumbnail; };
+                img.src = video.thumbnail_local;
+            } else {
+                img.src = video.thumbnail;
+            }
+            card.querySelector('.video-title').textContent = video.title;
+            card.querySelector('.video-meta').textContent =
+                `📺 ${video.channel} | ⏱️ ${video.duration} | 📅 ${(video.detected_at || '').slice(0, 10)}`;
+
+            const prediction = video.predicted_category;
+            if (prediction && categories[prediction.category]) {
+                const predictionEl = card.querySelector('.prediction');
+                predictionEl.textContent =
+                    `🤖 Suggestion: ${categories[prediction.category].name} (${Math.round(prediction.confidence * 100)}%)`;
+                predictionEl.hidden = false;
+            }
+
+            if (video.duplicates && video.duplicates.length) {
+                const duplicate = video.duplicates[0];
+                const warning = card.querySelector('.duplicate-warning');
+                warning.querySelector('.duplicate-text').textContent =
+                    `♻️ Doublon probable de « ${duplicate.title} » (${Math.round(duplicate.similarity * 100)}%)`;
+                if (duplicate.processed) {
+                    const reuseBtn = warning.querySelector('[data-action="reuse"]');
+                    reuseBtn.dataset.sourceId = duplicate.video_id;
+                    reuseBtn.hidden = false;
+                }
+                warning.hidden = false;
+            }
+            return card;
+        }
+
+        function addCards(videos) {
+            videos.forEach(video => {
+                if (findCard(video.video_id)) return;
+                videoList.appendChild(renderCard(video));
+                // Pré-sélection des catégories suggérées par le modèle local
+                if (video.predicted_category && !selectedCategories[video.video_id]) {
+                    selectCategory(video.video_id, video.predicted_category.category);
+                }
+            });
+            updateView();
+        }
+
+        function setStagingCount(count) {
+            stagingCount = Math.max(0, count);
+            document.getElementById('staging-count').textContent = stagingCount;
+        }
+
+        function updateView() {
+            const empty = allLoaded && videoList.children.length === 0;
+            document.getElementById('empty-state').hidden = !empty;
+            document.getElementById('bulk-actions').hidden = videoList.children.length === 0;
+            sentinel.hidden = allLoaded;
+        }
+
+        function removeCard(videoId, countChange = -1) {
+            const videoCard = findCard(videoId);
+            if (!videoCard) return;
+            delete selectedCategories[videoId];
+            videoCard.removeAttribute('data-video-id');
+            videoCard.style.opacity = '0';
+            setTimeout(() => {
+                videoCard.remove();
+                updateView();
+                maybeLoadMore();
+            }, 300);
+            if (countChange) setStagingCount(stagingCount + countChange);
+        }
+
+        function loadPage() {
+            if (loading || allLoaded) return;
+            loading = true;
+            const params = new URLSearchParams({ limit: PAGE_SIZE });
+            if (nextCursor) params.set('cursor', nextCursor);
+
+            fetch(`/api/staging?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                nextCursor = data.next_cursor;
+                allLoaded = !nextCursor;
+                setStagingCount(data.count);
+                addCards(data.videos || []);
+            })
+            .catch(err => {
+                console.error("Erreur chargement staging:", err);
+                showNotification("❌ Impossible de charger le staging", "error");
+            })
+            .finally(() => {
+                loading = false;
+                maybeLoadMore();
+            });
+        }
+
+        // Charge la page suivante tant que la fin de liste est visible
+        function maybeLoadMore() {
+            if (loading || allLoaded) return;
+            if (sentinel.getBoundingClientRect().top < window.innerHeight + 200) loadPage();
+        }
+
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadPage();
+        }, { rootMargin: '200px' }).observe(sentinel);
+
+        // Mises à jour en direct: nouvelles vidéos synchronisées, vidéos traitées ailleurs
+        function connectStagingEvents() {
+            const events = new EventSource('/api/staging/events');
+            events.addEventListener('added', event => {
+                const data = JSON.parse(event.data);
+                setStagingCount(data.count);
+                // Tri par date de détection: les nouveautés arrivent en fin de liste
+                if (allLoaded) addCards(data.videos);
+                showNotification(`🆕 ${data.videos.length} nouvelle(s) vidéo(s) en staging`, "info");
+            });
+            events.addEventListener('removed', event => {
+                const data = JSON.parse(event.data);
+                data.video_ids.forEach(videoId => removeCard(videoId, 0));
+                setStagingCount(data.count);
+            });
+            events.addEventListener('error', () => {
+                // Refus du serveur (503: trop de flux ouverts): EventSource ne se reconnecte pas seul
+                if (events.readyState === EventSource.CLOSED) setTimeout(connectStagingEvents, 30000);
+            });
+        }
+        connectStagingEvents();
+
+        videoList.addEventListener('click', event => {
+            const card = event.target.closest('.video-card');
+            if (!card || !card.dataset.videoId) return;
+            const videoId = card.dataset.videoId;
+
+            const option = event.target.closest('.category-option');
+            if (option) {
+                selectCategory(videoId, option.dataset.category);
+                return;
+            }
+            const button = event.target.closest('[data-action]');
+            if (!button) return;
+            if (button.dataset.action === 'preview') previewVideo(card.dataset.url);
+            else if (button.dataset.action === 'process') processVideo(videoId, button);
+            else if (button.dataset.action === 'skip') skipVideo(videoId);
+            else if (button.dataset.action === 'reuse') reuseResult(videoId, button.dataset.sourceId, button);
+        });
+
+        document.getElementById('bulk-actions').addEventListener('click', event => {
+            const button = event.target.closest('[data-action]');
+            if (!button) return;
+            if (button.dataset.action === 'accept-predictions') acceptPredictions(0.9, button);
+            else if (button.dataset.action === 'clear-staging') clearStaging();
+        });
 
         function selectCategory(videoId, category) {
             selectedCategories[videoId] = category;
 
-            const videoCard = document.querySelector(`[data-video-id="${videoId}"]`);
+            const videoCard = findCard(videoId);
+            if (!videoCard) return;
             const options = videoCard.querySelectorAll('.category-option');
             options.forEach(opt => opt.classList.remove('selected'));
 
@@ -169,7 +431,7 @@ STAGING_TEMPLATE = '''
             if (selectedOption) selectedOption.classList.add('selected');
         }
 
-        function processVideo(videoId) {
+        function processVideo(videoId, processBtn) {
             const category = selectedCategories[videoId];
             if (!category) {
                 alert("⚠️ Sélectionnez une catégorie d'abord !");
@@ -177,7 +439,6 @@ STAGING_TEMPLATE = '''
             }
 
             // Désactiver le bouton pendant le traitement
-            const processBtn = event.target;
             const originalText = processBtn.textContent;
             processBtn.disabled = true;
             processBtn.textContent = "🔄 Traitement...";
@@ -191,23 +452,8 @@ STAGING_TEMPLATE = '''
             .then(data => {
                 if (data.success) {
                     // Supprimer la carte vidéo de l'affichage
-                    const videoCard = document.querySelector(`[data-video-id="${videoId}"]`);
-                    if (videoCard) {
-                        videoCard.style.transition = 'opacity 0.3s ease';
-                        videoCard.style.opacity = '0';
-                        setTimeout(() => videoCard.remove(), 300);
-                    }
-                    
-                    // Notification de succès
+                    removeCard(videoId);
                     showNotification("✅ Vidéo traitée avec succès !", "success");
-                    
-                    // Vérifier s'il reste des vidéos
-                    setTimeout(() => {
-                        const remainingCards = document.querySelectorAll('.video-card');
-                        if (remainingCards.length <= 1) {
-                            location.reload();
-                        }
-                    }, 500);
                 } else {
                     alert("❌ Erreur: " + data.error);
                     // Réactiver le bouton en cas d'erreur
@@ -224,11 +470,37 @@ STAGING_TEMPLATE = '''
             });
         }
 
+        function reuseResult(videoId, sourceId, reuseBtn) {
+            const category = selectedCategories[videoId];
+            reuseBtn.disabled = true;
+
+            fetch('/process-video', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ video_id: videoId, category: category && category !== 'skip' ? category : null, reuse_from: sourceId })
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    removeCard(videoId);
+                    showNotification("♻️ Résultat réutilisé (sans appel Gemini)", "success");
+                } else {
+                    alert("❌ Erreur: " + data.error);
+                    reuseBtn.disabled = false;
+                }
+            })
+            .catch(err => {
+                console.error("Erreur reuse:", err);
+                alert("❌ Problème lors de l'appel au serveur.");
+                reuseBtn.disabled = false;
+            });
+        }
+
         function skipVideo(videoId) {
             if (!confirm("Êtes-vous sûr de vouloir ignorer cette vidéo ?")) return;
 
             // Désactiver visuellement la carte
-            const videoCard = document.querySelector(`[data-video-id="${videoId}"]`);
+            const videoCard = findCard(videoId);
             if (videoCard) {
                 videoCard.style.opacity = '0.5';
                 videoCard.style.pointerEvents = 'none';
@@ -242,22 +514,8 @@ STAGING_TEMPLATE = '''
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    // Supprimer la carte vidéo de l'affichage
-                    if (videoCard) {
-                        videoCard.style.transition = 'opacity 0.3s ease';
-                        videoCard.style.opacity = '0';
-                        setTimeout(() => videoCard.remove(), 300);
-                    }
-                    
+                    removeCard(videoId);
                     showNotification("⏭️ Vidéo ignorée", "info");
-                    
-                    // Vérifier s'il reste des vidéos
-                    setTimeout(() => {
-                        const remainingCards = document.querySelectorAll('.video-card');
-                        if (remainingCards.length <= 1) {
-                            location.reload();
-                        }
-                    }, 500);
                 } else {
                     alert("❌ Erreur: " + data.error);
                     // Réactiver la carte en cas d'erreur
@@ -282,9 +540,9 @@ STAGING_TEMPLATE = '''
             const notification = document.createElement('div');
             notification.className = `notification ${type}`;
             notification.textContent = message;
-            
+
             document.body.appendChild(notification);
-            
+
             // Supprimer après 3 secondes
             setTimeout(() => {
                 notification.style.animation = 'slideOut 0.3s ease';
@@ -296,24 +554,64 @@ STAGING_TEMPLATE = '''
             window.open(url, '_blank');
         }
 
+        function acceptPredictions(minConfidence, acceptBtn) {
+            acceptBtn.disabled = true;
+            acceptBtn.textContent = "🔄 Traitement des suggestions...";
+
+            fetch('/api/staging/accept-predictions', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ min_confidence: minConfidence })
+            })
+            .then(response => response.json())
+            .then(data => {
+                (data.processed || []).forEach(item => {
+                    if (item.success) removeCard(item.video_id);
+                });
+                const failed = (data.processed || []).filter(item => !item.success).length;
+                showNotification(`🤖 ${data.processed_count || 0} vidéos traitées, ${failed} erreurs, ${data.remaining || 0} restantes`,
+                                 failed ? "error" : "success");
+                acceptBtn.disabled = false;
+                acceptBtn.textContent = "🤖 Accepter les suggestions (≥ 90%)";
+            })
+            .catch(err => {
+                console.error("Erreur accept-predictions:", err);
+                alert("❌ Problème lors de l'acceptation des suggestions.");
+                acceptBtn.disabled = false;
+            });
+        }
+
         function clearStaging() {
             if (!confirm("Êtes-vous sûr de vouloir vider le staging ?")) return;
 
             fetch('/clear-staging', { method: 'POST' })
-                .then(() => location.reload())
+                .then(() => {
+                    videoList.replaceChildren();
+                    selectedCategories = {};
+                    nextCursor = null;
+                    allLoaded = true;
+                    setStagingCount(0);
+                    updateView();
+                })
                 .catch(err => {
                     console.error("Erreur clear-staging:", err);
                     alert("❌ Impossible de vider le staging.");
                 });
         }
+
+        loadPage();
     </script>
 </body>
 </html>
 '''
 
+# Compilé une seule fois: la page ne contient plus que les stats et le gabarit de carte
+staging_page = app.jinja_env.from_string(STAGING_TEMPLATE)
+
 @app.route('/')
 def home():
     """Page d'accueil"""
+    youtube_system = get_youtube_system()
     stats = youtube_system.get_stats()
     
     auth_status = '✅ Oui' if stats['authenticated'] else '❌ Non'
@@ -325,6 +623,7 @@ def home():
     
     <h2>📊 Status</h2>
     <ul>
+        <li>Compte: {youtube_system.account_id}</li>
         <li>Authentifié: {auth_status}</li>
         <li>Vidéos en staging: {stats['staging_videos']}</li>
         <li>Vidéos traitées: {stats['processed_videos']}</li>
@@ -341,9 +640,17 @@ def home():
 
 @app.route('/auth/youtube')
 def auth_youtube():
-    """Initie l'authentification YouTube"""
+    """Initie l'authentification YouTube (?account= pour lier un nouveau compte)"""
+    requested = request.args.get('account')
+    account = validate_account_id(requested) if requested else current_account()
+    youtube_system = system_registry.get(account)
+    # Un compte déjà relié à YouTube ne se réauthentifie que depuis une session qui le détient
+    if (account != DEFAULT_ACCOUNT and account not in session.get('accounts', [])
+            and youtube_system.has_credentials()):
+        return jsonify({"error": f"Compte déjà lié: {account}"}), 403
     try:
-        auth_url = youtube_system.get_auth_url()
+        auth_url, state = youtube_system.get_auth_url()
+        session['oauth_state'] = state
         return redirect(auth_url)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -355,9 +662,20 @@ def oauth_callback():
     if not code:
         return jsonify({"error": "Code d'autorisation manquant"}), 400
     
-    success = youtube_system.handle_oauth_callback(code)
+    # Le state doit être celui émis pour ce navigateur (pas de callback forgé ou rejoué)
+    state = request.args.get('state') or ''
+    expected = session.pop('oauth_state', None)
+    if not expected or not secrets.compare_digest(state, expected):
+        return jsonify({"error": "State OAuth invalide"}), 400
+    
+    # Le compte est encodé dans le state OAuth
+    account = account_from_oauth_state(state)
+    youtube_system = system_registry.get(account)
+    success = youtube_system.handle_oauth_callback(code, state)
     
     if success:
+        session['accounts'] = sorted(set(session.get('accounts', [])) | {account})
+        session['account'] = account
         return """
         <h2>✅ Authentification réussie !</h2>
         <p>Vous pouvez maintenant utiliser le système.</p>
@@ -369,6 +687,7 @@ def oauth_callback():
 @app.route('/sync')
 def sync_liked_videos():
     """Synchronise les nouvelles vidéos likées"""
+    youtube_system = get_youtube_system()
     try:
         if not youtube_system.is_authenticated():
             return redirect('/auth/youtube')
@@ -392,47 +711,120 @@ def sync_liked_videos():
 
 @app.route('/staging')
 def staging_interface():
-    """Interface de gestion du staging"""
-    videos = youtube_system.get_staging_videos()
-    categories = youtube_system.get_categories()
-    stats = youtube_system.get_stats()
+    """Interface de gestion du staging (les vidéos sont chargées par la page via /api/staging)"""
+    youtube_system = get_youtube_system()
+    return staging_page.render(categories=youtube_system.get_categories(),
+                               stats=youtube_system.get_stats(),
+                               page_size=STAGING_PAGE_SIZE)
+
+def skip_video(youtube_system: YouTubeLikedSystem, video_id: str):
+    """Marque une vidéo comme ignorée et la retire du staging"""
+    youtube_system.mark_as_processed(video_id, 'skipped', {'status': 'skipped'})
+    youtube_system.remove_from_staging(video_id)
+
+_obsidian_generators = {}
+_obsidian_generators_lock = threading.Lock()
+
+def get_obsidian_generator() -> ObsidianGenerator:
+    """Générateur Obsidian unique par process (et par coffre), créé au premier usage"""
+    vault_path = os.getenv('OBSIDIAN_VAULT_PATH')
+    generator = _obsidian_generators.get(vault_path)
+    if generator is None:
+        with _obsidian_generators_lock:
+            generator = _obsidian_generators.get(vault_path)
+            if generator is None:
+                generator = ObsidianGenerator(
+                    vault_path,
+                    watch_interval=float(os.getenv('OBSIDIAN_WATCH_INTERVAL', '60'))
+                )
+                _obsidian_generators[vault_path] = generator
+    return generator
+
+def save_obsidian_note(result: dict) -> str:
+    """Génère et sauvegarde la note Obsidian d'un résultat Gemini"""
+    obsidian_generator = get_obsidian_generator()
+    if EMBED_THUMBNAILS and result.get('thumbnail'):
+        # Déjà préchargée à la synchronisation en général; sinon téléchargée ici
+        name = thumbnail_cache.fetch(result['video_id'], result['thumbnail'])
+        source = thumbnail_cache.blob_path(name) if name else None
+        if source:
+            obsidian_generator.attach_thumbnail(result, source)
+    print(f"🔍 Debug avant save_note: result contient {list(result.keys())}")
+    return obsidian_generator.save_note(result)
+
+def complete_processing(youtube_system: YouTubeLikedSystem, video_id: str, category: str, result: dict,
+                        timer: Optional[StageTimer] = None):
+    """
+    Marque la vidéo comme traitée, supprime le like et la retire du staging
+    
+    Les étapes sont ajoutées au chronométrage de la requête (timer); sans
+    timer, elles sont chronométrées et rapportées ici.
+    """
+    own_timer = timer is None
+    if own_timer:
+        timer = StageTimer('complete_processing')
+    with timer.stage('mark_as_processed'):
+        youtube_system.mark_as_processed(video_id, category, result)
+    
+    # Supprimer le like YouTube si traitement réussi (non bloquant)
+    try:
+        if category != 'skip':  # Ne pas unliker si c'est un skip
+            with timer.stage('unlike_video'):
+                unlike_success = youtube_system.unlike_video(video_id)
+            if unlike_success:
+                print(f"✅ Like supprimé de YouTube pour {video_id}")
+            else:
+                print(f"⚠️ Impossible de supprimer le like YouTube pour {video_id}")
+    except Exception as unlike_error:
+        print(f"⚠️ Erreur unlike (non bloquant): {unlike_error}")
     
-    return render_template_string(STAGING_TEMPLATE, 
-                                videos=videos, 
-                                categories=categories, 
-                                stats=stats)
+    with timer.stage('remove_from_staging'):
+        youtube_system.remove_from_staging(video_id)
+    if own_timer:
+        timer.finish(200, video_id=video_id)
 
 @app.route('/process-video', methods=['POST'])
 def process_video():
     """Traite une vidéo selon sa catégorie"""
+    timer = g.stage_timer = StageTimer('process_video')
+    with timer.stage('account'):
+        youtube_system = get_youtube_system()
     try:
         # 1. Récupérer les données de la requête
         data = request.get_json()
         video_id = data.get('video_id')
         category = data.get('category')
+        reuse_from = data.get('reuse_from')
         
         print(f"🔍 Debug process_video - video_id: {video_id}, category: {category}")
         
-        if not video_id or not category:
+        if not video_id or not (category or reuse_from):
             return jsonify({"success": False, "error": "Données manquantes"}), 400
         
         # 2. Gestion du skip
         if category == 'skip':
-            youtube_system.mark_as_processed(video_id, 'skipped', {'status': 'skipped'})
-            staging_videos = youtube_system.get_staging_videos()
-            updated_videos = [v for v in staging_videos if v['video_id'] != video_id]
-            youtube_system.save_to_staging(updated_videos)
+            with timer.stage('skip'):
+                skip_video(youtube_system, video_id)
             return jsonify({"success": True, "message": "Vidéo skippée"})
         
         # 3. Récupérer les données de la vidéo
-        staging_videos = youtube_system.get_staging_videos()
-        video_data = next((video for video in staging_videos if video['video_id'] == video_id), None)
+        with timer.stage('load_staging'):
+            staging_videos = youtube_system.get_staging_videos()
+            video_data = next((video for video in staging_videos if video['video_id'] == video_id), None)
         
         if not video_data:
             return jsonify({"success": False, "error": "Vidéo non trouvée en staging"}), 404
         
-        # 4. Traitement avec Gemini
-        result = youtube_system.process_video_with_gemini(video_data, category)
+        # 4. Traitement avec Gemini, ou réutilisation du résultat d'un doublon déjà traité
+        if reuse_from:
+            with timer.stage('reuse_result'):
+                result = youtube_system.reuse_processed_result(video_data, reuse_from, category)
+            if not result:
+                return jsonify({"success": False, "error": "Résultat du doublon non réutilisable"}), 409
+            category = result['category']
+        else:
+            with timer.stage('gemini'):
+                result = youtube_system.process_video_with_gemini(video_data, category)
         print(f"🔍 Debug result from Gemini: {list(result.keys()) if result else 'None'}")
         
         if not result:
@@ -444,33 +836,19 @@ def process_video():
             print(f"🔍 Debug: Ajout de category={category} au résultat")
         
         # 6. Génération et sauvegarde de la note Obsidian
-        obsidian_generator = ObsidianGenerator(os.getenv('OBSIDIAN_VAULT_PATH'))
         try:
-            print(f"🔍 Debug avant save_note: result contient {list(result.keys())}")
-            obsidian_note_path = obsidian_generator.save_note(result)
+            with timer.stage('obsidian_generator'):
+                get_obsidian_generator()
+            with timer.stage('save_note'):
+                obsidian_note_path = save_obsidian_note(result)
         except Exception as e:
             print(f"❌ Erreur Obsidian détaillée: {str(e)}")
             import traceback
             print(f"❌ Traceback Obsidian: {traceback.format_exc()}")
             return jsonify({"success": False, "error": f"Erreur Obsidian: {str(e)}"}), 500
         
-        # 7. Marquer comme traitée et mettre à jour le staging
-        youtube_system.mark_as_processed(video_id, category, result)
-        
-        # 8. NOUVEAU: Supprimer le like YouTube si traitement réussi (optionnel)
-        try:
-            if category != 'skip':  # Ne pas unliker si c'est un skip
-                unlike_success = youtube_system.unlike_video(video_id)
-                if unlike_success:
-                    print(f"✅ Like supprimé de YouTube pour {video_id}")
-                else:
-                    print(f"⚠️ Impossible de supprimer le like YouTube pour {video_id}")
-        except Exception as unlike_error:
-            print(f"⚠️ Erreur unlike (non bloquant): {unlike_error}")
-        
-        # 9. Retirer du staging
-        updated_videos = [v for v in staging_videos if v['video_id'] != video_id]
-        youtube_system.save_to_staging(updated_videos)
+        # 7-9. Marquer comme traitée, supprimer le like et retirer du staging
+        complete_processing(youtube_system, video_id, category, result, timer)
         
         # 10. Retourner le résultat
         return jsonify({
@@ -494,48 +872,362 @@ def process_video():
             }
         }), 500
 
+@app.route('/api/staging/accept-predictions', methods=['POST'])
+def accept_predictions():
+    """
+    Traite en lot les vidéos dont la catégorie suggérée est assez sûre
+    
+    Body JSON: min_confidence (0.9 par défaut), limit (10 par défaut, appels
+    Gemini séquentiels), video_ids (optionnel), dry_run
+    """
+    timer = g.stage_timer = StageTimer('accept_predictions')
+    youtube_system = get_youtube_system()
+    data = request.get_json(silent=True) or {}
+    try:
+        min_confidence = float(data.get('min_confidence', 0.9))
+        limit = max(1, min(int(data.get('limit', 10)), 50))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "min_confidence ou limit invalide"}), 400
+    
+    videos = youtube_system.get_staging_videos()
+    if data.get('video_ids'):
+        wanted = set(data['video_ids'])
+        videos = [video for video in videos if video['video_id'] in wanted]
+    with timer.stage('predict'):
+        predictions = youtube_system.predict_categories(videos)
+    accepted = [
+        (video, predictions[video['video_id']]) for video in videos
+        if video['video_id'] in predictions and predictions[video['video_id']]['confidence'] >= min_confidence
+    ]
+    
+    if data.get('dry_run'):
+        return jsonify({
+            "success": True,
+            "candidates": [{"video_id": video['video_id'], **prediction} for video, prediction in accepted]
+        })
+    
+    processed = []
+    for video_data, prediction in accepted[:limit]:
+        video_id = video_data['video_id']
+        category = prediction['category']
+        try:
+            # Étapes cumulées sur tout le lot
+            with timer.stage('gemini'):
+                result = youtube_system.process_video_with_gemini(video_data, category)
+            if not result:
+                raise RuntimeError("Erreur lors du traitement Gemini")
+            result.setdefault('category', category)
+            with timer.stage('save_note'):
+                obsidian_note_path = save_obsidian_note(result)
+            complete_processing(youtube_system, video_id, category, result, timer)
+            processed.append({"video_id": video_id, "category": category, "success": True,
+                              "obsidian_note_path": obsidian_note_path})
+        except Exception as e:
+            print(f"❌ Erreur suggestion {video_id}: {str(e)}")
+            processed.append({"video_id": video_id, "category": category, "success": False, "error": str(e)})
+    
+    return jsonify({
+        "success": True,
+        "processed": processed,
+        "processed_count": sum(1 for item in processed if item['success']),
+        "remaining": max(0, len(accepted) - limit)
+    })
+
+def _staging_depths():
+    """Vidéos en attente dans le staging de chaque compte chargé (calculé à la collecte)"""
+    return [
+        ({'queue': 'staging', 'account': account_id}, len(youtube_system.get_staging_videos()))
+        for account_id, youtube_system in system_registry.loaded_systems()
+    ]
+
+QUEUE_DEPTH.set_function(_staging_depths)
+
+@app.route('/thumbnails/<name>')
+def serve_thumbnail(name):
+    """Miniature du cache local: nom = SHA-256 du contenu, donc cacheable indéfiniment"""
+    path = thumbnail_cache.blob_path(name)
+    if path is None:
+        return jsonify({"error": "Miniature absente du cache"}), 404
+    response = send_file(path, etag=name.split('.')[0], max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/api/timings')
+def api_stage_timings():
+    """Quantiles glissants p50/p95/p99 (ms) de chaque étape des requêtes chronométrées"""
+    return jsonify(stage_summary())
+
+@app.route('/metrics')
+def metrics():
+    """Métriques du process au format texte Prometheus (un worker = une cible)"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/health')
+def health():
+    """Vérification légère de l'état du service (pour sondes et load balancers)"""
+    if not os.getenv('OBSIDIAN_VAULT_PATH'):
+        return jsonify({"ok": False, "error": "OBSIDIAN_VAULT_PATH not set"}), 503
+    obsidian_health = get_obsidian_generator().health_check()
+    status = 200 if obsidian_health['ok'] else 503
+    return jsonify({
+        "obsidian": obsidian_health,
+        "loaded_accounts": len(system_registry.accounts())
+    }), status
+
 @app.route('/clear-staging', methods=['POST'])
 def clear_staging():
     """Vide le staging"""
+    youtube_system = get_youtube_system()
     youtube_system.clear_staging()
     return jsonify({"success": True})
 
 @app.route('/stats')
 def get_stats():
     """Statistiques détaillées"""
+    youtube_system = get_youtube_system()
     stats = youtube_system.get_stats()
     
-    # Récupérer des stats plus détaillées
-    if youtube_system.processed_file.exists():
-        import json
-        with open(youtube_system.processed_file, 'r', encoding='utf-8') as f:
-            processed_data = json.load(f)
-            
-        # Stats par catégorie
-        category_stats = {}
-        for video in processed_data.get('processed_videos', []):
-            cat = video.get('category', 'unknown')
-            category_stats[cat] = category_stats.get(cat, 0) + 1
-        
-        stats['category_breakdown'] = category_stats
+    # Stats détaillées, lues depuis les compteurs matérialisés
+    counters = youtube_system.get_processing_counters()
+    if counters.get('total'):
+        stats['category_breakdown'] = counters.get('by_category', {})
+        stats['processing_type_breakdown'] = counters.get('by_processing_type', {})
+        stats['daily_breakdown'] = counters.get('by_day', {})
     
     return jsonify(stats)
 
+def staging_cards(youtube_system: YouTubeLikedSystem, videos: list) -> list:
+    """Vidéos du staging enrichies pour l'affichage (sans modifier le staging)"""
+    predictions = youtube_system.predict_categories(videos)
+    local_thumbnails = thumbnail_cache.lookup_many(v['video_id'] for v in videos)
+    return [
+        dict(v, predicted_category=predictions.get(v['video_id']),
+             thumbnail_local=f"/thumbnails/{local_thumbnails[v['video_id']]}" if v['video_id'] in local_thumbnails else None)
+        for v in videos
+    ]
+
 @app.route('/api/staging', methods=['GET'])
+@api_endpoint
 def api_get_staging():
-    """API endpoint pour récupérer le staging (pour intégrations)"""
+    """
+    API endpoint pour récupérer le staging (pour intégrations)
+    
+    Query: limit, cursor (next_cursor de la page précédente),
+    fields (ex: video_id,title), since (detected_at ISO)
+    """
+    youtube_system = get_youtube_system()
     videos = youtube_system.get_staging_videos()
     categories = youtube_system.get_categories()
     
-    return jsonify({
-        "videos": videos,
+    since = parse_since(request.args.get('since'))
+    if since:
+        videos = [v for v in videos if v.get('detected_at', '') >= since]
+    
+    page, next_cursor = paginate_by_key(
+        videos, ['detected_at', 'video_id'],
+        decode_cursor(request.args.get('cursor')),
+        parse_limit(request.args.get('limit'))
+    )
+    fields = parse_fields(request.args.get('fields'))
+    
+    return {
+        "videos": [select_fields(v, fields) for v in staging_cards(youtube_system, page)],
         "categories": categories,
-        "count": len(videos)
+        "count": len(videos),
+        "next_cursor": next_cursor
+    }
+
+def server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def staging_events_since(youtube_system: YouTubeLikedSystem, known: set) -> Tuple[List[str], set]:
+    """
+    Événements SSE des changements du staging depuis l'ensemble known de video_ids
+    
+    Returns:
+        tuple: (événements "removed" puis "added", video_ids actuels)
+    """
+    videos = youtube_system.get_staging_videos()
+    current = {v['video_id'] for v in videos}
+    if current == known:
+        return [], known
+    events = []
+    removed = known - current
+    if removed:
+        events.append(server_sent_event('removed', {"video_ids": sorted(removed), "count": len(videos)}))
+    added = sorted((v for v in videos if v['video_id'] not in known),
+                   key=lambda v: (v.get('detected_at', ''), v['video_id']))
+    if added:
+        events.append(server_sent_event('added', {"videos": staging_cards(youtube_system, added),
+                                                  "count": len(videos)}))
+    return events, current
+
+STAGING_EVENTS_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+@app.route('/api/staging/events')
+def api_staging_events():
+    """
+    Flux SSE des changements du staging: "added" (cartes des nouvelles vidéos)
+    et "removed" (video_ids traités ou ignorés, y compris par un autre onglet ou worker)
+    
+    Le fichier de staging est relu à chaque intervalle (lecture en cache tant qu'il
+    n'a pas changé sur disque). En WSGI, chaque connexion occupe un thread du worker
+    pendant au plus STAGING_EVENTS_MAX_AGE secondes: au-delà de
+    STAGING_EVENTS_MAX_STREAMS flux ouverts, réponse 503 (le navigateur réessaie).
+    asgi_app sert cette route en coroutine, sans cette limite.
+    """
+    youtube_system = get_youtube_system()
+    if not staging_event_streams.acquire(blocking=False):
+        return Response("Trop de flux SSE ouverts", status=503, mimetype='text/plain',
+                        headers={'Retry-After': '30'})
+    try:
+        known = {v['video_id'] for v in youtube_system.get_staging_videos()}
+    except BaseException:
+        staging_event_streams.release()
+        raise
+    
+    def stream(known):
+        yield f"retry: {int(STAGING_EVENTS_INTERVAL * 1000)}\n\n"
+        deadline = time.monotonic() + STAGING_EVENTS_MAX_AGE
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            time.sleep(STAGING_EVENTS_INTERVAL)
+            events, known = staging_events_since(youtube_system, known)
+            if events:
+                yield ''.join(events)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STAGING_EVENTS_KEEPALIVE:
+                # Commentaire SSE: garde la connexion ouverte à travers les proxys
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+    
+    response = Response(stream(known), mimetype='text/event-stream', headers=STAGING_EVENTS_HEADERS)
+    # Appelé à la fin du flux comme à la déconnexion du client
+    response.call_on_close(staging_event_streams.release)
+    return response
+
+def _processed_query(youtube_system: YouTubeLikedSystem):
+    """Paramètres communs des API de résultats traités: (entries, start, category, fields)"""
+    entries = youtube_system.get_processed_videos()
+    cursor = decode_cursor(request.args.get('cursor'))
+    since = parse_since(request.args.get('since'))
+    
+    # L'historique est en ajout seul: la position est un curseur stable
+    start = first_index_since(entries, since)
+    if cursor is not None:
+        try:
+            start = max(start, int(cursor.get('i', 0)))
+        except (TypeError, ValueError):
+            raise ApiQueryError("Curseur invalide")
+    
+    return entries, start, request.args.get('category'), parse_fields(request.args.get('fields'))
+
+@app.route('/api/processed', methods=['GET'])
+@api_endpoint
+def api_get_processed():
+    """
+    Résultats traités, paginés par curseur
+    
+    Query: limit, cursor, fields (video_id,category,processed_at,result), since, category
+    """
+    youtube_system = get_youtube_system()
+    entries, start, category, fields = _processed_query(youtube_system)
+    limit = parse_limit(request.args.get('limit'))
+    
+    page = []
+    position = start
+    while position < len(entries) and len(page) < limit:
+        entry = entries[position]
+        position += 1
+        if category and entry.get('category') != category:
+            continue
+        page.append(select_fields(entry, fields))
+    
+    return {
+        "processed": page,
+        "next_cursor": encode_cursor({'i': position}) if position < len(entries) else None,
+        # Curseur à réutiliser plus tard pour ne récupérer que les nouveautés
+        "sync_cursor": encode_cursor({'i': position})
+    }
+
+@app.route('/api/processed.ndjson', methods=['GET'])
+def api_stream_processed():
+    """
+    Flux NDJSON des résultats traités (une ligne par vidéo)
+    
+    L'en-tête X-Next-Cursor permet de ne récupérer que les deltas au prochain appel.
+    """
+    youtube_system = get_youtube_system()
+    try:
+        entries, start, category, fields = _processed_query(youtube_system)
+    except ApiQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    end = len(entries)
+    records = (
+        select_fields(entry, fields)
+        for entry in islice(entries, start, end)
+        if not category or entry.get('category') == category
+    )
+    etag_source = f"{youtube_system.account_id}:{start}:{end}:{category}:{fields}"
+    return ndjson_response(records, etag_source, headers={
+        'X-Next-Cursor': encode_cursor({'i': end})
     })
 
+@app.route('/api/similar/<video_id>', methods=['GET'])
+@api_endpoint
+def api_similar_videos(video_id):
+    """
+    Vidéos traitées les plus proches d'une vidéo traitée (résumé, concepts, mots-clés)
+    
+    Query: k (nombre de résultats, 10 par défaut)
+    """
+    youtube_system = get_youtube_system()
+    if not youtube_system.similarity_index.available:
+        return jsonify({"error": "Index de similarité indisponible (numpy non installé)"}), 501
+    
+    k = min(parse_limit(request.args.get('k') or '10'), 100)
+    similar = youtube_system.get_similar_videos(video_id, k)
+    if similar is None:
+        return jsonify({"error": "Vidéo non indexée"}), 404
+    
+    return {"video_id": video_id, "similar": similar}
+
+@app.route('/search', methods=['GET'])
+@api_endpoint
+def search_processed():
+    """
+    Recherche plein texte dans les vidéos traitées, classée par pertinence
+    
+    Query: q, category, limit, cursor (next_cursor de la page précédente)
+    """
+    youtube_system = get_youtube_system()
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ApiQueryError("Paramètre q manquant")
+    
+    cursor = decode_cursor(request.args.get('cursor'))
+    try:
+        offset = max(0, int(cursor.get('o', 0))) if cursor else 0
+    except (TypeError, ValueError):
+        raise ApiQueryError("Curseur invalide")
+    limit = parse_limit(request.args.get('limit') or '20')
+    
+    results, total = youtube_system.search_processed(query, request.args.get('category'), limit, offset)
+    return {
+        "query": query,
+        "results": results,
+        "total": total,
+        "next_cursor": encode_cursor({'o': offset + limit}) if offset + limit < total else None
+    }
+
 @app.route('/api/sync', methods=['POST'])
 def api_sync():
     """API endpoint pour synchroniser"""
+    youtube_system = get_youtube_system()
     try:
         if not youtube_system.is_authenticated():
             return jsonify({"error": "Authentication required"}), 401
@@ -554,108 +1246,26 @@ def api_sync():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Même moteur de rendu que les notes sauvegardées dans le coffre
+note_renderer = NoteRenderer(OBSIDIAN_CATEGORIES)
+
 def generate_obsidian_note(result: dict) -> str:
     """Génère le contenu de la note Obsidian"""
-    category_info = youtube_system.categories[result['category']]
-    processing_type = result['processing_type']
-    
-    # Template basé sur le type
-    if processing_type == 'learning':
-        note_content = f"""# {result['title']}
-
-## Métadonnées
-- **URL**: {result['url']}
-- **Type**: Learning 🎓
-- **Domaine**: [[{category_info['folder']} MOC]]
-- **Chaîne**: {result['channel']}
-- **Date d'ajout**: {result['processed_at'][:10]}
-- **Dernière révision**: {result['processed_at'][:10]}
-
----
-
-## Résumé Détaillé
-{result.get('summary', '')}
-
-## Concepts Clés"""
-        
-        # Ajouter les concepts
-        for concept in result.get('concepts', []):
-            note_content += f"\n- **{concept['name']}** - {concept['definition']}"
-        
-        note_content += f"""
-
-## Applications Pratiques
-{result.get('applications', '')}
-
-## Notes Connectées
-<!-- Auto-générées -->
-
----
-*Tags: #video #learning #{result['category'].replace('_', '-')}"""
-        
-        # Ajouter les mots-clés comme tags
-        for keyword in result.get('keywords', []):
-            clean_keyword = keyword.lower().replace(' ', '-').replace(',', '')
-            note_content += f" #{clean_keyword}"
-        
-        note_content += "*"
-    
-    else:  # knowledge
-        note_content = f"""# {result['title']}
-
-## Métadonnées
-- **URL**: {result['url']}
-- **Type**: Knowledge 📰
-- **Domaine**: [[{category_info['folder']} MOC]]
-- **Chaîne**: {result['channel']}
-- **Date d'ajout**: {result['processed_at'][:10]}
-
----
-
-## Résumé
-{result.get('summary', '')}
-
-## Points Clés"""
-        
-        # Ajouter les points clés
-        for point in result.get('key_points', []):
-            note_content += f"\n- {point}"
-        
-        note_content += f"""
-
-## À Retenir
-{result.get('key_takeaway', '')}
-
-## Notes Connectées
-<!-- Auto-générées -->
-
----
-*Tags: #video #knowledge #{result['category'].replace('_', '-')}"""
-        
-        # Ajouter les mots-clés comme tags
-        for keyword in result.get('keywords', []):
-            clean_keyword = keyword.lower().replace(' ', '-').replace(',', '')
-            note_content += f" #{clean_keyword}"
-        
-        note_content += "*"
-    
-    return note_content
+    return note_renderer.render(result)
 
 @app.route('/export-obsidian/<video_id>')
 def export_obsidian(video_id):
     """Exporte une note traitée au format Obsidian"""
+    youtube_system = get_youtube_system()
     try:
         # Charger les données traitées
-        if not youtube_system.processed_file.exists():
+        processed_videos = youtube_system.get_processed_videos()
+        if not processed_videos:
             return jsonify({"error": "Aucune vidéo traitée"}), 404
         
-        import json
-        with open(youtube_system.processed_file, 'r', encoding='utf-8') as f:
-            processed_data = json.load(f)
-        
         # Trouver la vidéo
         video_result = None
-        for video in processed_data.get('processed_videos', []):
+        for video in processed_videos:
             if video['video_id'] == video_id:
                 video_result = video['result']
                 break
@@ -685,6 +1295,8 @@ if __name__ == '__main__':
     print("   POST /process-video - Traiter une vidéo")
     print("   GET  /stats - Statistiques")
     print()
+    print("⚡ Mode asynchrone (ASGI): uvicorn asgi_app:app --port 5000")
+    print()
     print("🔑 Configuration requise dans .env:")
     print("   YOUTUBE_CLIENT_ID=...")
     print("   YOUTUBE_CLIENT_SECRET=...")
@@ -0,0 +1,211 @@
+# asgi_app.py - Mode de service asynchrone (ASGI) pour les routes longues
+#
+# Lancement: uvicorn asgi_app:app --port 5000
+#
+# Les routes qui attendent Gemini ou YouTube (/process-video, /api/sync) et le
+# flux SSE du staging (/api/staging/events) sont servis par des coroutines: un
+# appel en cours ou une connexion ouverte n'immobilise plus un thread OS.
+# Toutes les autres routes restent celles de l'application Flask, montée en WSGI.
+import time
+import asyncio
+import traceback
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from youtube_liked_system import InvalidAccountError, AccountAccessError
+from metrics import StageTimer
+from app_liked_system import (
+    app as flask_app, system_registry, skip_video, save_obsidian_note, complete_processing,
+    resolve_account, staging_events_since, STAGE_TIMING_HEADER, STAGING_EVENTS_HEADERS,
+    STAGING_EVENTS_INTERVAL, STAGING_EVENTS_MAX_AGE, STAGING_EVENTS_KEEPALIVE
+)
+
+# Même cookie de session signé que l'application Flask
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def read_session(request: Request) -> dict:
+    """Contenu de la session Flask (vide si absente, expirée ou mal signée)"""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    try:
+        return session_serializer.loads(
+            cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+def request_account(request: Request) -> str:
+    return resolve_account(request.query_params.get('account') or request.headers.get('X-Account-Id'),
+                           read_session(request))
+
+
+def get_youtube_system(request: Request):
+    """Même résolution de compte que l'application Flask"""
+    return system_registry.get(request_account(request))
+
+
+def account_error(e: InvalidAccountError) -> JSONResponse:
+    return JSONResponse({"error": str(e)}, status_code=403 if isinstance(e, AccountAccessError) else 400)
+
+
+async def process_video(request: Request):
+    """Traite une vidéo selon sa catégorie (Gemini asynchrone), étapes chronométrées"""
+    timer = StageTimer('process_video')
+    response = await _process_video(request, timer)
+    try:
+        account = request_account(request)
+    except InvalidAccountError:
+        account = None
+    timer.finish(response.status_code, account=account)
+    if STAGE_TIMING_HEADER or request.headers.get('X-Debug-Timing'):
+        response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+
+async def _process_video(request: Request, timer: StageTimer):
+    try:
+        with timer.stage('account'):
+            youtube_system = get_youtube_system(request)
+    except InvalidAccountError as e:
+        return account_error(e)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        # json.JSONDecodeError et corps non UTF-8: erreur du client, pas du serveur
+        data = None
+    if not isinstance(data, dict):
+        return JSONResponse({"success": False, "error": "JSON invalide"}, status_code=400)
+
+    video_id = category = None
+    try:
+        video_id = data.get('video_id')
+        category = data.get('category')
+        reuse_from = data.get('reuse_from')
+
+        if not video_id or not (category or reuse_from):
+            return JSONResponse({"success": False, "error": "Données manquantes"}, status_code=400)
+
+        # Les accès fichiers sont courts mais bloquants: ils passent par le pool de threads
+        if category == 'skip':
+            with timer.stage('skip'):
+                await asyncio.to_thread(skip_video, youtube_system, video_id)
+            return JSONResponse({"success": True, "message": "Vidéo skippée"})
+
+        with timer.stage('load_staging'):
+            staging_videos = await asyncio.to_thread(youtube_system.get_staging_videos)
+        video_data = next((video for video in staging_videos if video['video_id'] == video_id), None)
+
+        if not video_data:
+            return JSONResponse({"success": False, "error": "Vidéo non trouvée en staging"}, status_code=404)
+
+        # Appel Gemini non bloquant, ou réutilisation du résultat d'un doublon déjà traité
+        if reuse_from:
+            with timer.stage('reuse_result'):
+                result = await asyncio.to_thread(youtube_system.reuse_processed_result,
+                                                 video_data, reuse_from, category)
+            if not result:
+                return JSONResponse({"success": False, "error": "Résultat du doublon non réutilisable"}, status_code=409)
+            category = result['category']
+        else:
+            with timer.stage('gemini'):
+                result = await youtube_system.process_video_with_gemini_async(video_data, category)
+
+        if not result:
+            return JSONResponse({"success": False, "error": "Erreur lors du traitement Gemini"}, status_code=500)
+
+        if 'category' not in result:
+            result['category'] = category
+
+        try:
+            with timer.stage('save_note'):
+                obsidian_note_path = await asyncio.to_thread(save_obsidian_note, result)
+        except Exception as e:
+            print(f"❌ Erreur Obsidian détaillée: {str(e)}")
+            return JSONResponse({"success": False, "error": f"Erreur Obsidian: {str(e)}"}, status_code=500)
+
+        await asyncio.to_thread(complete_processing, youtube_system, video_id, category, result, timer)
+
+        return JSONResponse({
+            "success": True,
+            "message": "Vidéo traitée avec succès",
+            "result": result,
+            "obsidian_note_path": obsidian_note_path,
+            "category": category
+        })
+
+    except Exception as e:
+        print(f"❌ Erreur processing générale: {str(e)}")
+        print(f"❌ Traceback complet: {traceback.format_exc()}")
+        return JSONResponse({
+            "success": False,
+            "error": str(e),
+            "details": {"video_id": video_id, "category": category}
+        }, status_code=500)
+
+
+async def api_sync(request: Request):
+    """API endpoint pour synchroniser (appel YouTube hors de la boucle d'événements)"""
+    try:
+        youtube_system = get_youtube_system(request)
+    except InvalidAccountError as e:
+        return account_error(e)
+
+    try:
+        if not await asyncio.to_thread(youtube_system.is_authenticated):
+            return JSONResponse({"error": "Authentication required"}, status_code=401)
+
+        new_videos = await asyncio.to_thread(youtube_system.get_new_liked_videos)
+
+        if new_videos:
+            await asyncio.to_thread(youtube_system.save_to_staging, new_videos)
+
+        return JSONResponse({
+            "success": True,
+            "new_videos_count": len(new_videos),
+            "videos": new_videos
+        })
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def staging_events(request: Request):
+    """Flux SSE des changements du staging (mêmes événements que la route Flask), sans thread par connexion"""
+    try:
+        youtube_system = get_youtube_system(request)
+    except InvalidAccountError as e:
+        return account_error(e)
+    known = {v['video_id'] for v in await asyncio.to_thread(youtube_system.get_staging_videos)}
+
+    async def stream(known):
+        yield f"retry: {int(STAGING_EVENTS_INTERVAL * 1000)}\n\n"
+        deadline = time.monotonic() + STAGING_EVENTS_MAX_AGE
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            await asyncio.sleep(STAGING_EVENTS_INTERVAL)
+            # Lecture du staging (et prédictions des nouvelles cartes) hors de la boucle d'événements
+            events, known = await asyncio.to_thread(staging_events_since, youtube_system, known)
+            if events:
+                yield ''.join(events)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STAGING_EVENTS_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(stream(known), media_type='text/event-stream', headers=STAGING_EVENTS_HEADERS)
+
+
+app = Starlette(routes=[
+    Route('/process-video', process_video, methods=['POST']),
+    Route('/api/sync', api_sync, methods=['POST']),
+    Route('/api/staging/events', staging_events, methods=['GET']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,68 @@
+# benchmarks/bench_rendering.py - Débit du moteur de rendu des notes (notes/seconde)
+#
+# Usage: python benchmarks/bench_rendering.py [--notes 20000] [--repeat 5]
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from note_renderer import NoteRenderer
+from obsidian_generator import OBSIDIAN_CATEGORIES
+
+
+def make_result(i: int, processing_type: str) -> dict:
+    """Résultat Gemini synthétique, de taille réaliste"""
+    category = 'ai_technique_learning' if processing_type == 'learning' else 'culture_g_knowledge'
+    result = {
+        'video_id': f"vid{i:08d}",
+        'title': f"Vidéo de test n°{i} : les réseaux de neurones expliqués",
+        'url': f"https://www.youtube.com/watch?v=vid{i:08d}",
+        'channel': f"Chaîne {i % 97}",
+        'category': category,
+        'processing_type': processing_type,
+        'processed_at': '2026-01-15T10:30:00',
+        'summary': "Résumé détaillé de la vidéo. " * 40,
+        'keywords': ['Intelligence Artificielle', 'réseaux de neurones', 'Deep Learning', 'Python', 'éthique'],
+    }
+    if processing_type == 'learning':
+        result['concepts'] = [{'name': f"Concept {k}", 'definition': "Définition courte " * 3} for k in range(5)]
+        result['applications'] = "Applications pratiques. " * 10
+    else:
+        result['key_points'] = [f"Point important {k}" for k in range(5)]
+        result['key_takeaway'] = "L'information la plus utile à retenir."
+    return result
+
+
+def bench(renderer: NoteRenderer, results: list, repeat: int) -> dict:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for result in results:
+            renderer.render(result)
+        best = min(best, time.perf_counter() - start)
+    return {
+        'notes': len(results),
+        'best_seconds': round(best, 4),
+        'notes_per_second': round(len(results) / best),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit du moteur de rendu des notes")
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    renderer = NoteRenderer(OBSIDIAN_CATEGORIES)
+    report = {}
+    for processing_type in ('learning', 'knowledge'):
+        results = [make_result(i, processing_type) for i in range(args.notes)]
+        report[processing_type] = bench(renderer, results, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
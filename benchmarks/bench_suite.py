@@ -0,0 +1,288 @@
+# benchmarks/bench_suite.py - Stockage et rendu sur des bibliothèques synthétiques (1k, 10k, 100k vidéos)
+#
+# Usage: python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--budget 2]
+#                                         [--output bench.json] [--baseline ancien.json --tolerance 0.25]
+#
+# Chaque opération est mesurée à chaque taille; l'exposant de croissance entre deux tailles
+# (log(t2/t1) / log(n2/n1)) vaut ~0 pour une opération en O(1) et ~1 pour une opération en O(n),
+# c'est-à-dire O(n²) pour constituer la bibliothèque vidéo par vidéo.
+# Avec --baseline, le code de sortie est 1 si une opération perd plus de --tolerance de débit.
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Le système vérifie la présence des clés au démarrage; aucun appel réseau n'est fait ici
+for key in ('YOUTUBE_CLIENT_ID', 'YOUTUBE_CLIENT_SECRET', 'GOOGLE_AI_API_KEY'):
+    os.environ.setdefault(key, 'benchmark')
+
+from bench_rendering import make_result
+from json_store import atomic_write_json
+from note_renderer import NoteRenderer, clean_tag
+from obsidian_generator import OBSIDIAN_CATEGORIES
+from youtube_liked_system import YouTubeLikedSystem, DEFAULT_ACCOUNT
+
+TOPICS = ['transformers', 'histoire romaine', 'cuisine japonaise', 'astrophysique', 'Rust', 'économie',
+          'photographie', 'jardinage', 'échecs', 'neurosciences', 'Kubernetes', 'musique baroque']
+
+LEARNING_RESPONSE = """## Résumé détaillé
+{summary}
+
+## Concepts clés
+- **Attention**: mécanisme qui pondère les éléments d'une séquence
+- **Embedding**: représentation vectorielle dense d'un token
+- **Fine-tuning**: ré-entraînement ciblé d'un modèle pré-entraîné
+- **Tokenisation**: découpage du texte en unités traitées par le modèle
+
+## Applications pratiques
+{applications}
+
+## Mots-clés
+[transformers, attention, deep learning, NLP, PyTorch]
+"""
+
+KNOWLEDGE_RESPONSE = """## Résumé
+{summary}
+
+## Points clés
+- Premier point important de la vidéo
+- Deuxième point, avec un détail chiffré (42 %)
+- Troisième point sur le contexte historique
+- Quatrième point pratique
+
+## À retenir
+L'information la plus utile à retenir de la vidéo.
+
+## Mots-clés
+[histoire, Rome, empire, culture générale]
+"""
+
+
+def make_staging_video(i: int) -> Dict:
+    """Vidéo en staging synthétique (mêmes champs que la synchronisation YouTube)"""
+    topic = TOPICS[i % len(TOPICS)]
+    return {
+        'video_id': f"stg{i:08d}",
+        'title': f"Comprendre {topic} en 20 minutes (partie {i})",
+        'description': f"Une introduction à {topic}. " * 12,
+        'channel': f"Chaîne {i % 97}",
+        'published_at': '2026-01-15T10:30:00Z',
+        'duration': 'PT20M13S',
+        'url': f"https://www.youtube.com/watch?v=stg{i:08d}",
+        'thumbnail': f"https://i.ytimg.com/vi/stg{i:08d}/mqdefault.jpg",
+        'detected_at': '2026-01-16T08:00:00',
+    }
+
+
+def make_processed_entry(i: int) -> Dict:
+    """Entrée de processed_videos.json synthétique (résultat Gemini complet)"""
+    processing_type = 'learning' if i % 2 else 'knowledge'
+    result = make_result(i, processing_type)
+    result['title'] = f"{TOPICS[i % len(TOPICS)].capitalize()} : épisode {i}"
+    return {
+        'video_id': result['video_id'],
+        'category': result['category'],
+        'result': result,
+        'processed_at': result['processed_at'],
+    }
+
+
+def build_library(data_root: Path, size: int) -> YouTubeLikedSystem:
+    """Système pointant sur une bibliothèque synthétique de `size` vidéos traitées"""
+    data_root.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(data_root / "processed_videos.json",
+                      {'processed_videos': [make_processed_entry(i) for i in range(size)]}, indent=None)
+    return YouTubeLikedSystem(DEFAULT_ACCOUNT, data_root=str(data_root))
+
+
+def measure(operation: Callable[[int], object], budget: float, max_ops: int, min_ops: int = 3) -> Dict:
+    """
+    Répète operation(i) jusqu'à épuiser le budget de temps, puis mesure le pic mémoire d'un appel
+
+    Returns:
+        Dict: ops, seconds, ops_per_sec, mean_ms, p95_ms, peak_kib
+    """
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_ops and (len(timings) < min_ops or time.perf_counter() - started < budget):
+        start = time.perf_counter()
+        operation(len(timings))
+        timings.append(time.perf_counter() - start)
+
+    # Appel supplémentaire sous tracemalloc: le traçage ralentit, il reste hors des temps mesurés
+    tracemalloc.start()
+    operation(len(timings))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(timings)
+    ordered = sorted(timings)
+    return {
+        'ops': len(timings),
+        'seconds': round(total, 4),
+        'ops_per_sec': round(len(timings) / total, 2) if total else None,
+        'mean_ms': round(total / len(timings) * 1000, 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 4),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def bench_library(size: int, budget: float, workdir: Path) -> Dict[str, Dict]:
+    """Opérations dont le coût dépend de la taille de la bibliothèque"""
+    system = build_library(workdir / f"library_{size}", size)
+    report = {}
+
+    def load_ids_cold(_):
+        system.processed_store.invalidate()  # forcer la relecture du disque
+        return system._load_processed_video_ids()
+
+    report['load_processed_ids_cold'] = measure(load_ids_cold, budget, max_ops=1000)
+    report['load_processed_ids_warm'] = measure(lambda _: system._load_processed_video_ids(), budget, max_ops=1000)
+
+    # Premier appel hors mesure: compteurs et index (similarité, recherche) construits une fois
+    system.mark_as_processed('warmup', 'ai_technique_learning', make_result(size, 'learning'))
+    report['mark_as_processed'] = measure(
+        lambda i: system.mark_as_processed(f"new{i:08d}", 'ai_technique_learning', make_result(size + i + 1, 'learning')),
+        budget, max_ops=1000)
+
+    staging = [make_staging_video(i) for i in range(size)]
+    report['staging_save'] = measure(lambda _: system.save_to_staging(staging), budget, max_ops=1000)
+    system.save_to_staging(staging)
+    report['staging_remove'] = measure(
+        lambda i: system.remove_from_staging(staging[i % size]['video_id']), budget, max_ops=size)
+    return report
+
+
+def bench_micro(budget: float) -> Dict[str, Dict]:
+    """Opérations indépendantes de la taille de la bibliothèque (débit par élément)"""
+    system = YouTubeLikedSystem.__new__(YouTubeLikedSystem)  # le parseur n'utilise aucun état
+    learning = LEARNING_RESPONSE.format(summary="Résumé détaillé de la vidéo. " * 40,
+                                        applications="Applications pratiques. " * 10)
+    knowledge = KNOWLEDGE_RESPONSE.format(summary="Résumé de la vidéo. " * 30)
+
+    rng = random.Random(42)
+    words = ['Intelligence', 'Artificielle', 'réseaux', 'neurones', 'Deep', 'Learning', 'éthique', 'C++',
+             'Économie', 'Rome', 'élève', 'Données', 'science', 'Machine']
+    tags = [' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))) + f" {i}" for i in range(5000)]
+    clean_tag_uncached = clean_tag.__wrapped__
+
+    renderer = NoteRenderer(OBSIDIAN_CATEGORIES)
+    learning_results = [make_result(i, 'learning') for i in range(1000)]
+    knowledge_results = [make_result(i, 'knowledge') for i in range(1000)]
+
+    return {
+        'parse_gemini_learning': measure(
+            lambda _: system._parse_gemini_response(learning, 'learning'), budget, max_ops=100000),
+        'parse_gemini_knowledge': measure(
+            lambda _: system._parse_gemini_response(knowledge, 'knowledge'), budget, max_ops=100000),
+        'clean_tag_uncached': measure(lambda i: clean_tag_uncached(tags[i % len(tags)]), budget, max_ops=200000),
+        'clean_tag_cached': measure(lambda i: clean_tag(tags[i % 100]), budget, max_ops=200000),
+        'render_note_learning': measure(
+            lambda i: renderer.render(learning_results[i % 1000]), budget, max_ops=100000),
+        'render_note_knowledge': measure(
+            lambda i: renderer.render(knowledge_results[i % 1000]), budget, max_ops=100000),
+    }
+
+
+def scaling_exponents(scaling: Dict[str, List[Dict]]) -> Dict[str, List[Optional[float]]]:
+    """Pente log-log du temps moyen par opération entre tailles consécutives"""
+    exponents = {}
+    for name, points in scaling.items():
+        slopes = []
+        for a, b in zip(points, points[1:]):
+            if a['mean_ms'] > 0 and b['mean_ms'] > 0:
+                slopes.append(round(math.log(b['mean_ms'] / a['mean_ms']) / math.log(b['size'] / a['size']), 2))
+            else:
+                slopes.append(None)
+        exponents[name] = slopes
+    return exponents
+
+
+def find_regressions(report: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Opérations dont le débit a baissé de plus de `tolerance` par rapport à la référence"""
+    regressions = []
+
+    def compare(name, size, current, previous):
+        if not current.get('ops_per_sec') or not previous.get('ops_per_sec'):
+            return
+        ratio = current['ops_per_sec'] / previous['ops_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append({'benchmark': name, 'size': size, 'ratio': round(ratio, 3),
+                                'ops_per_sec': current['ops_per_sec'], 'baseline_ops_per_sec': previous['ops_per_sec']})
+
+    for name, points in report['scaling'].items():
+        previous_points = {point['size']: point for point in baseline.get('scaling', {}).get(name, [])}
+        for point in points:
+            if point['size'] in previous_points:
+                compare(name, point['size'], point, previous_points[point['size']])
+    for name, result in report['micro'].items():
+        if name in baseline.get('micro', {}):
+            compare(name, None, result, baseline['micro'][name])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks stockage et rendu sur bibliothèques synthétiques")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="Tailles de bibliothèque séparées par des virgules")
+    parser.add_argument('--budget', type=float, default=2.0, help="Secondes de mesure par opération et par taille")
+    parser.add_argument('--output', help="Fichier JSON du rapport (sinon sortie standard)")
+    parser.add_argument('--baseline', help="Rapport de référence pour détecter les régressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Perte de débit tolérée (fraction)")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    # Les méthodes du système impriment leur progression: on la garde sur stderr
+    real_stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        scaling: Dict[str, List[Dict]] = {}
+        with tempfile.TemporaryDirectory(prefix='bench_suite_') as workdir:
+            for size in sizes:
+                print(f"📚 Bibliothèque synthétique: {size} vidéos")
+                for name, result in bench_library(size, args.budget, Path(workdir)).items():
+                    scaling.setdefault(name, []).append({'size': size, **result})
+        print("⏱️ Micro-benchmarks (parse, tags, rendu)")
+        micro = bench_micro(args.budget)
+    finally:
+        sys.stdout = real_stdout
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'budget_seconds': args.budget,
+        },
+        'sizes': sizes,
+        'scaling': scaling,
+        'scaling_exponents': scaling_exponents(scaling),
+        'micro': micro,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = find_regressions(report, json.load(f), args.tolerance)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+        print(f"💾 Rapport écrit: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
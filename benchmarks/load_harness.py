@@ -0,0 +1,437 @@
+# benchmarks/load_harness.py - Test de charge de bout en bout, avec YouTube et Gemini simulés en local
+#
+# Usage: python benchmarks/load_harness.py [--server flask|asgi] [--clients 8] [--duration 30]
+#                                          [--gemini-latency-ms 800] [--youtube-latency-ms 80]
+#                                          [--error-rate 0.01] [--throttle-rate 0.02] [--output charge.json]
+#
+# Un serveur de substitution imite la liste des vidéos likées, videos.rate et la génération Gemini
+# (latence, erreurs 5xx et 429 injectées). L'application est lancée dans un dossier temporaire,
+# pointée sur ce serveur (YOUTUBE_API_ENDPOINT, GEMINI_API_ENDPOINT), puis des clients concurrents
+# enchaînent /api/sync, /process-video et les lectures /api/*. Aucun quota réel n'est consommé.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import LEARNING_RESPONSE, KNOWLEDGE_RESPONSE, TOPICS
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+CATEGORIES = ['ai_technique_learning', 'tech_general_learning', 'tech_general_knowledge', 'culture_g_knowledge']
+READ_ENDPOINTS = [
+    ('api_staging', '/api/staging?limit=20'),
+    ('api_processed', '/api/processed?limit=20'),
+    ('search', '/search?q=comprendre'),
+    ('stats', '/stats'),
+]
+
+
+class FaultProfile:
+    def __init__(self, latency_ms: float, jitter: float = 0.3, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Comportement simulé d'un service distant
+
+        Args:
+            latency_ms: Latence moyenne
+            jitter: Variation relative de la latence (0.3 = ±30 %)
+            error_rate: Fraction des appels en erreur 500
+            throttle_rate: Fraction des appels refusés en 429 (Retry-After: 1)
+        """
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """(délai en secondes, statut d'erreur injecté ou None)"""
+        with self._lock:
+            delay = self.latency_ms / 1000 * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, 500
+        return max(delay, 0.0), None
+
+
+class StandInState:
+    def __init__(self, liked_count: int, youtube: FaultProfile, gemini: FaultProfile):
+        """Vidéos likées simulées (un unlike les retire) et compteurs d'appels par opération et statut"""
+        self.youtube = youtube
+        self.gemini = gemini
+        self.liked = {f"load{i:07d}": i for i in range(liked_count)}  # ordre d'insertion = ordre des likes
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, operation: str, status: int):
+        with self._lock:
+            self.calls[(operation, status)] += 1
+
+    def liked_items(self, limit: int) -> List[Dict]:
+        with self._lock:
+            video_ids = list(self.liked.items())[:limit]
+        return [youtube_item(video_id, i) for video_id, i in video_ids]
+
+    def unlike(self, video_id: str):
+        with self._lock:
+            self.liked.pop(video_id, None)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            calls = dict(self.calls)
+            remaining = len(self.liked)
+        summary: Dict[str, Dict] = {}
+        for (operation, status), count in sorted(calls.items()):
+            summary.setdefault(operation, {})[str(status)] = count
+        summary['liked_remaining'] = remaining
+        return summary
+
+
+def youtube_item(video_id: str, i: int) -> Dict:
+    """Élément de la réponse videos.list (parties id, snippet, contentDetails)"""
+    topic = TOPICS[i % len(TOPICS)]
+    return {
+        'kind': 'youtube#video',
+        'id': video_id,
+        'snippet': {
+            'title': f"Comprendre {topic} en 20 minutes (partie {i})",
+            'description': f"Une introduction à {topic}. " * 12,
+            'channelTitle': f"Chaîne {i % 97}",
+            'publishedAt': '2026-01-15T10:30:00Z',
+            'thumbnails': {'medium': {'url': f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"}},
+        },
+        'contentDetails': {'duration': 'PT20M13S'},
+    }
+
+
+def gemini_text(prompt: str) -> str:
+    """Réponse au format attendu par _parse_gemini_response, selon le type de prompt"""
+    if 'RÉSUMÉ DÉTAILLÉ' in prompt.upper():
+        return LEARNING_RESPONSE.format(summary="Résumé détaillé de la vidéo. " * 40,
+                                        applications="Applications pratiques. " * 10)
+    return KNOWLEDGE_RESPONSE.format(summary="Résumé de la vidéo. " * 30)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Optional[Dict], headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fault(self, operation: str, profile: FaultProfile) -> bool:
+        """Applique latence et erreurs injectées; True si la réponse est déjà envoyée"""
+        delay, status = profile.draw()
+        time.sleep(delay)
+        if status is None:
+            return False
+        self.server.state.count(operation, status)
+        reason = 'RESOURCE_EXHAUSTED' if status == 429 else 'INTERNAL'
+        headers = {'Retry-After': '1'} if status == 429 else None
+        self._send_json(status, {'error': {'code': status, 'message': f"Injecté: {reason}", 'status': reason}}, headers)
+        return True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        state: StandInState = self.server.state
+        if url.path == '/youtube/v3/videos':
+            if self._fault('youtube.videos.list', state.youtube):
+                return
+            limit = int(parse_qs(url.query).get('maxResults', ['5'])[0])
+            state.count('youtube.videos.list', 200)
+            self._send_json(200, {'kind': 'youtube#videoListResponse', 'items': state.liked_items(limit)})
+            return
+        self._send_json(404, {'error': {'code': 404, 'message': url.path}})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        state: StandInState = self.server.state
+        if url.path == '/youtube/v3/videos/rate':
+            if self._fault('youtube.videos.rate', state.youtube):
+                return
+            video_id = parse_qs(url.query).get('id', [''])[0]
+            state.unlike(video_id)
+            state.count('youtube.videos.rate', 204)
+            self._send_json(204, None)
+            return
+        if url.path.endswith(':generateContent'):
+            if self._fault('gemini.generateContent', state.gemini):
+                return
+            request = json.loads(body or b'{}')
+            prompt = ''.join(part.get('text', '') for content in request.get('contents', [])
+                             for part in content.get('parts', []))
+            state.count('gemini.generateContent', 200)
+            self._send_json(200, {
+                'candidates': [{
+                    'content': {'parts': [{'text': gemini_text(prompt)}], 'role': 'model'},
+                    'finishReason': 'STOP',
+                    'index': 0,
+                }],
+                'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': 400},
+            })
+            return
+        self._send_json(404, {'error': {'code': 404, 'message': url.path}})
+
+
+def start_stand_ins(state: StandInState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name='stand-ins', daemon=True).start()
+    return server
+
+
+def start_app(args, workdir: Path, stand_in_url: str) -> subprocess.Popen:
+    """Lance l'application dans workdir (données, coffre et token OAuth factice isolés)"""
+    data_dir = workdir / "youtube_data"
+    data_dir.mkdir(parents=True)
+    # Token sans expiration: aucun rafraîchissement OAuth n'est tenté
+    (data_dir / "oauth_token.json").write_text(json.dumps({
+        'token': 'load-test', 'refresh_token': None, 'token_uri': 'https://oauth2.googleapis.com/token',
+        'client_id': 'load-test', 'client_secret': 'load-test',
+        'scopes': ['https://www.googleapis.com/auth/youtube.readonly'], 'expiry': None
+    }))
+    (workdir / "vault" / "YouTube Knowledge").mkdir(parents=True)
+
+    env = dict(os.environ,
+               YOUTUBE_CLIENT_ID='load-test', YOUTUBE_CLIENT_SECRET='load-test', GOOGLE_AI_API_KEY='load-test',
+               YOUTUBE_API_ENDPOINT=stand_in_url,
+               GEMINI_API_ENDPOINT=stand_in_url,
+               GEMINI_RATE_PER_MINUTE=str(args.gemini_rpm),
+               OBSIDIAN_VAULT_PATH=str(workdir / "vault"),
+               OBSIDIAN_WATCH_INTERVAL='0',
+               PYTHONPATH=str(REPO_DIR))
+    if args.server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+                   '--port', str(args.port), '--workers', str(args.workers), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-c',
+                   "from app_liked_system import app; "
+                   f"app.run(host='127.0.0.1', port={args.port}, threaded=True)"]
+    log = open(workdir / "app.log", 'w')
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"L'application s'est arrêtée (code {process.returncode})")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/health')
+            if conn.getresponse().status < 500:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("L'application ne répond pas sur /health")
+
+
+class Recorder:
+    def __init__(self):
+        """Latences et statuts par endpoint, partagés par tous les clients"""
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, status: int, seconds: float):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            self.statuses.setdefault(name, Counter())[status] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        total = errors = 0
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            statuses = self.statuses[name]
+            failed = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            total += len(ordered)
+            errors += failed
+            endpoints[name] = {
+                'count': len(ordered),
+                'throughput_rps': round(len(ordered) / elapsed, 2),
+                'errors': failed,
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                **{f"p{q}_ms": round(ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000, 1)
+                   for q in (50, 95, 99)},
+                'max_ms': round(ordered[-1] * 1000, 1),
+            }
+        return {
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2),
+            'errors': errors,
+            'endpoints': endpoints,
+        }
+
+
+class Workload:
+    def __init__(self, process_ratio: float):
+        """File partagée des vidéos en staging; une seule synchronisation à la fois"""
+        self.process_ratio = process_ratio
+        self.queue: deque = deque()
+        self.sync_lock = threading.Lock()
+
+    def take(self) -> Optional[str]:
+        try:
+            return self.queue.popleft()
+        except IndexError:
+            return None
+
+
+class LoadClient(threading.Thread):
+    def __init__(self, index: int, port: int, workload: Workload, recorder: Recorder, deadline: float):
+        super().__init__(name=f"client-{index}", daemon=True)
+        self.port = port
+        self.workload = workload
+        self.recorder = recorder
+        self.deadline = deadline
+        self.rng = random.Random(index)
+        self.conn = None
+
+    def call(self, name: str, method: str, path: str, payload: Optional[Dict] = None) -> Tuple[int, bytes]:
+        """Requête sur une connexion persistante (rouverte après erreur)"""
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            status, data = 0, b''
+        self.recorder.record(name, status, time.perf_counter() - start)
+        return status, data
+
+    def sync(self):
+        status, data = self.call('api_sync', 'POST', '/api/sync')
+        if status == 200:
+            videos = json.loads(data).get('videos', [])
+            self.workload.queue.extend(video['video_id'] for video in videos)
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            if self.rng.random() < self.workload.process_ratio:
+                video_id = self.workload.take()
+                if video_id is not None:
+                    self.call('process_video', 'POST', '/process-video',
+                              {'video_id': video_id, 'category': self.rng.choice(CATEGORIES)})
+                    continue
+                if self.workload.sync_lock.acquire(blocking=False):
+                    try:
+                        self.sync()
+                    finally:
+                        self.workload.sync_lock.release()
+                    continue
+            name, path = self.rng.choice(READ_ENDPOINTS)
+            self.call(name, 'GET', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge de bout en bout avec YouTube et Gemini simulés")
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--workers', type=int, default=1, help="Workers uvicorn (mode asgi)")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help="Secondes de charge")
+    parser.add_argument('--process-ratio', type=float, default=0.5,
+                        help="Part des actions qui traitent une vidéo (le reste: lectures /api/*)")
+    parser.add_argument('--liked', type=int, default=2000, help="Vidéos likées simulées")
+    parser.add_argument('--youtube-latency-ms', type=float, default=80.0)
+    parser.add_argument('--gemini-latency-ms', type=float, default=800.0)
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Fraction d'erreurs 500 injectées")
+    parser.add_argument('--throttle-rate', type=float, default=0.02, help="Fraction de 429 injectées")
+    parser.add_argument('--gemini-rpm', type=float, default=6000, help="GEMINI_RATE_PER_MINUTE de l'application")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Fichier JSON du rapport (sinon sortie standard)")
+    parser.add_argument('--keep-workdir', action='store_true', help="Conserver données, coffre et app.log")
+    args = parser.parse_args()
+
+    state = StandInState(
+        args.liked,
+        youtube=FaultProfile(args.youtube_latency_ms, args.jitter, args.error_rate, args.throttle_rate, args.seed),
+        gemini=FaultProfile(args.gemini_latency_ms, args.jitter, args.error_rate, args.throttle_rate, args.seed + 1),
+    )
+    stand_ins = start_stand_ins(state)
+    stand_in_url = f"http://127.0.0.1:{stand_ins.server_address[1]}"
+    workdir = Path(tempfile.mkdtemp(prefix='load_harness_'))
+    process = start_app(args, workdir, stand_in_url)
+    try:
+        wait_ready(args.port, process)
+        print(f"🚀 {args.server} prêt, {args.clients} clients pendant {args.duration:.0f} s "
+              f"(substituts sur {stand_in_url})", file=sys.stderr)
+
+        recorder = Recorder()
+        workload = Workload(args.process_ratio)
+        started = time.monotonic()
+        clients = [LoadClient(i, args.port, workload, recorder, started + args.duration)
+                   for i in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        stand_ins.shutdown()
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'keep_workdir')},
+        'elapsed_seconds': round(elapsed, 2),
+        **recorder.report(elapsed),
+        'stand_ins': state.summary(),
+    }
+    if args.keep_workdir:
+        report['workdir'] = str(workdir)
+        print(f"📁 Données conservées: {workdir}", file=sys.stderr)
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+        print(f"💾 Rapport écrit: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
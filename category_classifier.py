@@ -0,0 +1,177 @@
+# category_classifier.py - Prédiction locale de catégorie (naive Bayes sur features hachées)
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from json_store import atomic_write_json
+
+_WORD = re.compile(r'\w{2,}')
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dim: int) -> str:
+    """Colonne hachée d'une feature (clé JSON)"""
+    digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+    return str(int.from_bytes(digest, 'big') % dim)
+
+
+def video_features(video: Dict) -> List[str]:
+    """Mots et bigrammes du titre, plus la chaîne (feature très discriminante)"""
+    text = unicodedata.normalize('NFD', video.get('title') or '')
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn').lower()
+    words = _WORD.findall(text)
+    features = [f"w:{word}" for word in words]
+    features.extend(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    channel = (video.get('channel') or '').strip().lower()
+    if channel:
+        features.append(f"c:{channel}")
+    return features
+
+
+class CategoryClassifier:
+    def __init__(self, model_file: Path, dim: int = 1 << 20, alpha: float = 0.5, save_interval: float = 60.0):
+        """
+        Classifieur naive Bayes multinomial entraîné sur l'historique de traitement
+
+        L'historique étant en ajout seul, le modèle retient le nombre d'entrées
+        déjà apprises: sync() n'apprend que les nouvelles, en mémoire. Le modèle
+        est écrit par save_if_due(), au plus une fois par save_interval secondes.
+
+        Args:
+            model_file: Fichier JSON du modèle (compteurs par catégorie)
+            dim: Nombre de colonnes du hashing trick
+            alpha: Lissage de Laplace
+            save_interval: Délai minimum entre deux écritures du modèle (secondes)
+        """
+        self.model_file = Path(model_file)
+        self.dim = dim
+        self.alpha = alpha
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        self._load()
+        self._saved_count = self.trained_count
+        self._saved_at = time.monotonic()
+
+    def _reset(self):
+        self.trained_count = 0
+        self.class_counts: Dict[str, int] = {}
+        self.feature_totals: Dict[str, int] = {}
+        self.feature_counts: Dict[str, Dict[str, int]] = {}
+        self.vocabulary = set()
+
+    def _load(self):
+        self._reset()
+        try:
+            with open(self.model_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('dim') != self.dim:
+            return
+        self.trained_count = data.get('trained_count', 0)
+        self.class_counts = data.get('class_counts', {})
+        self.feature_totals = data.get('feature_totals', {})
+        self.feature_counts = data.get('feature_counts', {})
+        for counts in self.feature_counts.values():
+            self.vocabulary.update(counts)
+
+    def save(self):
+        if not self.model_file.parent.exists():
+            return
+        with self._lock:
+            atomic_write_json(self.model_file, {
+                'dim': self.dim,
+                'trained_count': self.trained_count,
+                'class_counts': self.class_counts,
+                'feature_totals': self.feature_totals,
+                'feature_counts': self.feature_counts,
+            }, indent=None)
+            self._saved_count = self.trained_count
+            self._saved_at = time.monotonic()
+
+    def save_if_due(self) -> bool:
+        """
+        Écrit le modèle s'il a appris depuis la dernière écriture et que save_interval est écoulé
+
+        Returns:
+            bool: True si le modèle a été écrit
+        """
+        with self._lock:
+            if self.trained_count == self._saved_count:
+                return False
+            if time.monotonic() - self._saved_at < self.save_interval:
+                return False
+            self.save()
+            return True
+
+    def learn(self, video: Dict, category: str):
+        """Ajoute un exemple étiqueté"""
+        buckets = [_bucket(feature, self.dim) for feature in video_features(video)]
+        if not buckets:
+            return
+        with self._lock:
+            self.class_counts[category] = self.class_counts.get(category, 0) + 1
+            counts = self.feature_counts.setdefault(category, {})
+            for bucket in buckets:
+                counts[bucket] = counts.get(bucket, 0) + 1
+            self.feature_totals[category] = self.feature_totals.get(category, 0) + len(buckets)
+            self.vocabulary.update(buckets)
+
+    def sync(self, entries: List[Dict], categories: Optional[List[str]] = None) -> int:
+        """
+        Apprend en mémoire les entrées de processed_videos.json pas encore vues (aucune écriture)
+
+        Args:
+            entries: Historique complet (en ajout seul)
+            categories: Catégories apprises (les autres, ex: 'skipped', sont ignorées)
+        Returns:
+            int: Nombre d'exemples appris
+        """
+        with self._lock:
+            if len(entries) < self.trained_count:
+                # Historique réécrit (restauration, nettoyage): réapprendre depuis le début
+                self._reset()
+            if len(entries) == self.trained_count:
+                return 0
+            learned = 0
+            for entry in entries[self.trained_count:]:
+                category = entry.get('category')
+                result = entry.get('result')
+                if isinstance(result, dict) and (categories is None or category in categories):
+                    self.learn(result, category)
+                    learned += 1
+            self.trained_count = len(entries)
+        return learned
+
+    def predict(self, video: Dict, categories: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Catégorie la plus probable et sa probabilité a posteriori
+
+        Returns:
+            Dict: {'category', 'confidence'}, None si le modèle n'a rien appris
+        """
+        buckets = [_bucket(feature, self.dim) for feature in video_features(video)]
+        with self._lock:
+            classes = [c for c in self.class_counts if categories is None or c in categories]
+            total_docs = sum(self.class_counts[c] for c in classes)
+            if not classes or not total_docs:
+                return None
+            vocabulary_size = max(len(self.vocabulary), 1)
+            scores = {}
+            for category in classes:
+                counts = self.feature_counts.get(category, {})
+                denominator = math.log(self.feature_totals.get(category, 0) + self.alpha * vocabulary_size)
+                score = math.log(self.class_counts[category] / total_docs)
+                for bucket in buckets:
+                    score += math.log(counts.get(bucket, 0) + self.alpha) - denominator
+                scores[category] = score
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return {'category': best, 'confidence': round(1.0 / normalizer, 3)}
@@ -0,0 +1,446 @@
+# json_store.py - Stockage JSON sûr entre plusieurs process (verrou + écriture atomique)
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import CACHE_REQUESTS, STORE_OPERATION_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Verrou exclusif inter-process basé sur un fichier .lock"""
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = Path(lock_path)
+        self._fd = None
+
+    def acquire(self):
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def atomic_write_text(path: Path, content: str):
+    """Écrit un fichier via un fichier temporaire + rename (jamais de fichier tronqué)"""
+    atomic_write_bytes(path, content.encode('utf-8'))
+
+
+def atomic_write_bytes(path: Path, content: bytes):
+    """Version binaire de atomic_write_text"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: Path, data, indent: Optional[int] = 2):
+    """Sérialise en JSON puis écrit de façon atomique"""
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def merge_json_file(path: Path, merge: Callable[[Dict], None], indent: Optional[int] = None):
+    """
+    Relit un document JSON sous verrou inter-process, y reporte les changements locaux puis l'écrit
+
+    Pour les index gardés en mémoire par chaque worker: les entrées modifiées
+    par un autre process depuis le chargement ne sont pas écrasées.
+
+    Args:
+        path: Fichier JSON
+        merge: Applique les changements locaux au document relu (modifié sur place)
+        indent: Indentation JSON
+    """
+    path = Path(path)
+    with FileLock(path.with_name(path.name + '.lock')):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        merge(data)
+        atomic_write_json(path, data, indent=indent)
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Signature disque d'un fichier (mtime, taille, inode), None s'il n'existe pas"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def apply_changes(target: Dict, source: Dict, keys):
+    """Reporte dans target les clés modifiées localement (valeur de source, ou suppression)"""
+    for key in keys:
+        if key in source:
+            target[key] = source[key]
+        else:
+            target.pop(key, None)
+
+
+class JsonStore:
+    def __init__(self, path: Path, default_factory: Callable[[], Dict]):
+        """
+        Document JSON partagé entre workers (gunicorn, etc.)
+
+        Les lectures passent par un cache mémoire invalidé dès que le fichier
+        change sur disque (mtime, taille, inode). Les modifications se font
+        sous verrou exclusif et sont écrites de façon atomique.
+
+        Args:
+            path: Fichier JSON
+            default_factory: Construit le document vide
+        """
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.default_factory = default_factory
+        self._cache = None
+        self._signature = None
+        self._thread_lock = threading.RLock()
+
+    def _disk_signature(self) -> Optional[Tuple[int, int, int]]:
+        return file_signature(self.path)
+
+    def _load(self, signature) -> Dict:
+        """Recharge le document si le cache est périmé"""
+        if self._cache is not None and signature == self._signature:
+            CACHE_REQUESTS.inc(cache='json_store', result='hit')
+            return self._cache
+        CACHE_REQUESTS.inc(cache='json_store', result='miss')
+        if signature is None:
+            data = self.default_factory()
+        else:
+            try:
+                with STORE_OPERATION_SECONDS.time(store=self.path.name, operation='read'):
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Lecture impossible de {self.path.name}: {e}")
+                data = self.default_factory()
+        self._cache = data
+        self._signature = signature
+        return data
+
+    def read(self) -> Dict:
+        """
+        Retourne le document courant (à traiter en lecture seule)
+
+        Returns:
+            Dict: Contenu du fichier, ou le document par défaut
+        """
+        with self._thread_lock:
+            return self._load(self._disk_signature())
+
+    @contextmanager
+    def transaction(self):
+        """
+        Lecture-modification-écriture protégée par verrou inter-process
+
+        Usage:
+            with store.transaction() as data:
+                data['videos'].append(video)
+        """
+        with self._thread_lock, FileLock(self.lock_path):
+            data = self._load(self._disk_signature())
+            try:
+                yield data
+                self._write_locked(data)
+            except BaseException:
+                # Le document en mémoire a pu être modifié partiellement
+                self._cache = None
+                self._signature = None
+                raise
+
+    def write(self, data: Dict):
+        """Remplace entièrement le document"""
+        with self._thread_lock, FileLock(self.lock_path):
+            self._write_locked(data)
+
+    def _write_locked(self, data: Dict):
+        with STORE_OPERATION_SECONDS.time(store=self.path.name, operation='write'):
+            atomic_write_json(self.path, data)
+        self._cache = data
+        self._signature = self._disk_signature()
+
+    def delete(self):
+        """Supprime le document"""
+        with self._thread_lock, FileLock(self.lock_path):
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._cache = None
+            self._signature = None
+
+
+def log_path_for(path: Path) -> Path:
+    """Journal associé à un instantané: processed_videos.json -> processed_videos.log.jsonl"""
+    path = Path(path)
+    return path.with_name(path.stem + '.log.jsonl')
+
+
+def read_log_entries(log_path: Path, generation: int) -> List[Dict]:
+    """
+    Entrées d'un journal JSON Lines, si sa génération est celle de l'instantané
+
+    Un journal d'une génération antérieure a déjà été replié dans l'instantané
+    (compactage interrompu avant la remise à zéro du journal): il est ignoré.
+    Une dernière ligne incomplète (écriture en cours) est ignorée aussi.
+    """
+    try:
+        with open(log_path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return []
+    lines = content[:content.rfind(b'\n') + 1].splitlines()
+    if not lines or json.loads(lines[0]).get('generation') != generation:
+        return []
+    return _parse_log_lines(lines[1:], log_path)
+
+
+def _parse_log_lines(lines: List[bytes], log_path: Path) -> List[Dict]:
+    entries = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            print(f"⚠️ Ligne illisible ignorée dans {Path(log_path).name}")
+    return entries
+
+
+class AppendLogStore:
+    def __init__(self, path: Path, list_key: str, compact_every: int = 1000,
+                 compactor: Optional[Callable[[List[Dict]], List[Dict]]] = None,
+                 upgrade: Optional[Callable[[Dict], List[Dict]]] = None):
+        """
+        Liste JSON en ajout seul: instantané JSON + journal JSON Lines
+
+        Un ajout écrit une ligne à la fin du journal (O(1), sous verrou
+        inter-process). Toutes les compact_every entrées, le journal est replié
+        dans l'instantané, puis remis à zéro: le coût d'une réécriture complète
+        est amorti sur compact_every ajouts. Les lectures ne relisent que la fin
+        du journal ajoutée depuis la lecture précédente.
+
+        L'instantané garde le format {list_key: [...]}, plus 'log_generation';
+        le journal commence par {"generation": n}, la génération de l'instantané
+        dont il prolonge la liste.
+
+        Args:
+            path: Fichier JSON de l'instantané
+            list_key: Clé de la liste dans l'instantané
+            compact_every: Nombre d'entrées du journal déclenchant un compactage
+            compactor: Transforme la liste au compactage (ex: garder la dernière entrée par clé)
+            upgrade: Liste tirée d'un instantané d'un ancien format (sans list_key)
+        """
+        self.path = Path(path)
+        self.log_path = log_path_for(self.path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.list_key = list_key
+        self.compact_every = compact_every
+        self.compactor = compactor
+        self.upgrade = upgrade
+        self.snapshot = JsonStore(self.path, lambda: {list_key: []})
+        self._thread_lock = threading.RLock()
+        # Change à chaque rechargement complet (la liste n'est alors plus un prolongement)
+        self.epoch = 0
+        self._reset()
+
+    def _reset(self):
+        self._snapshot_data = None
+        self._generation = 0
+        self._items: List[Dict] = []
+        self._log_inode = None
+        self._log_offset = 0
+        self._log_stale = False
+        self.log_count = 0
+        self.epoch += 1
+
+    def invalidate(self):
+        """Oublie tout l'état en mémoire: la prochaine lecture repart du disque"""
+        with self._thread_lock:
+            self.snapshot._cache = None
+            self.snapshot._signature = None
+            self._reset()
+
+    def _base_items(self, data: Dict) -> List[Dict]:
+        if self.list_key not in data and self.upgrade is not None:
+            return self.upgrade(data)
+        return data.get(self.list_key, [])
+
+    def _refresh(self) -> List[Dict]:
+        """Met la liste en mémoire à jour (instantané si changé, puis fin du journal)"""
+        data = self.snapshot.read()
+        if data is not self._snapshot_data:
+            self._reset()
+            self._snapshot_data = data
+            self._generation = data.get('log_generation', 0)
+            self._items = list(self._base_items(data))
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            if self.log_count:
+                self._snapshot_data = None  # journal supprimé: repartir de l'instantané
+                return self._refresh()
+            return self._items
+        if st.st_ino != self._log_inode:
+            if self._log_inode is not None:
+                self._snapshot_data = None  # journal recommencé par un autre process
+                return self._refresh()
+            self._log_inode = st.st_ino
+        if st.st_size <= self._log_offset:
+            return self._items
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read(st.st_size - self._log_offset)
+        end = chunk.rfind(b'\n') + 1
+        lines = chunk[:end].splitlines()
+        if self._log_offset == 0 and lines:
+            header = json.loads(lines.pop(0))
+            self._log_stale = header.get('generation') != self._generation
+        self._log_offset += end
+        if lines and not self._log_stale:
+            # Nouvelle liste: un lecteur qui garde l'ancienne la voit inchangée
+            entries = _parse_log_lines(lines, self.log_path)
+            self._items = self._items + entries
+            self.log_count += len(entries)
+        return self._items
+
+    def read(self) -> List[Dict]:
+        """
+        Liste courante (à traiter en lecture seule)
+
+        Returns:
+            List[Dict]: Entrées de l'instantané suivies de celles du journal
+        """
+        with self._thread_lock:
+            return self._refresh()
+
+    @contextmanager
+    def appending(self):
+        """
+        Ajouts sous verrou exclusif, écrits en une seule fois à la sortie
+
+        Usage:
+            with store.appending() as (items, pending):
+                if video_id not in {item['video_id'] for item in items}:
+                    pending.append(entry)
+        """
+        with self._thread_lock, FileLock(self.lock_path):
+            items = self._refresh()
+            pending: List[Dict] = []
+            yield items, pending
+            if pending:
+                self._append_locked(pending)
+
+    def append(self, item: Dict):
+        """Ajoute une entrée (une ligne de journal)"""
+        with self.appending() as (_, pending):
+            pending.append(item)
+
+    def _append_locked(self, entries: List[Dict]):
+        if self._log_stale or self._log_offset == 0:
+            # Journal absent, sans en-tête complet ou d'une génération déjà repliée: le recommencer
+            atomic_write_text(self.log_path, json.dumps({'generation': self._generation}) + '\n')
+            self._log_inode = None
+            self._log_offset = 0
+            self._log_stale = False
+            self._refresh()
+        elif os.path.getsize(self.log_path) > self._log_offset:
+            # Ligne incomplète laissée par un écrivain interrompu (nous tenons le verrou)
+            os.truncate(self.log_path, self._log_offset)
+        payload = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+        with STORE_OPERATION_SECONDS.time(store=self.log_path.name, operation='append'):
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        self._refresh()
+        if self.log_count >= self.compact_every:
+            self._compact_locked()
+
+    def compact(self):
+        """Replie le journal dans l'instantané"""
+        with self._thread_lock, FileLock(self.lock_path):
+            self._refresh()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        items = self._items
+        if self.compactor is not None:
+            items = self.compactor(items)
+        generation = self._generation + 1
+        data = {'log_generation': generation, self.list_key: items}
+        # Instantané d'abord: si le process s'arrête avant la remise à zéro du journal,
+        # celui-ci porte une génération périmée et sera ignoré
+        self.snapshot._write_locked(data)
+        atomic_write_text(self.log_path, json.dumps({'generation': generation}) + '\n')
+        self._reset()
+        self._refresh()
+
+    def replace(self, items: List[Dict]):
+        """Remplace toute la liste (instantané neuf, journal vide)"""
+        with self._thread_lock, FileLock(self.lock_path):
+            self._refresh()
+            self._items = list(items)
+            compactor, self.compactor = self.compactor, None
+            try:
+                self._compact_locked()
+            finally:
+                self.compactor = compactor
+
+    def delete(self):
+        """Supprime l'instantané et le journal"""
+        with self._thread_lock, FileLock(self.lock_path):
+            for path in (self.path, self.log_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.invalidate()
@@ -0,0 +1,340 @@
+# metrics.py - Compteurs, jauges et histogrammes au format texte Prometheus (sans dépendance)
+import abc
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Lignes d'échantillons au format texte Prometheus"""
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        """Valeurs calculées au moment de la collecte: function() -> [(labels, valeur)]"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._function is not None:
+            try:
+                for labels, value in self._function():
+                    values[self._key(labels)] = value
+            except Exception as e:
+                print(f"⚠️ Collecte de {self.name} impossible: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[LabelValues, List] = {}  # clé -> [compteurs par bucket, somme, total]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][position] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {repr(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Ensemble des métriques du process (un worker = une cible de collecte)"""
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def summary(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99), window: int = 1000) -> 'RollingSummary':
+        return self._register(RollingSummary(name, documentation, labelnames, quantiles, window))
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+EXTERNAL_CALL_SECONDS = registry.histogram(
+    'external_call_duration_seconds', "Durée des appels externes (Gemini, YouTube, OAuth)",
+    ('service', 'operation', 'outcome'))
+EXTERNAL_CALLS_IN_FLIGHT = registry.gauge(
+    'external_calls_in_flight', "Appels externes en cours", ('service', 'operation'))
+CACHE_REQUESTS = registry.counter(
+    'cache_requests_total', "Consultations de cache par résultat (hit/miss)", ('cache', 'result'))
+STORE_OPERATION_SECONDS = registry.histogram(
+    'store_operation_duration_seconds', "Lectures disque et écritures des stores JSON", ('store', 'operation'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+NOTE_WRITES = registry.counter(
+    'note_writes_total', "Notes et MOCs demandés au NoteWriter (written/unchanged)", ('result',))
+NOTE_WRITE_SECONDS = registry.histogram(
+    'note_write_duration_seconds', "Durée d'écriture d'une note (empreinte comprise)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+QUEUE_DEPTH = registry.gauge(
+    'queue_depth', "Profondeur des files (staging par compte, attente du limiteur Gemini)", ('queue', 'account'))
+
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """Mesure un appel externe: durée par issue (ok/error) et appels en cours"""
+    start = time.perf_counter()
+    outcome = 'error'
+    with EXTERNAL_CALLS_IN_FLIGHT.track_inprogress(service=service, operation=operation):
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            EXTERNAL_CALL_SECONDS.observe(time.perf_counter() - start,
+                                          service=service, operation=operation, outcome=outcome)
+
+
+class RollingSummary(_Metric):
+    kind = 'summary'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99), window: int = 1000):
+        """Quantiles sur les `window` dernières observations de chaque série (fenêtre glissante)"""
+        super().__init__(name, documentation, labelnames)
+        self.quantiles = quantiles
+        self.window = window
+        self._series: Dict[LabelValues, List] = {}  # clé -> [deque des valeurs, somme, total]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [deque(maxlen=self.window), 0.0, 0]
+            series[0].append(value)
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[LabelValues, Dict]:
+        """{labels: {'p50': ..., 'p95': ..., 'p99': ..., 'count': ...}} sur la fenêtre courante"""
+        with self._lock:
+            series = {key: (sorted(values), count) for key, (values, _, count) in self._series.items()}
+        snapshot = {}
+        for key, (values, count) in series.items():
+            entry = {'count': count, 'window': len(values)}
+            for quantile in self.quantiles:
+                entry[f"p{int(quantile * 100)}"] = values[min(len(values) - 1, int(quantile * len(values)))]
+            snapshot[key] = entry
+        return snapshot
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            totals = {key: (total, count) for key, (_, total, count) in self._series.items()}
+        lines = []
+        for key, entry in sorted(self.snapshot().items()):
+            for quantile in self.quantiles:
+                q = f'quantile="{quantile}"'
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key, q)} "
+                             f"{repr(entry[f'p{int(quantile * 100)}'])}")
+            labels = _format_labels(self.labelnames, key)
+            total, count = totals[key]
+            lines.append(f"{self.name}_sum{labels} {repr(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+STAGE_SECONDS = registry.summary(
+    'request_stage_duration_seconds', "Durée de chaque étape d'une requête (fenêtre glissante)",
+    ('route', 'stage'))
+
+
+class StageTimer:
+    def __init__(self, route: str):
+        """
+        Chronométrage des étapes d'une requête
+
+        Usage:
+            timer = StageTimer('process_video')
+            with timer.stage('gemini'):
+                ...
+            timer.finish(status=200)
+        """
+        self.route = route
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def server_timing(self) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en ms)"""
+        return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+    def finish(self, status: int, **fields) -> Dict:
+        """Alimente les quantiles par étape et écrit une ligne de log JSON"""
+        total = time.perf_counter() - self.started
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, route=self.route, stage=name)
+        STAGE_SECONDS.observe(total, route=self.route, stage='total')
+        record = {
+            'event': 'stage_timings',
+            'route': self.route,
+            'status': status,
+            'total_ms': round(total * 1000, 1),
+            'stages_ms': {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+            **fields
+        }
+        print(json.dumps(record, ensure_ascii=False))
+        return record
+
+
+def stage_summary() -> Dict[str, Dict[str, Dict]]:
+    """Quantiles glissants par route puis par étape (en ms)"""
+    summary: Dict[str, Dict[str, Dict]] = {}
+    for (route, stage), entry in sorted(STAGE_SECONDS.snapshot().items()):
+        summary.setdefault(route, {})[stage] = {
+            name: (round(value * 1000, 1) if name.startswith('p') else value) for name, value in entry.items()
+        }
+    return summary
@@ -0,0 +1,229 @@
+# near_duplicates.py - Détection de vidéos quasi-identiques (MinHash + LSH)
+import re
+import base64
+import random
+import hashlib
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from json_store import AppendLogStore
+
+MERSENNE_PRIME = (1 << 61) - 1
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text: str) -> Set[str]:
+    """Bigrammes de mots normalisés (sans accents, minuscules); mots seuls si texte très court"""
+    text = unicodedata.normalize('NFD', text or '')
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn').lower()
+    words = _WORD.findall(text)
+    if len(words) < 3:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def video_text(video: Dict) -> str:
+    """Texte comparé pour une vidéo: titre + description"""
+    return f"{video.get('title', '')} {video.get('description', '')}"
+
+
+def merge_records(records: List[Dict]) -> List[Dict]:
+    """Compactage du journal: un enregistrement par vidéo, champs des ajouts successifs fusionnés"""
+    merged: Dict[str, Dict] = {}
+    for record in records:
+        merged.setdefault(record['video_id'], {}).update(record)
+    return list(merged.values())
+
+
+def upgrade_legacy_index(data: Dict) -> List[Dict]:
+    """Enregistrements tirés de l'ancien format {'videos': {video_id: {...}}}"""
+    return [dict(entry, video_id=video_id) for video_id, entry in data.get('videos', {}).items()]
+
+
+class NearDuplicateIndex:
+    def __init__(self, index_file: Path, num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                 compact_every: int = 1000):
+        """
+        Index MinHash/LSH des vidéos en staging et traitées
+
+        Chaque vidéo est résumée par une signature MinHash; les signatures sont
+        découpées en bandes hachées dans des seaux. Les candidats d'une requête
+        sont les vidéos partageant au moins un seau: la recherche ne dépend pas
+        de la taille de l'historique.
+
+        Les enregistrements ({video_id, title, signature, processed}, champs
+        partiels possibles) sont ajoutés à un journal, replié dans le fichier
+        JSON toutes les compact_every lignes: indexer ou marquer une vidéo
+        n'écrit qu'une ligne.
+
+        Args:
+            index_file: Fichier JSON des signatures
+            num_perm: Longueur des signatures
+            bands: Nombre de bandes LSH (num_perm doit en être multiple)
+            threshold: Similarité de Jaccard estimée à partir de laquelle on signale un doublon
+            compact_every: Nombre de lignes du journal déclenchant un compactage
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # Permutations fixes: les signatures restent comparables d'un démarrage à l'autre
+        rng = random.Random(20240601)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self.store = AppendLogStore(index_file, 'records', compact_every=compact_every,
+                                    compactor=merge_records, upgrade=upgrade_legacy_index)
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._signatures = {}
+        self._videos: Dict[str, Dict] = {}  # video_id -> {'title', 'processed', 'signature'}
+        self._synced_epoch = None
+        self._synced_count = 0
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """Signature MinHash d'un texte, valeurs tronquées à 32 bits (None si aucun shingle)"""
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for shingle in shingles(text)]
+        if not hashes:
+            return None
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF for a, b in self._perms)
+
+    @staticmethod
+    def _encode(signature: Tuple[int, ...]) -> str:
+        return base64.b64encode(array('I', signature).tobytes()).decode('ascii')
+
+    @staticmethod
+    def _decode(encoded: str) -> Tuple[int, ...]:
+        values = array('I')
+        values.frombytes(base64.b64decode(encoded))
+        return tuple(values)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _sync_memory(self, records: List[Dict]):
+        """Seaux LSH et signatures, complétés avec les seuls enregistrements ajoutés depuis le dernier appel"""
+        if self._synced_epoch != self.store.epoch or len(records) < self._synced_count:
+            self._buckets = {}
+            self._signatures = {}
+            self._videos = {}
+            self._synced_epoch = self.store.epoch
+            self._synced_count = 0
+        for record in records[self._synced_count:]:
+            self._apply(record)
+        self._synced_count = len(records)
+
+    def _apply(self, record: Dict):
+        video_id = record['video_id']
+        entry = self._videos.setdefault(video_id, {})
+        encoded = record.get('signature')
+        if encoded is not None and encoded != entry.get('signature'):
+            if video_id in self._signatures:
+                for key in self._band_keys(self._signatures[video_id]):
+                    self._buckets[key].discard(video_id)
+            signature = self._decode(encoded)
+            self._signatures[video_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(video_id)
+        entry.update((field, value) for field, value in record.items() if field != 'video_id')
+
+    def _matches(self, video_id: Optional[str], signature: Tuple[int, ...], limit: int) -> List[Dict]:
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(video_id)
+        matches = []
+        for other_id in candidates:
+            other_signature = self._signatures[other_id]
+            similarity = sum(1 for x, y in zip(signature, other_signature) if x == y) / self.num_perm
+            if similarity >= self.threshold:
+                entry = self._videos[other_id]
+                matches.append({
+                    'video_id': other_id,
+                    'title': entry.get('title', ''),
+                    'similarity': round(similarity, 2),
+                    'processed': entry.get('processed', False)
+                })
+        matches.sort(key=lambda match: (-match['processed'], -match['similarity']))
+        return matches[:limit]
+
+    def find_duplicates(self, video: Dict, limit: int = 3) -> List[Dict]:
+        """
+        Vidéos probablement identiques à celle-ci (sans modifier l'index)
+
+        Returns:
+            List[Dict]: [{'video_id', 'title', 'similarity', 'processed'}], traitées d'abord
+        """
+        signature = self.signature(video_text(video))
+        if signature is None:
+            return []
+        with self._lock:
+            self._sync_memory(self.store.read())
+            return self._matches(video.get('video_id'), signature, limit)
+
+    def index_videos(self, videos: List[Dict], processed: bool = False, limit: int = 3) -> Dict[str, List[Dict]]:
+        """
+        Cherche les doublons de chaque vidéo puis l'ajoute à l'index, en un seul ajout au journal
+
+        Les vidéos d'un même lot sont comparées entre elles (dans l'ordre du lot).
+        Une vidéo déjà indexée à l'identique n'ajoute rien.
+
+        Returns:
+            Dict: video_id -> doublons probables (uniquement pour les vidéos qui en ont)
+        """
+        signatures = [(video, self.signature(video_text(video))) for video in videos]
+        duplicates = {}
+        with self._lock, self.store.appending() as (records, pending):
+            self._sync_memory(records)
+            for video, signature in signatures:
+                if signature is None:
+                    continue
+                video_id = video['video_id']
+                matches = self._matches(video_id, signature, limit)
+                if matches:
+                    duplicates[video_id] = matches
+                previous = self._videos.get(video_id, {})
+                record = {
+                    'video_id': video_id,
+                    'title': video.get('title', ''),
+                    'signature': self._encode(signature),
+                    'processed': processed or bool(previous.get('processed'))
+                }
+                if all(previous.get(field) == value for field, value in record.items() if field != 'video_id'):
+                    continue
+                # Visible tout de suite pour les vidéos suivantes du lot
+                self._apply(record)
+                pending.append(record)
+        return duplicates
+
+    def mark_processed(self, video_id: str) -> bool:
+        """
+        Passe une vidéo indexée à l'état "traitée" (son résultat devient réutilisable)
+
+        Returns:
+            bool: False si la vidéo n'était pas indexée
+        """
+        with self._lock:
+            self._sync_memory(self.store.read())
+            entry = self._videos.get(video_id)
+            if entry is None:
+                return False
+            if entry.get('processed'):
+                return True
+            with self.store.appending() as (records, pending):
+                self._sync_memory(records)
+                if video_id not in self._videos:
+                    return False
+                if not self._videos[video_id].get('processed'):
+                    pending.append({'video_id': video_id, 'processed': True})
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync_memory(self.store.read())
+            return len(self._videos)
@@ -0,0 +1,216 @@
+# note_renderer.py - Moteur de rendu unique des notes Obsidian (templates pré-compilés)
+import re
+import unicodedata
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+_NON_ALNUM = re.compile(r'[^a-zA-Z0-9]')
+_DASHES = re.compile(r'-+')
+
+
+@lru_cache(maxsize=8192)
+def clean_tag(text: str) -> str:
+    """Nettoie un texte pour en faire un tag valide sans accents (résultat mis en cache)"""
+    if not text:
+        return ""
+
+    # Supprimer les accents
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+
+    # Convertir en minuscules
+    text = text.lower()
+
+    # Remplacer les espaces et caractères spéciaux par des tirets
+    text = _NON_ALNUM.sub('-', text)
+
+    # Supprimer les tirets multiples et en début/fin
+    text = _DASHES.sub('-', text).strip('-')
+
+    return text
+
+
+FRONTMATTER_TEMPLATE = '''---
+video_id: {video_id}
+category: {category}
+processed_at: "{processed_at}"
+---
+
+'''
+
+LEARNING_TEMPLATE = FRONTMATTER_TEMPLATE + '''# {title}
+
+{thumbnail}**URL**: {url}  
+**Type**: Learning 🎓  
+**Domaine**: [[{moc}]]  
+**Chaîne**: {channel}  
+**Date d'ajout**: {date}  
+**Dernière révision**: {date}  
+
+---
+
+## Résumé Détaillé
+
+{summary}
+{concepts_section}{applications_section}
+## Notes Connectées
+
+{connected_notes}
+
+---
+*Tags: #video #learning {tags}*'''
+
+KNOWLEDGE_TEMPLATE = FRONTMATTER_TEMPLATE + '''# {title}
+
+{thumbnail}**URL**: {url}  
+**Type**: Knowledge 📰  
+**Domaine**: [[{moc}]]  
+**Chaîne**: {channel}  
+**Date d'ajout**: {date}  
+
+---
+
+## Résumé
+
+{summary}
+{key_points_section}{takeaway_section}
+## Notes Connectées
+
+{connected_notes}
+
+---
+*Tags: #video #knowledge {tags}*'''
+
+CONNECTED_NOTES_PLACEHOLDER = '<!-- Auto-générées -->'
+
+
+def compile_template(template: str) -> Tuple[Tuple[str, ...], Tuple[Optional[str], ...]]:
+    """
+    Découpe un template en segments littéraux et noms de champs, une seule fois
+
+    Returns:
+        tuple: (littéraux, champs) de même longueur; champ None en fin de template
+    """
+    literals = []
+    fields = []
+    for literal, field_name, _, _ in Formatter().parse(template):
+        literals.append(literal)
+        fields.append(field_name)
+    return tuple(literals), tuple(fields)
+
+
+def _concepts_section(result: Dict) -> str:
+    concepts = result.get('concepts') or []
+    if not concepts:
+        return ''
+    lines = []
+    for concept in concepts:
+        if isinstance(concept, dict):
+            lines.append(f"- **{concept.get('name', '')}** - {concept.get('definition', '')}\n")
+        else:
+            lines.append(f"- **{concept}**\n")
+    return '\n## Concepts Clés\n\n' + ''.join(lines)
+
+
+def _applications_section(result: Dict) -> str:
+    applications = result.get('applications', '')
+    return f"\n## Applications Pratiques\n\n{applications}\n" if applications else ''
+
+
+def _key_points_section(result: Dict) -> str:
+    key_points = result.get('key_points') or []
+    if not key_points:
+        return ''
+    return '\n## Points Clés\n\n' + ''.join(f"- {point}\n" for point in key_points)
+
+
+def _takeaway_section(result: Dict) -> str:
+    key_takeaway = result.get('key_takeaway', '')
+    return f"\n## À Retenir\n\n{key_takeaway}\n" if key_takeaway else ''
+
+
+def note_tags(result: Dict) -> List[str]:
+    """Tags normalisés d'une note: catégorie puis mots-clés (les mots-clés vides sont ignorés)"""
+    tags = [clean_tag(result.get('category', ''))]
+    for keyword in result.get('keywords') or []:
+        if isinstance(keyword, str):
+            tag = clean_tag(keyword)
+            if tag:
+                tags.append(tag)
+    return tags
+
+
+class NoteRenderer:
+    # Sections spécifiques à chaque type de note
+    SECTIONS: Dict[str, Dict[str, Callable[[Dict], str]]] = {
+        'learning': {
+            'concepts_section': _concepts_section,
+            'applications_section': _applications_section,
+        },
+        'knowledge': {
+            'key_points_section': _key_points_section,
+            'takeaway_section': _takeaway_section,
+        },
+    }
+
+    def __init__(self, categories: Dict[str, Dict]):
+        """
+        Rendu des notes Learning / Knowledge, partagé par le générateur et l'export
+
+        Args:
+            categories: Mapping catégorie -> {'folder', 'moc', 'type'}
+        """
+        self.categories = categories
+        self._templates = {
+            'learning': compile_template(LEARNING_TEMPLATE),
+            'knowledge': compile_template(KNOWLEDGE_TEMPLATE),
+        }
+
+    def processing_type(self, result: Dict) -> str:
+        """Type de note: celui de la catégorie, sinon celui du résultat"""
+        category_info = self.categories.get(result.get('category'), {})
+        processing_type = category_info.get('type') or result.get('processing_type', 'knowledge')
+        return 'learning' if processing_type == 'learning' else 'knowledge'
+
+    def render(self, result: Dict, connected_notes: Optional[List[str]] = None) -> str:
+        """
+        Rend une note complète en une seule passe de join
+
+        Args:
+            result: Résultat de traitement Gemini
+            connected_notes: Liens wikilink ([[...]]) vers les notes connectées
+        Returns:
+            str: Contenu markdown de la note
+        """
+        processing_type = self.processing_type(result)
+        category_info = self.categories.get(result.get('category'), {})
+        processed_at = result.get('processed_at', '')
+
+        values = {
+            'video_id': result.get('video_id', ''),
+            'category': result.get('category', ''),
+            'processed_at': processed_at,
+            'title': result.get('title', 'Note sans titre'),
+            # Copie locale de la miniature dans le coffre (OBSIDIAN_EMBED_THUMBNAILS)
+            'thumbnail': f"![[{result['thumbnail_embed']}]]\n\n" if result.get('thumbnail_embed') else '',
+            'url': result.get('url', ''),
+            'moc': category_info.get('moc', 'Unknown MOC'),
+            'channel': result.get('channel', 'Unknown'),
+            'date': processed_at[:10],
+            'summary': result.get('summary') or 'Aucun résumé disponible',
+            'connected_notes': '\n'.join(f"- {link}" for link in connected_notes) if connected_notes
+                               else CONNECTED_NOTES_PLACEHOLDER,
+            'tags': ' '.join(f"#{tag}" for tag in note_tags(result)),
+        }
+        for name, build in self.SECTIONS[processing_type].items():
+            values[name] = build(result)
+
+        literals, fields = self._templates[processing_type]
+        parts = []
+        for literal, field in zip(literals, fields):
+            parts.append(literal)
+            if field is not None:
+                parts.append(values[field])
+        return ''.join(parts)
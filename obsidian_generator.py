@@ -2,88 +2,815 @@
 import os
 import json
 import re
+import heapq
+import bisect
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
-import unicodedata
 
-def clean_tag(text: str) -> str:
-    """Nettoie un texte pour en faire un tag valide sans accents"""
-    if not text:
-        return ""
+from json_store import (apply_changes, atomic_write_bytes, atomic_write_json, atomic_write_text, log_path_for,
+                        merge_json_file, read_log_entries)
+from metrics import NOTE_WRITES, NOTE_WRITE_SECONDS
+from note_renderer import NoteRenderer, clean_tag, note_tags
+from tag_index import TagIndex
+
+# Categories mapping
+OBSIDIAN_CATEGORIES = {
+    'ai_technique_learning': {
+        'folder': 'IA Technique Learning',
+        'moc': 'IA Technique MOC',
+        'type': 'learning'
+    },
+    'ai_business_learning': {
+        'folder': 'IA Business Learning', 
+        'moc': 'IA Business MOC',
+        'type': 'learning'
+    },
+    'tech_general_learning': {
+        'folder': 'Tech General Learning',
+        'moc': 'Tech General MOC',
+        'type': 'learning'
+    },
+    'culture_g_learning': {
+        'folder': 'Culture G Learning',
+        'moc': 'Culture G MOC',
+        'type': 'learning'
+    },
+    'tech_general_knowledge': {
+        'folder': 'Tech General Knowledge',
+        'moc': 'Tech General MOC',
+        'type': 'knowledge'
+    },
+    'culture_g_knowledge': {
+        'folder': 'Culture G Knowledge',
+        'moc': 'Culture G MOC',
+        'type': 'knowledge'
+    }
+}
+
+# Sous-dossiers de date dans chaque dossier de catégorie (processed_at ISO -> parties)
+SHARD_LAYOUTS = {
+    'none': lambda processed_at: (),
+    'year': lambda processed_at: (processed_at[:4],),
+    'month': lambda processed_at: (processed_at[:4], processed_at[5:7]),
+}
+
+WIKILINK_TARGET_PATTERN = re.compile(r'\[\[([^\]|#]+)')
+LOG_GENERATION_PATTERN = re.compile(r'"log_generation":\s*(\d+)')
+
+def iter_processed_entries(processed_file_path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Lit paresseusement les entrées de processed_videos.json, une par une,
+    puis celles de son journal d'ajouts (processed_videos.log.jsonl)
+    
+    L'instantané n'est jamais chargé en entier: seul le texte de l'entrée en
+    cours de décodage est gardé en mémoire.
+    """
+    generation = [0]
+    if Path(processed_file_path).exists():
+        yield from _iter_snapshot_entries(processed_file_path, chunk_size, generation)
+    yield from read_log_entries(log_path_for(processed_file_path), generation[0])
+
+def _iter_snapshot_entries(processed_file_path: str, chunk_size: int, generation: List[int]) -> Iterator[Dict]:
+    decoder = json.JSONDecoder()
+    with open(processed_file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        eof = False
+        
+        def fill() -> bool:
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer += chunk
+            return True
+        
+        # Se positionner après '"processed_videos": ['
+        while True:
+            key_pos = buffer.find('"processed_videos"')
+            if key_pos >= 0:
+                bracket = buffer.find('[', key_pos)
+                if bracket >= 0:
+                    # La génération du journal est écrite avant la liste
+                    match = LOG_GENERATION_PATTERN.search(buffer, 0, key_pos)
+                    if match:
+                        generation[0] = int(match.group(1))
+                    buffer = buffer[bracket + 1:]
+                    break
+            if not fill():
+                return
+        
+        while True:
+            stripped = buffer.lstrip(' \t\r\n,')
+            if not stripped:
+                buffer = ''
+                if not fill():
+                    return
+                continue
+            buffer = stripped
+            if buffer[0] == ']':
+                return
+            try:
+                entry, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof or not fill():
+                    raise
+                continue
+            buffer = buffer[end:]
+            yield entry
+
+
+class NoteWriter:
+    def __init__(self, vault_path: Path, manifest_file: Path):
+        """
+        Écrivain de notes: n'écrit que si le contenu change, toujours de façon atomique
+        
+        Un manifeste garde (sha256, mtime, taille) de chaque note écrite: tant que
+        le fichier n'a pas bougé sur disque, son empreinte est connue sans le relire.
+        Les écritures d'un bloc batch() sont regroupées et écrites en une fois à
+        la sortie; les autres appels à write() restent immédiats.
+        
+        Args:
+            vault_path: Racine du coffre (les chemins du manifeste y sont relatifs)
+            manifest_file: Fichier JSON du manifeste
+        """
+        self.vault_path = Path(vault_path)
+        self.manifest_file = Path(manifest_file)
+        self._lock = threading.RLock()
+        self._changed = set()   # chemins modifiés depuis la dernière sauvegarde
+        self._manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, List]:
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest_mtime_ns = os.stat(self.manifest_file).st_mtime_ns
+        except (OSError, ValueError):
+            return {}
+        entries = {}
+        for relative_path, entry in manifest.items():
+            if isinstance(entry, list):
+                entries[relative_path] = entry
+            elif isinstance(entry, str):
+                self._changed.add(relative_path)
+                entry = self._upgrade_hash_entry(relative_path, entry, manifest_mtime_ns)
+                if entry is not None:
+                    entries[relative_path] = entry
+        return entries
+    
+    def _upgrade_hash_entry(self, relative_path: str, content_hash: str, manifest_mtime_ns: int) -> Optional[List]:
+        """
+        Convertit une entrée de l'ancien format {chemin: sha256} en [sha256, mtime, taille]
+        
+        L'ancien manifeste était écrit après les notes: une note qui n'a pas été
+        modifiée depuis garde son empreinte; les autres seront relues.
+        """
+        try:
+            st = (self.vault_path / relative_path).stat()
+        except OSError:
+            return None
+        if st.st_mtime_ns > manifest_mtime_ns:
+            return None
+        return [content_hash, st.st_mtime_ns, st.st_size]
+    
+    def _save_manifest(self):
+        """Reporte les entrées modifiées dans le manifeste sur disque (partagé entre workers)"""
+        if self._changed and self.manifest_file.parent.exists():
+            changed, self._changed = self._changed, set()
+            merge_json_file(self.manifest_file, lambda data: apply_changes(data, self._manifest, changed))
+    
+    def _current_hash(self, note_path: Path, relative_path: str) -> Optional[str]:
+        """Empreinte du fichier sur disque, depuis le manifeste si le fichier n'a pas changé"""
+        try:
+            st = note_path.stat()
+        except FileNotFoundError:
+            return None
+        entry = self._manifest.get(relative_path)
+        if entry and entry[1] == st.st_mtime_ns and entry[2] == st.st_size:
+            return entry[0]
+        # Fichier modifié ailleurs (autre worker, édition manuelle): relire
+        content_hash = hashlib.sha256(note_path.read_bytes()).hexdigest()
+        with self._lock:
+            self._manifest[relative_path] = [content_hash, st.st_mtime_ns, st.st_size]
+            self._changed.add(relative_path)
+        return content_hash
+    
+    def _write_now(self, note_path: Path, content: str) -> bool:
+        """Écrit la note si son contenu diffère; retourne True si le fichier a été écrit"""
+        with NOTE_WRITE_SECONDS.time():
+            relative_path = note_path.relative_to(self.vault_path).as_posix()
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            if self._current_hash(note_path, relative_path) == content_hash:
+                NOTE_WRITES.inc(result='unchanged')
+                return False
+            note_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(note_path, content)
+            st = note_path.stat()
+            with self._lock:
+                self._manifest[relative_path] = [content_hash, st.st_mtime_ns, st.st_size]
+                self._changed.add(relative_path)
+            NOTE_WRITES.inc(result='written')
+            return True
+    
+    def write(self, note_path: Path, content: str) -> bool:
+        """
+        Écrit une note immédiatement
+        
+        Returns:
+            bool: True si le fichier a été écrit
+        """
+        note_path = Path(note_path)
+        with self._lock:
+            written = self._write_now(note_path, content)
+            self._save_manifest()
+            return written
+    
+    def move(self, old_path: Path, new_path: Path):
+        """Reporte l'entrée du manifeste d'une note déplacée (os.replace conserve le mtime)"""
+        old_relative = Path(old_path).relative_to(self.vault_path).as_posix()
+        new_relative = Path(new_path).relative_to(self.vault_path).as_posix()
+        with self._lock:
+            entry = self._manifest.pop(old_relative, None)
+            if entry is not None:
+                self._manifest[new_relative] = entry
+                self._changed.update((old_relative, new_relative))
+            self._save_manifest()
+    
+    @contextmanager
+    def batch(self, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Regroupe les écritures passées par le lot retourné
+        
+        Le lot appartient à l'appelant: les write() des autres appelants (autres
+        threads, sauvegarde d'une note pendant une régénération) ne sont pas différés.
+        
+        Usage:
+            with note_writer.batch(executor) as batch:
+                batch.write(note_path, content)
+            batch.written  # fichiers réellement modifiés
+        """
+        batch = NoteBatch()
+        try:
+            yield batch
+        finally:
+            batch.written = self._flush(batch.pending, executor)
+    
+    def _flush(self, pending: Dict[Path, str], executor: Optional[ThreadPoolExecutor] = None) -> int:
+        """Écrit les notes d'un lot; retourne le nombre de fichiers réellement modifiés"""
+        if not pending:
+            return 0
+        items = list(pending.items())
+        if executor is not None:
+            outcomes = list(executor.map(lambda item: self._write_now(*item), items))
+        else:
+            outcomes = [self._write_now(path, content) for path, content in items]
+        with self._lock:
+            self._save_manifest()
+        return sum(outcomes)
+
+
+class NoteBatch:
+    def __init__(self):
+        """Écritures en attente d'un bloc NoteWriter.batch() (dernière version de chaque note)"""
+        self.pending: Dict[Path, str] = {}
+        self.written = 0
+    
+    def write(self, note_path: Path, content: str):
+        self.pending[Path(note_path)] = content
+
+
+def category_of_path(relative_path: str, folder_to_category: Dict[str, str]) -> Optional[str]:
+    """Catégorie d'une note d'après son dossier: YouTube Knowledge/Videos/<dossier>/.../note.md"""
+    parts = relative_path.split('/')
+    if len(parts) < 4:
+        return None
+    return folder_to_category.get(parts[2])
+
+
+FRONTMATTER_FIELD_PATTERN = re.compile(r'^(\w+):\s*"?(.*?)"?\s*$')
+
+
+def read_frontmatter(note_path: Path, max_bytes: int = 2048) -> Dict[str, str]:
+    """Lit les champs simples (clé: valeur) du frontmatter YAML d'une note"""
+    try:
+        with open(note_path, 'r', encoding='utf-8', errors='replace') as f:
+            head = f.read(max_bytes)
+    except OSError:
+        return {}
+    lines = head.split('\n')
+    if not lines or lines[0].strip() != '---':
+        return {}
+    fields = {}
+    for line in lines[1:]:
+        if line.strip() == '---':
+            break
+        match = FRONTMATTER_FIELD_PATTERN.match(line)
+        if match:
+            fields[match.group(1)] = match.group(2)
+    return fields
+
+
+class VaultCatalogue:
+    def __init__(self, folder_to_category: Dict[str, str]):
+        """
+        Catalogue mémoire des notes: totaux par catégorie et notes récentes
+        
+        Les notes récentes sont servies par un tas (max-heap sur le mtime) par
+        catégorie; les entrées périmées (note modifiée ou supprimée) sont
+        écartées paresseusement lors des lectures.
+        
+        Args:
+            folder_to_category: Nom de dossier -> clé de catégorie
+        """
+        self.folder_to_category = folder_to_category
+        self._lock = threading.Lock()
+        self._notes = {}    # chemin relatif -> (catégorie, mtime_ns)
+        self._counts = {}   # catégorie -> nombre de notes
+        self._heaps = {}    # catégorie -> [(-mtime_ns, chemin relatif)]
     
-    # Supprimer les accents
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    def note_changed(self, relative_path: str, mtime_ns: int):
+        category = category_of_path(relative_path, self.folder_to_category)
+        with self._lock:
+            previous = self._notes.get(relative_path)
+            if previous:
+                self._counts[previous[0]] -= 1
+            if category is None:
+                self._notes.pop(relative_path, None)
+                return
+            self._notes[relative_path] = (category, mtime_ns)
+            self._counts[category] = self._counts.get(category, 0) + 1
+            heap = self._heaps.setdefault(category, [])
+            heapq.heappush(heap, (-mtime_ns, relative_path))
+            # Compacter quand les entrées périmées dominent
+            if len(heap) > 2 * self._counts[category] + 64:
+                self._heaps[category] = [(-m, path) for path, (cat, m) in self._notes.items() if cat == category]
+                heapq.heapify(self._heaps[category])
     
-    # Convertir en minuscules
-    text = text.lower()
+    def note_removed(self, relative_path: str):
+        with self._lock:
+            previous = self._notes.pop(relative_path, None)
+            if previous:
+                self._counts[previous[0]] -= 1
     
-    # Remplacer les espaces et caractères spéciaux par des tirets
-    text = re.sub(r'[^a-zA-Z0-9]', '-', text)
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {category: count for category, count in self._counts.items() if count}
     
-    # Supprimer les tirets multiples et en début/fin
-    text = re.sub(r'-+', '-', text).strip('-')
+    def recent(self, category: str, n: int = 3) -> List[Tuple[str, int]]:
+        """Les n notes les plus récemment modifiées d'une catégorie: [(chemin, mtime_ns)]"""
+        with self._lock:
+            heap = self._heaps.get(category, [])
+            found = []
+            while heap and len(found) < n:
+                neg_mtime, relative_path = heapq.heappop(heap)
+                current = self._notes.get(relative_path)
+                if current and current[0] == category and current[1] == -neg_mtime:
+                    found.append((relative_path, -neg_mtime))
+            for relative_path, mtime_ns in found:
+                heapq.heappush(heap, (-mtime_ns, relative_path))
+            return found
+
+
+MOC_MARKER_FIELD = 'moc_generated'
+
+
+class MocIndex:
+    def __init__(self, vault_path: Path, mocs_folder: Path, categories: Dict[str, Dict], note_writer: 'NoteWriter'):
+        """
+        MOCs statiques (un fichier par MOC), tenus à jour de façon incrémentale
+        
+        Chaque MOC garde en mémoire la liste triée de ses entrées; une note
+        ajoutée, renommée ou supprimée ne marque que son MOC, et flush() ne
+        réécrit que les MOCs marqués. Un MOC existant écrit à la main (sans
+        le champ moc_generated) n'est jamais écrasé.
+        
+        Args:
+            vault_path: Racine du coffre
+            mocs_folder: Dossier des MOCs
+            categories: Mapping catégorie -> {'folder', 'moc', 'type'}
+            note_writer: Écrivain partagé avec les notes (fichiers inchangés non réécrits)
+        """
+        self.vault_path = Path(vault_path)
+        self.mocs_folder = Path(mocs_folder)
+        self.categories = categories
+        self.note_writer = note_writer
+        self.folder_to_category = {info['folder']: category for category, info in categories.items()}
+        self._category_order = {category: position for position, category in enumerate(categories)}
+        self._lock = threading.Lock()
+        self._entries = {}      # MOC -> [(ordre catégorie, titre casefold, chemin relatif)] trié
+        self._note_keys = {}    # chemin relatif -> (MOC, clé)
+        self._dirty = set()
+        self._writable = {}     # MOC -> False si le fichier existant est manuel
+    
+    def note_changed(self, relative_path: str, mtime_ns: int):
+        category = category_of_path(relative_path, self.folder_to_category)
+        with self._lock:
+            if relative_path in self._note_keys:
+                return  # même chemin = même titre et même catégorie: le MOC ne change pas
+            if category is None:
+                return
+            moc = self.categories[category]['moc']
+            key = (self._category_order[category], Path(relative_path).stem.casefold(), relative_path)
+            bisect.insort(self._entries.setdefault(moc, []), key)
+            self._note_keys[relative_path] = (moc, key)
+            self._dirty.add(moc)
+    
+    def note_removed(self, relative_path: str):
+        with self._lock:
+            known = self._note_keys.pop(relative_path, None)
+            if known is None:
+                return
+            moc, key = known
+            entries = self._entries[moc]
+            position = bisect.bisect_left(entries, key)
+            if position < len(entries) and entries[position] == key:
+                entries.pop(position)
+            self._dirty.add(moc)
+    
+    def moc_path(self, moc: str) -> Path:
+        return self.mocs_folder / f"{moc}.md"
+    
+    def render(self, moc: str) -> str:
+        """Contenu d'un MOC: une section par dossier de catégorie, notes triées par titre"""
+        with self._lock:
+            entries = list(self._entries.get(moc, []))
+        category_names = list(self.categories)
+        lines = [
+            '---', f'{MOC_MARKER_FIELD}: true', '---', '',
+            f'# {moc}', '',
+            f'*{len(entries)} vidéos - MOC généré automatiquement, ne pas modifier à la main*', ''
+        ]
+        current_order = None
+        for order, _, relative_path in entries:
+            if order != current_order:
+                if current_order is not None:
+                    lines.append('')
+                current_order = order
+                lines.extend([f"## {self.categories[category_names[order]]['folder']}", ''])
+            lines.append(f"- [[{relative_path[:-len('.md')]}|{Path(relative_path).stem}]]")
+        return '\n'.join(lines) + '\n'
+    
+    def _can_write(self, moc: str) -> bool:
+        writable = self._writable.get(moc)
+        if writable is None:
+            moc_path = self.moc_path(moc)
+            writable = not moc_path.exists() or read_frontmatter(moc_path).get(MOC_MARKER_FIELD) == 'true'
+            if not writable:
+                print(f"ℹ️ MOC manuel conservé (non généré): {moc_path.name}")
+            self._writable[moc] = writable
+        return writable
     
-    return text
+    def dirty_folders(self) -> List[str]:
+        """Dossiers de catégorie des MOCs à réécrire"""
+        with self._lock:
+            return [info['folder'] for info in self.categories.values() if info['moc'] in self._dirty]
+    
+    def flush(self) -> int:
+        """Réécrit les MOCs modifiés depuis le dernier flush; retourne le nombre de fichiers écrits"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        written = 0
+        for moc in sorted(dirty):
+            if self._can_write(moc) and self.note_writer.write(self.moc_path(moc), self.render(moc)):
+                written += 1
+        return written
+
+
+class VaultIndex:
+    def __init__(self, vault_path: Path, videos_folder: Path, index_file: Path,
+                 observers: Optional[List] = None, on_video_removed: Optional[Callable[[str], None]] = None):
+        """
+        Index persistant video_id -> chemin de note (relatif au coffre)
+        
+        Les notes portent leur video_id dans le frontmatter. L'index garde aussi
+        le mtime de chaque fichier: refresh() ne relit que les notes modifiées
+        depuis le dernier passage. Les observateurs (catalogue, MOCs) reçoivent
+        note_changed(chemin, mtime_ns) et note_removed(chemin); on_video_removed
+        reçoit le video_id d'une vidéo qui n'a plus de note.
+        """
+        self.vault_path = Path(vault_path)
+        self.videos_folder = Path(videos_folder)
+        self.index_file = Path(index_file)
+        self._lock = threading.RLock()
+        self._changed_notes = set()   # clés modifiées depuis la dernière sauvegarde
+        self._changed_files = set()
+        self.notes = {}   # video_id -> chemin relatif
+        self.files = {}   # chemin relatif -> [mtime_ns, video_id]
+        self.observers = list(observers or [])
+        self.on_video_removed = on_video_removed
+        self._watcher = None
+        self._stop_watcher = threading.Event()
+        self._load()
+        for observer in self.observers:
+            for relative_path, (mtime_ns, _) in self.files.items():
+                observer.note_changed(relative_path, mtime_ns)
+    
+    def _load(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.notes = data.get('notes', {})
+            self.files = data.get('files', {})
+        except (OSError, ValueError):
+            self.notes, self.files = {}, {}
+    
+    def save(self):
+        """Persiste les entrées modifiées, fusionnées avec celles écrites par les autres workers"""
+        with self._lock:
+            if not (self._changed_notes or self._changed_files) or not self.index_file.parent.exists():
+                return
+            changed_notes, self._changed_notes = self._changed_notes, set()
+            changed_files, self._changed_files = self._changed_files, set()
+            
+            def merge(data: Dict):
+                apply_changes(data.setdefault('notes', {}), self.notes, changed_notes)
+                apply_changes(data.setdefault('files', {}), self.files, changed_files)
+            
+            merge_json_file(self.index_file, merge)
+    
+    def relative(self, note_path: Path) -> str:
+        return Path(note_path).relative_to(self.vault_path).as_posix()
+    
+    def refresh(self, folders: Optional[List[str]] = None) -> int:
+        """
+        Resynchronise l'index avec le disque (notes ajoutées, modifiées, supprimées)
+        
+        Args:
+            folders: Sous-dossiers de videos_folder à parcourir (tous si None)
+        Returns:
+            int: Nombre de notes relues
+        """
+        if not self.videos_folder.exists():
+            return 0
+        roots = [self.videos_folder / folder for folder in folders] if folders is not None else [self.videos_folder]
+        prefixes = tuple(self.relative(root) + '/' for root in roots)
+        seen = set()
+        reread = 0
+        with self._lock:
+            for root, _, filenames in (entry for folder in roots for entry in os.walk(folder)):
+                for filename in filenames:
+                    if not filename.endswith('.md'):
+                        continue
+                    note_path = Path(root) / filename
+                    relative_path = self.relative(note_path)
+                    seen.add(relative_path)
+                    try:
+                        mtime_ns = note_path.stat().st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+                    known = self.files.get(relative_path)
+                    if known and known[0] == mtime_ns:
+                        continue
+                    video_id = read_frontmatter(note_path).get('video_id')
+                    self._track(relative_path, mtime_ns, video_id)
+                    reread += 1
+            for relative_path in set(self.files) - seen:
+                if relative_path.startswith(prefixes):
+                    self._untrack(relative_path)
+        self.save()
+        return reread
+    
+    def _track(self, relative_path: str, mtime_ns: int, video_id: Optional[str]):
+        previous = self.files.get(relative_path)
+        if previous and previous[1] and previous[1] != video_id and self.notes.get(previous[1]) == relative_path:
+            del self.notes[previous[1]]
+            self._changed_notes.add(previous[1])
+            self._video_removed(previous[1])
+        self.files[relative_path] = [mtime_ns, video_id]
+        self._changed_files.add(relative_path)
+        if video_id:
+            self.notes[video_id] = relative_path
+            self._changed_notes.add(video_id)
+        for observer in self.observers:
+            observer.note_changed(relative_path, mtime_ns)
+    
+    def _untrack(self, relative_path: str):
+        _, video_id = self.files.pop(relative_path)
+        self._changed_files.add(relative_path)
+        if video_id and self.notes.get(video_id) == relative_path:
+            del self.notes[video_id]
+            self._changed_notes.add(video_id)
+            self._video_removed(video_id)
+        for observer in self.observers:
+            observer.note_removed(relative_path)
+    
+    def _video_removed(self, video_id: str):
+        if self.on_video_removed is not None:
+            self.on_video_removed(video_id)
+    
+    def start_watcher(self, interval: float = 30.0, after_refresh=None):
+        """Lance un thread qui appelle refresh() périodiquement (polling du coffre)"""
+        if self._watcher is not None:
+            return
+        
+        def watch():
+            while not self._stop_watcher.wait(interval):
+                try:
+                    self.refresh()
+                    if after_refresh is not None:
+                        after_refresh()
+                except Exception as e:
+                    print(f"⚠️ Erreur de rafraîchissement du coffre: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="vault-watcher", daemon=True)
+        self._watcher.start()
+    
+    def watcher_running(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+    
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._stop_watcher.set()
+            self._watcher.join()
+            self._watcher = None
+            self._stop_watcher.clear()
+    
+    def path_for(self, video_id: str) -> Optional[Path]:
+        """Chemin de la note d'une vidéo (O(1)), None si absente"""
+        relative_path = self.notes.get(video_id)
+        return self.vault_path / relative_path if relative_path else None
+    
+    def has_note(self, video_id: str) -> bool:
+        return video_id in self.notes
+    
+    def owner_of(self, note_path: Path) -> Optional[str]:
+        """video_id propriétaire d'un fichier de note (index, puis frontmatter si inconnu)"""
+        known = self.files.get(self.relative(note_path))
+        if known:
+            return known[1]
+        if note_path.exists():
+            return read_frontmatter(note_path).get('video_id')
+        return None
+    
+    def register(self, video_id: str, note_path: Path) -> Optional[Path]:
+        """
+        Enregistre la note d'une vidéo
+        
+        Returns:
+            Path: Ancien chemin si la note a changé de place (à supprimer), sinon None
+        """
+        relative_path = self.relative(note_path)
+        with self._lock:
+            previous = self.notes.get(video_id)
+            try:
+                mtime_ns = note_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = 0
+            self._track(relative_path, mtime_ns, video_id)
+            if previous and previous != relative_path:
+                if previous in self.files:
+                    self._untrack(previous)
+                return self.vault_path / previous
+        return None
+
 
 class ObsidianGenerator:
-    def __init__(self, obsidian_vault_path: str):
+    def __init__(self, obsidian_vault_path: str, watch_interval: Optional[float] = None):
         """
         Générateur de notes Obsidian pour le système YouTube
         
         Args:
             obsidian_vault_path: Chemin vers le coffre Obsidian
+            watch_interval: Si défini, resynchronise l'index du coffre toutes les N secondes
         """
         self.vault_path = Path(obsidian_vault_path)
         self.youtube_folder = self.vault_path / "YouTube Knowledge"
         self.videos_folder = self.youtube_folder / "Videos"
         self.mocs_folder = self.youtube_folder / "MOCs"
+        self.attachments_folder = self.youtube_folder / "Attachments"
+        self.hash_manifest_file = self.youtube_folder / ".note_hashes.json"
+        self.note_writer = NoteWriter(self.vault_path, self.hash_manifest_file)
+        
+        # Instance longue durée partagée entre threads: un verrou pour les sauvegardes
+        self._lock = threading.RLock()
+        self._category_folders = {}
         
         # Créer la structure si elle n'existe pas
-        self._create_folder_structure()
-        
-        # Categories mapping
-        self.categories = {
-            'ai_technique_learning': {
-                'folder': 'IA Technique Learning',
-                'moc': 'IA Technique MOC',
-                'type': 'learning'
-            },
-            'ai_business_learning': {
-                'folder': 'IA Business Learning', 
-                'moc': 'IA Business MOC',
-                'type': 'learning'
-            },
-            'tech_general_learning': {
-                'folder': 'Tech General Learning',
-                'moc': 'Tech General MOC',
-                'type': 'learning'
-            },
-            'culture_g_learning': {
-                'folder': 'Culture G Learning',
-                'moc': 'Culture G MOC',
-                'type': 'learning'
-            },
-            'tech_general_knowledge': {
-                'folder': 'Tech General Knowledge',
-                'moc': 'Tech General MOC',
-                'type': 'knowledge'
-            },
-            'culture_g_knowledge': {
-                'folder': 'Culture G Knowledge',
-                'moc': 'Culture G MOC',
-                'type': 'knowledge'
-            }
-        }
+        self.structure_found = self._create_folder_structure()
+        
+        # Découpage par date des dossiers de catégorie (choisi par migrate_layout)
+        self.layout_file = self.youtube_folder / ".vault_layout.json"
+        self._layout_signature = None
+        self.shard_by = 'none'
+        self._load_layout()
+        
+        # Categories mapping et moteur de rendu (partagé avec l'export de l'app)
+        self.categories = OBSIDIAN_CATEGORIES
+        self.renderer = NoteRenderer(self.categories)
+        
+        # Index video_id -> note, catalogue mémoire pour les statistiques et MOCs statiques
+        self.catalogue = VaultCatalogue({info['folder']: category for category, info in self.categories.items()})
+        self.moc_index = MocIndex(self.vault_path, self.mocs_folder, self.categories, self.note_writer)
+        # Une note supprimée du coffre sort aussi de l'index des tags
+        self.tag_index = TagIndex(self.youtube_folder / ".tag_index.json")
+        self.vault_index = VaultIndex(self.vault_path, self.videos_folder,
+                                      self.youtube_folder / ".vault_index.json",
+                                      [self.catalogue, self.moc_index], on_video_removed=self.tag_index.remove)
+        self.vault_index.refresh()
+        self._vault_refreshed()
+        if watch_interval:
+            self.vault_index.start_watcher(watch_interval, after_refresh=self._vault_refreshed)
     
-    def _create_folder_structure(self):
+    def _create_folder_structure(self) -> bool:
         """Vérifie que la structure Obsidian existe (sans la créer)"""
         if not self.youtube_folder.exists():
             print(f"⚠️ Attention: Dossier 'YouTube Knowledge' non trouvé dans {self.vault_path}")
             print("   Assure-toi que la structure Obsidian existe déjà")
-        else:
-            print(f"✅ Structure Obsidian trouvée dans: {self.vault_path}")
+            return False
+        print(f"✅ Structure Obsidian trouvée dans: {self.vault_path}")
+        return True
+    
+    def _load_layout(self):
+        """Relit le découpage du coffre s'il a changé (migration lancée par un autre process)"""
+        try:
+            signature = self.layout_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            signature = None
+        if signature == self._layout_signature:
+            return
+        self._layout_signature = signature
+        shard_by = 'none'
+        if signature is not None:
+            try:
+                with open(self.layout_file, 'r', encoding='utf-8') as f:
+                    shard_by = json.load(f).get('shard_by', 'none')
+            except (OSError, ValueError):
+                pass
+        self.shard_by = shard_by if shard_by in SHARD_LAYOUTS else 'none'
+    
+    def note_folder(self, category: str, processed_at: Optional[str]) -> Path:
+        """Dossier d'une note: dossier de catégorie, puis sous-dossiers de date selon le découpage"""
+        processed_at = processed_at or datetime.now().isoformat()
+        return self.category_folder(category).joinpath(*SHARD_LAYOUTS[self.shard_by](processed_at))
+    
+    def _vault_refreshed(self):
+        """Après une resynchronisation du coffre: MOCs touchés et tags des notes supprimées"""
+        self.tag_index.save()
+        # Tags des notes écrites par les autres workers
+        self.tag_index.refresh()
+        self.flush_mocs(refresh=False)
+    
+    def flush_mocs(self, refresh: bool = True) -> int:
+        """
+        Réécrit les MOCs touchés depuis le dernier appel (rien si la structure est absente)
+        
+        Args:
+            refresh: Relire d'abord les dossiers des MOCs touchés, pour y inclure
+                les notes écrites par les autres workers (inutile juste après refresh())
+        """
+        if not self.youtube_folder.is_dir():
+            return 0
+        with self._lock:
+            if refresh:
+                folders = self.moc_index.dirty_folders()
+                if folders:
+                    self.vault_index.refresh(folders)
+            return self.moc_index.flush()
+    
+    def category_folder(self, category: str) -> Path:
+        """Dossier d'une catégorie, créé au premier usage puis gardé en cache"""
+        folder = self._category_folders.get(category)
+        if folder is None:
+            folder = self.videos_folder / self.categories[category]['folder']
+            folder.mkdir(parents=True, exist_ok=True)
+            self._category_folders[category] = folder
+        return folder
+    
+    def attach_thumbnail(self, result: Dict, source: Path) -> str:
+        """
+        Copie une miniature du cache dans Attachments/ et l'intègre à la note (![[...]])
+        
+        Le nom du cache (SHA-256 du contenu) est conservé: une image partagée par
+        plusieurs vidéos n'est copiée qu'une fois et n'est jamais réécrite.
+        
+        Returns:
+            str: Nom du fichier dans le coffre
+        """
+        target = self.attachments_folder / source.name
+        if not target.exists():
+            self.attachments_folder.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(target, source.read_bytes())
+        result['thumbnail_embed'] = target.name
+        return target.name
+    
+    def health_check(self) -> Dict:
+        """État du générateur, sans parcourir le coffre"""
+        structure_found = self.youtube_folder.is_dir()
+        if structure_found and not self.structure_found:
+            self.structure_found = True
+        return {
+            'ok': structure_found and os.access(self.youtube_folder, os.W_OK),
+            'vault_path': str(self.vault_path),
+            'structure_found': structure_found,
+            'indexed_notes': len(self.vault_index.notes),
+            'watcher_running': self.vault_index.watcher_running()
+        }
     
     def clean_filename(self, title: str) -> str:
         """Nettoie un titre pour en faire un nom de fichier valide"""
@@ -96,122 +823,258 @@ class ObsidianGenerator:
     
     def generate_note_from_result(self, result: Dict) -> str:
         """Génère le contenu d'une note depuis un résultat de processing"""
-        category = result['category']
-        category_info = self.categories.get(category, {})
-        processing_type = result.get('processing_type', 'knowledge')
+        return self.renderer.render(result)
+    
+    def render_note(self, result: Dict, note_path: Optional[Path] = None,
+                    planned: Optional[Dict[str, Path]] = None) -> Tuple[Path, str]:
+        """
+        Calcule le chemin et le contenu d'une note sans rien écrire
         
-        if processing_type == 'learning':
-            return self._generate_learning_note(result, category_info)
-        else:
-            return self._generate_knowledge_note(result, category_info)
+        Args:
+            result: Résultat de processing
+            note_path: Chemin déjà résolu (sinon résolu ici)
+            planned: Chemins des notes pas encore indexées (video_id -> chemin)
+        Returns:
+            tuple: (chemin de la note, contenu markdown)
+        """
+        category = result.get('category')
+        if not category or category not in self.categories:
+            raise ValueError(f"Catégorie invalide: {category}. Disponibles: {list(self.categories.keys())}")
+        
+        if note_path is None:
+            note_path = self.resolve_note_path(result)
+        note_content = self.renderer.render(result, self.connected_notes(result, planned=planned))
+        return note_path, note_content
     
-    def _generate_learning_note(self, result: Dict, category_info: Dict) -> str:
-        """Génère une note de type Learning avec formatage amélioré"""
-        # Extraire la catégorie depuis result
-        category = result.get("category", "")
-
-        content = f"""# {result['title']}
-
-**URL**: {result['url']}  
-**Type**: Learning 🎓  
-**Domaine**: [[{category_info.get('moc', 'Unknown MOC')}]]  
-**Chaîne**: {result.get('channel', 'Unknown')}  
-**Date d'ajout**: {result['processed_at'][:10]}  
-**Dernière révision**: {result['processed_at'][:10]}  
-
----
-
-## Résumé Détaillé
-
-    {result.get('summary', 'Aucun résumé disponible')}
-    """
-
-        # Concepts clés
-        concepts = result.get("concepts", [])
-        if concepts:
-            content += "\n## Concepts Clés\n\n"
-            for concept in concepts:
-                if isinstance(concept, dict):
-                    name = concept.get("name", "")
-                    definition = concept.get("definition", "")
-                    content += f"- **{name}** - {definition}\n"
-                else:
-                    content += f"- **{concept}**\n"
-
-        # Applications pratiques
-        applications = result.get("applications", "")
-        if applications:
-            content += f"\n## Applications Pratiques\n\n{applications}\n"
-
-        content += "\n## Notes Connectées\n\n<!-- Auto-générées -->\n\n---"
-
-        # Tags - avec nettoyage des accents
-        clean_category = clean_tag(category)
-        content += f"\n*Tags: #video #learning #{clean_category}"
-
-        # Mots-clés comme tags
-        keywords = result.get("keywords", [])
-        for keyword in keywords:
-            if isinstance(keyword, str):
-                clean_keyword = clean_tag(keyword)
-                if clean_keyword:
-                    content += f" #{clean_keyword}"
-
-        content += "*"
-
-        return content
-
-
-    def _generate_knowledge_note(self, result: Dict, category_info: Dict) -> str:
-        """Génère une note de type Knowledge avec formatage amélioré"""
-        # Extraire la catégorie depuis result
-        category = result.get("category", "")
-
-        content = f"""# {result['title']}
-
-**URL**: {result['url']}  
-**Type**: Knowledge 📰  
-**Domaine**: [[{category_info.get('moc', 'Unknown MOC')}]]  
-**Chaîne**: {result.get('channel', 'Unknown')}  
-**Date d'ajout**: {result['processed_at'][:10]}  
-
----
-
-## Résumé
-
-    {result.get('summary', 'Aucun résumé disponible')}
-    """
-
-        # Points clés
-        key_points = result.get("key_points", [])
-        if key_points:
-            content += "\n## Points Clés\n\n"
-            for point in key_points:
-                content += f"- {point}\n"
-
-        # À retenir
-        key_takeaway = result.get("key_takeaway", "")
-        if key_takeaway:
-            content += f"\n## À Retenir\n\n{key_takeaway}\n"
-
-        content += "\n## Notes Connectées\n\n<!-- Auto-générées -->\n\n---"
-
-        # Tags - avec nettoyage des accents
-        clean_category = clean_tag(category)
-        content += f"\n*Tags: #video #knowledge #{clean_category}"
-
-        # Mots-clés comme tags
-        keywords = result.get("keywords", [])
-        for keyword in keywords:
-            if isinstance(keyword, str):
-                clean_keyword = clean_tag(keyword)
-                if clean_keyword:
-                    content += f" #{clean_keyword}"
-
-        content += "*"
-
-        return content
-
+    def _linkable_tags(self, result: Dict) -> List[str]:
+        """Tags servant à relier les notes (le tag de catégorie est trop général)"""
+        return note_tags(result)[1:]
+    
+    def connected_notes(self, result: Dict, k: int = 5, planned: Optional[Dict[str, Path]] = None) -> List[str]:
+        """Wikilinks vers les k notes partageant le plus de mots-clés"""
+        links = []
+        planned = planned or {}
+        for other_id in self.tag_index.related(result.get('video_id'), self._linkable_tags(result), k):
+            other_path = planned.get(other_id) or self.vault_index.path_for(other_id)
+            if other_path is None:
+                continue
+            target = other_path.relative_to(self.vault_path).with_suffix('').as_posix()
+            links.append(f"[[{target}|{other_path.stem}]]")
+        return links
+    
+    def resolve_note_path(self, result: Dict, claimed: Optional[Dict[Path, str]] = None) -> Path:
+        """
+        Chemin de la note d'un résultat: le titre nettoyé, suffixé du video_id
+        si une autre vidéo occupe déjà ce nom
+        
+        Args:
+            result: Résultat de processing
+            claimed: Chemins déjà attribués dans le lot en cours (chemin -> video_id),
+                pas encore enregistrés dans l'index; complété avec le chemin retourné
+        """
+        self._load_layout()
+        folder = self.note_folder(result['category'], result.get('processed_at'))
+        title = self.clean_filename(result.get('title', 'Note sans titre'))
+        note_path = folder / f"{title}.md"
+        video_id = result.get('video_id')
+        claimed = {} if claimed is None else claimed
+        owner = claimed.get(note_path) or self.vault_index.owner_of(note_path)
+        if video_id and owner and owner != video_id:
+            note_path = folder / f"{title} ({video_id}).md"
+        if video_id:
+            claimed[note_path] = video_id
+        return note_path
+    
+    def migrate_layout(self, shard_by: str) -> int:
+        """
+        Déplace les notes existantes vers un nouveau découpage ('none', 'year', 'month')
+        
+        Les notes sont déplacées (sans être régénérées), l'index du coffre et le
+        manifeste suivent, puis les wikilinks vers les notes déplacées sont
+        réécrits dans tout le coffre. Le découpage choisi est enregistré dans
+        .vault_layout.json et utilisé par toutes les sauvegardes suivantes.
+        
+        Returns:
+            int: Nombre de notes déplacées
+        """
+        if shard_by not in SHARD_LAYOUTS:
+            raise ValueError(f"Découpage invalide: {shard_by}. Disponibles: {list(SHARD_LAYOUTS)}")
+        if not self.youtube_folder.is_dir():
+            raise FileNotFoundError(f"Dossier 'YouTube Knowledge' non trouvé dans {self.vault_path}")
+        
+        folder_to_category = {info['folder']: category for category, info in self.categories.items()}
+        with self._lock:
+            self.vault_index.refresh()
+            atomic_write_json(self.layout_file, {'shard_by': shard_by})
+            self._load_layout()
+            
+            moved_targets = {}   # ancienne cible de lien -> nouvelle
+            for video_id, relative_path in list(self.vault_index.notes.items()):
+                old_path = self.vault_path / relative_path
+                category = category_of_path(relative_path, folder_to_category)
+                if category is None:
+                    continue
+                processed_at = read_frontmatter(old_path).get('processed_at')
+                if not processed_at:
+                    processed_at = datetime.fromtimestamp(old_path.stat().st_mtime).isoformat()
+                folder = self.note_folder(category, processed_at)
+                new_path = folder / old_path.name
+                if new_path == old_path:
+                    continue
+                owner = self.vault_index.owner_of(new_path)
+                if owner and owner != video_id:
+                    new_path = folder / f"{old_path.stem} ({video_id}).md"
+                folder.mkdir(parents=True, exist_ok=True)
+                os.replace(old_path, new_path)
+                self.note_writer.move(old_path, new_path)
+                self.vault_index.register(video_id, new_path)
+                moved_targets[relative_path[:-len('.md')]] = self.vault_index.relative(new_path)[:-len('.md')]
+            
+            # Les liens "Notes Connectées" pointent vers des chemins complets
+            relinked = 0
+            if moved_targets:
+                def relink(match):
+                    return '[[' + moved_targets.get(match.group(1), match.group(1))
+                
+                with self.note_writer.batch() as batch:
+                    for relative_path in list(self.vault_index.files):
+                        note_path = self.vault_path / relative_path
+                        content = note_path.read_text(encoding='utf-8')
+                        updated = WIKILINK_TARGET_PATTERN.sub(relink, content)
+                        if updated != content:
+                            batch.write(note_path, updated)
+                            relinked += 1
+                self.vault_index.refresh()
+            
+            # Dossiers de date vidés par la migration
+            for root, _, _ in os.walk(self.videos_folder, topdown=False):
+                root_path = Path(root)
+                if root_path.parent != self.videos_folder and root_path != self.videos_folder \
+                        and not any(root_path.iterdir()):
+                    root_path.rmdir()
+            
+            self.vault_index.save()
+            self.flush_mocs()
+        
+        print(f"🗂️ Découpage '{shard_by}': {len(moved_targets)} notes déplacées, {relinked} notes aux liens réécrits")
+        return len(moved_targets)
+    
+    def _register_note(self, result: Dict, note_path: Path):
+        """Met à jour l'index et supprime l'ancienne note si elle a été déplacée"""
+        video_id = result.get('video_id')
+        if not video_id:
+            return
+        self.tag_index.update(video_id, self._linkable_tags(result))
+        old_path = self.vault_index.register(video_id, note_path)
+        if old_path is not None and old_path != note_path:
+            try:
+                old_path.unlink()
+                print(f"🚚 Note déplacée: {old_path.name} -> {note_path.parent.name}/")
+            except FileNotFoundError:
+                pass
+    
+    def get_note_path(self, video_id: str) -> Optional[Path]:
+        """Chemin de la note d'une vidéo, sans parcourir le coffre"""
+        return self.vault_index.path_for(video_id)
+    
+    def has_note(self, video_id: str) -> bool:
+        """Existence d'une note pour une vidéo (O(1))"""
+        return self.vault_index.has_note(video_id)
+    
+    def bulk_generate_from_processed_data(self, processed_file_path: str, max_workers: Optional[int] = None,
+                                          batch_size: int = 256) -> int:
+        """
+        Régénère les notes depuis l'historique processed_videos.json
+        
+        Premier passage: la dernière entrée de chaque vidéo fixe le chemin de sa
+        note et ses tags, enregistrés dans l'index des tags avant tout rendu.
+        Second passage: ces entrées sont relues paresseusement et rendues par
+        lots sur un pool de threads; les "Notes Connectées" voient donc tout
+        l'historique et deux régénérations produisent les mêmes notes. Une note
+        dont le contenu n'a pas changé n'est pas réécrite.
+        
+        Args:
+            processed_file_path: Chemin de processed_videos.json
+            max_workers: Taille du pool (défaut: celui de ThreadPoolExecutor)
+            batch_size: Nombre d'entrées en vol à la fois
+        Returns:
+            int: Nombre de notes réellement écrites
+        """
+        def results():
+            for position, entry in enumerate(iter_processed_entries(processed_file_path)):
+                if entry.get('category') in self.categories and isinstance(entry.get('result'), dict):
+                    yield position, entry['result']
+        
+        # Passage 1: dernière entrée de chaque vidéo (seuls les champs du chemin et les tags sont gardés)
+        latest = {}
+        for position, result in results():
+            video_id = result.get('video_id')
+            if video_id:
+                latest[video_id] = (position, {
+                    'video_id': video_id,
+                    'category': result.get('category'),
+                    'title': result.get('title', 'Note sans titre'),
+                    'processed_at': result.get('processed_at'),
+                }, self._linkable_tags(result))
+        
+        # Chemins attribués pendant la régénération (avant leur enregistrement dans l'index),
+        # résolus dans l'ordre de l'historique: deux titres identiques n'ont pas le même chemin
+        planned = {}
+        claimed = {}
+        errors = 0
+        with self._lock:
+            for _, path_fields, tags in sorted(latest.values(), key=lambda item: item[0]):
+                video_id = path_fields['video_id']
+                try:
+                    planned[video_id] = self.resolve_note_path(path_fields, claimed)
+                except Exception as e:
+                    print(f"❌ Erreur de chemin pour {video_id}: {e}")
+                    errors += 1
+                    continue
+                self.tag_index.update(video_id, tags)
+            self.tag_index.save()
+        
+        def wanted(item: Tuple[int, Dict]) -> bool:
+            position, result = item
+            known = latest.get(result.get('video_id'))
+            return known is None or (known[0] == position and result['video_id'] in planned)
+        
+        def render(result: Dict):
+            try:
+                return self.render_note(result, planned.get(result.get('video_id')), planned)
+            except Exception as e:
+                print(f"❌ Erreur de rendu pour {result.get('video_id')}: {e}")
+                return None
+        
+        # Passage 2: rendu et écriture des dernières entrées
+        pending = (result for _, result in filter(wanted, results()))
+        rendered = 0
+        written = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                batch = list(islice(pending, batch_size))
+                if not batch:
+                    break
+                # Un lot à la fois sous le verrou des sauvegardes (save_note attend la fin du lot)
+                with self._lock:
+                    notes = []
+                    with self.note_writer.batch(executor) as note_batch:
+                        for result, note in zip(batch, executor.map(render, batch)):
+                            if note is None:
+                                errors += 1
+                                continue
+                            note_batch.write(*note)
+                            notes.append((result, note[0]))
+                            rendered += 1
+                    written += note_batch.written
+                    for result, note_path in notes:
+                        self._register_note(result, note_path)
+                    self.vault_index.save()
+                    self.tag_index.save()
+                    self.flush_mocs()
+        
+        print(f"📝 Régénération: {written} notes écrites, {rendered - written} inchangées, {errors} erreurs")
+        return written
     
     def save_note(self, result: Dict) -> str:
         """
@@ -233,31 +1096,27 @@ class ObsidianGenerator:
             if not category or category not in self.categories:
                 raise ValueError(f"Catégorie invalide: {category}. Disponibles: {list(self.categories.keys())}")
 
-            # Récupérer les infos de la catégorie
-            category_info = self.categories[category]
-            folder_name = category_info['folder']
-            note_type = category_info['type']
-
-            # Créer le dossier de catégorie s'il n'existe pas
-            category_folder = self.videos_folder / folder_name
-            category_folder.mkdir(parents=True, exist_ok=True)
+            # Créer le dossier de catégorie s'il n'existe pas (une fois par process)
+            self.category_folder(category)
 
-            # Générer le contenu de la note selon le type
-            if note_type == 'learning':
-                note_content = self._generate_learning_note(result, category_info)
-            else:
-                note_content = self._generate_knowledge_note(result, category_info)
+            # Résolution du chemin, écriture et indexation sous verrou:
+            # deux requêtes simultanées ne peuvent pas se disputer un même nom
+            with self._lock:
+                # Générer le contenu et le chemin de la note (sans collision de titre)
+                note_path, note_content = self.render_note(result)
 
-            # Créer le nom du fichier
-            title = self.clean_filename(result.get('title', 'Note sans titre'))
-            note_path = category_folder / f"{title}.md"
-
-            # Sauvegarder la note
-            note_path.write_text(note_content, encoding='utf-8')
+                # Sauvegarder la note (atomique, ignorée si le contenu est identique)
+                if not self.note_writer.write(note_path, note_content):
+                    print(f"ℹ️ Note inchangée, fichier non réécrit")
+                
+                # Indexer la note (video_id -> chemin), déplacer si recatégorisée
+                self._register_note(result, note_path)
+                self.vault_index.save()
+                self.tag_index.save()
 
-            # CORRECTION: Ne plus appeler _update_moc car elle n'existe pas vraiment
-            # Les MOCs se mettent à jour automatiquement via Dataview
-            print(f"ℹ️ Note sauvegardée, MOC se met à jour automatiquement via Dataview")
+                # Seul le MOC de la catégorie est réécrit, et seulement s'il a changé
+                if self.flush_mocs():
+                    print(f"🗺️ MOC mis à jour: {self.categories[category]['moc']}")
 
             print(f"✅ Note sauvegardée: {note_path}")
             return str(note_path)
@@ -276,22 +1135,22 @@ class ObsidianGenerator:
             'recent_notes': []
         }
         
-        # Compter les notes par catégorie
-        for category, category_info in self.categories.items():
-            folder_path = self.videos_folder / category_info['folder']
-            if folder_path.exists():
-                notes = list(folder_path.glob('*.md'))
-                count = len(notes)
-                stats['by_category'][category] = count
-                stats['total_notes'] += count
-                
-                # Ajouter les notes récentes
-                for note_file in sorted(notes, key=lambda x: x.stat().st_mtime, reverse=True)[:3]:
-                    stats['recent_notes'].append({
-                        'name': note_file.stem,
-                        'category': category,
-                        'modified': datetime.fromtimestamp(note_file.stat().st_mtime).isoformat()
-                    })
+        # Servi depuis le catalogue mémoire (aucun parcours du coffre)
+        counts = self.catalogue.counts()
+        for category in self.categories:
+            count = counts.get(category, 0)
+            if not count:
+                continue
+            stats['by_category'][category] = count
+            stats['total_notes'] += count
+            
+            # Ajouter les notes récentes
+            for relative_path, mtime_ns in self.catalogue.recent(category, 3):
+                stats['recent_notes'].append({
+                    'name': Path(relative_path).stem,
+                    'category': category,
+                    'modified': datetime.fromtimestamp(mtime_ns / 1e9).isoformat()
+                })
         
         return stats
 
@@ -300,7 +1159,7 @@ def auto_generate_obsidian_notes(vault_path: str, processed_file_path: str = "yo
     """Fonction utilitaire pour générer automatiquement les notes"""
     generator = ObsidianGenerator(vault_path)
     
-    if Path(processed_file_path).exists():
+    if Path(processed_file_path).exists() or log_path_for(processed_file_path).exists():
         count = generator.bulk_generate_from_processed_data(processed_file_path)
         print(f"📝 {count} notes générées dans {vault_path}")
     else:
@@ -308,7 +1167,9 @@ def auto_generate_obsidian_notes(vault_path: str, processed_file_path: str = "yo
 
 if __name__ == "__main__":
     # Test du générateur
+    # Migration du découpage: python obsidian_generator.py migrate-layout [none|year|month]
     import os
+    import sys
     from dotenv import load_dotenv
     
     load_dotenv()
@@ -316,6 +1177,11 @@ if __name__ == "__main__":
     # Chemin vers ton coffre Obsidian (à configurer)
     OBSIDIAN_VAULT_PATH = os.getenv('OBSIDIAN_VAULT_PATH', './test_vault')
     
+    if len(sys.argv) >= 2 and sys.argv[1] == 'migrate-layout':
+        shard_by = sys.argv[2] if len(sys.argv) > 2 else 'month'
+        ObsidianGenerator(OBSIDIAN_VAULT_PATH).migrate_layout(shard_by)
+        sys.exit(0)
+    
     print(f"🧪 Test du générateur Obsidian")
     print(f"📁 Vault path: {OBSIDIAN_VAULT_PATH}")
     
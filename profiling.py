@@ -0,0 +1,322 @@
+# profiling.py - Profilage à la demande des requêtes Flask (cProfile ou échantillonnage) et instantanés mémoire
+import io
+import os
+import sys
+import hmac
+import time
+import random
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILERS = ('cprofile', 'sampling')
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        Échantillonneur de pile d'un thread (sys._current_frames), sans trace par appel
+
+        Les piles sont agrégées au format « folded » (flamegraph.pl, speedscope).
+
+        Args:
+            thread_id: Thread à observer (celui qui sert la requête)
+            interval: Période d'échantillonnage en secondes
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, limit: int = 30) -> str:
+        """Fonctions les plus souvent au sommet de la pile (temps propre échantillonné)"""
+        total = sum(self.stacks.values()) or 1
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f"{sum(self.stacks.values())} échantillons, période {self.interval * 1000:.1f} ms"]
+        lines += [f"{count * 100 / total:6.1f}%  {leaf}" for leaf, count in leaves.most_common(limit)]
+        return '\n'.join(lines) + '\n'
+
+
+class ProfileStore:
+    def __init__(self, directory: Path, keep: int = 100):
+        """
+        Dossier tournant des profils: chaque capture écrit des fichiers de même préfixe,
+        seules les `keep` captures les plus récentes sont conservées
+
+        Args:
+            directory: Dossier de sortie
+            keep: Nombre de captures conservées
+        """
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def new_stem(self, label: str) -> str:
+        # Horodatage en tête: l'ordre alphabétique est l'ordre chronologique
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{time.time_ns() % 1_000_000_000:09d}"
+        safe_label = ''.join(char if char.isalnum() or char in '-_' else '_' for char in label)
+        return f"{stamp}_{safe_label}_{os.getpid()}"
+
+    def path(self, stem: str, suffix: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f"{stem}{suffix}"
+
+    def rotate(self):
+        with self._lock:
+            try:
+                files = list(self.directory.iterdir())
+            except FileNotFoundError:
+                return
+            stems = sorted({file.name.split('.', 1)[0] for file in files})
+            expired = set(stems[:-self.keep]) if self.keep > 0 else set(stems)
+            for file in files:
+                if file.name.split('.', 1)[0] in expired:
+                    file.unlink(missing_ok=True)
+
+
+def memory_summary(snapshot: tracemalloc.Snapshot, previous: Optional[tracemalloc.Snapshot] = None,
+                   limit: int = 25) -> List[Dict]:
+    """Principales lignes allouantes (ou variations depuis l'instantané précédent)"""
+    # Tri puis exclusion des lignes internes: filter_traces() sur tout le process est bien plus lent
+    if previous is not None:
+        stats = [stat for stat in snapshot.compare_to(previous, 'lineno') if not _internal(stat.traceback)]
+        return [{'location': str(stat.traceback), 'size_kib': round(stat.size / 1024, 1),
+                 'size_diff_kib': round(stat.size_diff / 1024, 1), 'count_diff': stat.count_diff}
+                for stat in stats[:limit]]
+    stats = [stat for stat in snapshot.statistics('lineno') if not _internal(stat.traceback)]
+    return [{'location': str(stat.traceback), 'size_kib': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in stats[:limit]]
+
+
+def _internal(traceback: tracemalloc.Traceback) -> bool:
+    filename = traceback[0].filename
+    return filename == tracemalloc.__file__ or filename.startswith('<frozen importlib')
+
+
+class RequestProfiler:
+    def __init__(self, store: ProfileStore, mode: str = 'header', token: str = '',
+                 endpoints: Optional[List[str]] = None, sample_rate: float = 1.0,
+                 profiler: str = 'cprofile', interval: float = 0.005, memory: bool = False):
+        """
+        Profilage des requêtes sélectionnées
+
+        Args:
+            store: Dossier tournant des résultats
+            mode: 'header' (requêtes portant X-Profile) ou 'all' (toutes, selon sample_rate)
+            token: Valeur exigée dans X-Profile (et pour l'instantané mémoire); vide = aucun client autorisé
+            endpoints: Endpoints Flask profilables (tous si vide)
+            sample_rate: Fraction des requêtes profilées en mode 'all'
+            profiler: 'cprofile' (déterministe) ou 'sampling' (faible surcoût)
+            interval: Période de l'échantillonneur en secondes
+            memory: Instantané tracemalloc après chaque requête profilée
+        """
+        self.store = store
+        self.mode = mode
+        self.token = token
+        self.endpoints = set(endpoints or [])
+        self.sample_rate = sample_rate
+        self.profiler = profiler
+        self.interval = interval
+        self.memory = memory
+        # Un seul cProfile actif à la fois par process: les requêtes concurrentes ne sont pas profilées
+        self._cprofile_lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def authorized(self, header_value: Optional[str]) -> bool:
+        if not header_value or not self.token:
+            return False
+        return hmac.compare_digest(header_value, self.token)
+
+    def wants(self, endpoint: Optional[str], header_value: Optional[str]) -> bool:
+        if self.endpoints and endpoint not in self.endpoints:
+            return False
+        if self.mode == 'all':
+            return random.random() < self.sample_rate
+        return self.authorized(header_value)
+
+    def start(self, requested: Optional[str] = None):
+        """Démarre une capture; None si le profileur déterministe est déjà occupé"""
+        kind = requested if requested in PROFILERS else self.profiler
+        if self.memory and tracemalloc.is_tracing():
+            # Pic mesuré pour le process entier: approximatif si d'autres requêtes tournent en parallèle
+            tracemalloc.reset_peak()
+        if kind == 'sampling':
+            sampler = SamplingProfiler(threading.get_ident(), self.interval)
+            sampler.start()
+            return kind, sampler, time.perf_counter()
+        if not self._cprofile_lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Un autre outil de profilage est déjà actif (débogueur, sys.monitoring)
+            self._cprofile_lock.release()
+            return None
+        return kind, profile, time.perf_counter()
+
+    def finish(self, capture, label: str, status: int) -> str:
+        """Arrête la capture et écrit ses fichiers; retourne le préfixe commun"""
+        kind, profiler, started = capture
+        elapsed = time.perf_counter() - started
+        stem = self.store.new_stem(label)
+        header = f"{label} status={status} durée={elapsed * 1000:.1f} ms profileur={kind}\n\n"
+        if kind == 'sampling':
+            profiler.stop()
+            profiler.dump(self.store.path(stem, '.collapsed'))
+            report = profiler.summary()
+        else:
+            profiler.disable()
+            self._cprofile_lock.release()
+            profiler.dump_stats(self.store.path(stem, '.prof'))
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(40)
+            report = buffer.getvalue()
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # Instantané brut seulement: le classement sur tout le process prend des secondes,
+            # il se fait hors requête (tracemalloc.Snapshot.load puis statistics/compare_to)
+            tracemalloc.take_snapshot().dump(str(self.store.path(stem, '.tracemalloc')))
+            report += (f"\nMémoire (tracemalloc): {current / 1024:.1f} KiB tracés, "
+                       f"pic pendant la requête {peak / 1024:.1f} KiB\n")
+        with open(self.store.path(stem, '.txt'), 'w', encoding='utf-8') as f:
+            f.write(header + report)
+        self.store.rotate()
+        print(f"🔬 Profil {kind} écrit: {self.store.directory / stem}.* ({elapsed * 1000:.1f} ms)")
+        return stem
+
+    def memory_snapshot(self) -> Dict:
+        """Instantané tracemalloc du process, comparé au précédent (démarre le traçage au premier appel)"""
+        with self._memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._last_snapshot = None
+                return {'tracing': True, 'started': True,
+                        'message': "Traçage mémoire démarré: le prochain instantané montrera les allocations"}
+            snapshot = tracemalloc.take_snapshot()
+            stem = self.store.new_stem('memory')
+            snapshot.dump(str(self.store.path(stem, '.tracemalloc')))
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                'tracing': True,
+                'snapshot': stem,
+                'traced_kib': round(current / 1024, 1),
+                'peak_kib': round(peak / 1024, 1),
+                'top': memory_summary(snapshot, self._last_snapshot),
+            }
+            self._last_snapshot = snapshot
+        self.store.rotate()
+        return result
+
+
+def install_profiling(app, data_root: str = 'youtube_data') -> Optional[RequestProfiler]:
+    """
+    Branche le profilage sur l'application Flask selon l'environnement
+
+    Désactivé (PROFILING absent ou 'off'): aucun hook n'est enregistré, aucun surcoût.
+    Sans PROFILING_TOKEN, le profilage reste désactivé: n'importe quel client
+    pourrait sinon déclencher des captures et des instantanés mémoire.
+
+    Variables:
+        PROFILING: off | header | all
+        PROFILING_TOKEN: valeur attendue dans l'en-tête X-Profile (obligatoire)
+        PROFILING_ENDPOINTS: endpoints Flask séparés par des virgules (ex: process_video,api_staging)
+        PROFILING_SAMPLE_RATE: fraction des requêtes profilées en mode 'all'
+        PROFILER: cprofile | sampling (une requête peut choisir via X-Profile-Mode)
+        PROFILING_INTERVAL_MS: période de l'échantillonneur
+        PROFILING_MEMORY: 1 pour tracer la mémoire (tracemalloc) dès le démarrage
+        PROFILING_DIR, PROFILING_KEEP: dossier tournant et nombre de captures conservées
+    """
+    mode = os.getenv('PROFILING', 'off').lower()
+    if mode in ('', 'off', '0', 'false', 'no'):
+        return None
+    if mode not in ('header', 'all'):
+        print(f"⚠️ PROFILING={mode} inconnu (off, header, all): profilage désactivé")
+        return None
+    token = os.getenv('PROFILING_TOKEN', '')
+    if not token:
+        print("⚠️ PROFILING_TOKEN manquant: profilage désactivé")
+        return None
+
+    from flask import g, request, jsonify
+
+    store = ProfileStore(Path(os.getenv('PROFILING_DIR', str(Path(data_root) / 'profiles'))),
+                         keep=int(os.getenv('PROFILING_KEEP', '100')))
+    profiler = RequestProfiler(
+        store,
+        mode=mode,
+        token=token,
+        endpoints=[name.strip() for name in os.getenv('PROFILING_ENDPOINTS', '').split(',') if name.strip()],
+        sample_rate=float(os.getenv('PROFILING_SAMPLE_RATE', '1.0')),
+        profiler=os.getenv('PROFILER', 'cprofile').lower(),
+        interval=float(os.getenv('PROFILING_INTERVAL_MS', '5')) / 1000,
+        memory=os.getenv('PROFILING_MEMORY', '').lower() in ('1', 'true', 'yes'),
+    )
+    if profiler.memory and not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+
+    @app.before_request
+    def start_request_profile():
+        if request.endpoint == 'memory_snapshot':
+            return None
+        if profiler.wants(request.endpoint, request.headers.get('X-Profile')):
+            capture = profiler.start(request.headers.get('X-Profile-Mode'))
+            if capture is not None:
+                g.profile_capture = capture
+        return None
+
+    @app.after_request
+    def finish_request_profile(response):
+        capture = g.pop('profile_capture', None)
+        if capture is not None:
+            stem = profiler.finish(capture, request.endpoint or 'unknown', response.status_code)
+            response.headers['X-Profile-Id'] = stem
+        return response
+
+    @app.teardown_request
+    def abort_request_profile(exc):
+        # Exception non gérée: after_request n'a pas tourné, libérer le profileur quand même
+        capture = g.pop('profile_capture', None)
+        if capture is not None:
+            profiler.finish(capture, request.endpoint or 'unknown', 500)
+
+    @app.route('/debug/memory-snapshot', methods=['POST'])
+    def memory_snapshot():
+        """Instantané tracemalloc du process (diff avec le précédent)"""
+        if not profiler.authorized(request.headers.get('X-Profile')):
+            return jsonify({"error": "X-Profile requis"}), 403
+        return jsonify(profiler.memory_snapshot())
+
+    print(f"🔬 Profilage actif (mode {mode}, {profiler.profiler}) -> {store.directory}")
+    return profiler
@@ -0,0 +1,188 @@
+# search_index.py - Recherche plein texte des résultats traités (SQLite FTS5)
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Poids bm25 des colonnes indexées (même ordre que dans la table)
+COLUMN_WEIGHTS = {
+    'title': 5.0,
+    'channel': 1.0,
+    'summary': 2.0,
+    'concepts': 2.0,
+    'key_points': 1.0,
+    'keywords': 3.0,
+}
+_TERM = re.compile(r'\w+')
+
+
+def search_fields(result: Dict) -> Dict[str, str]:
+    """Texte de chaque colonne indexée pour un résultat Gemini"""
+    concepts = []
+    for concept in result.get('concepts') or []:
+        if isinstance(concept, dict):
+            concepts.append(f"{concept.get('name', '')} {concept.get('definition', '')}")
+        else:
+            concepts.append(str(concept))
+    key_points = [str(point) for point in result.get('key_points') or []]
+    for extra in ('applications', 'key_takeaway'):
+        if result.get(extra):
+            key_points.append(str(result[extra]))
+    return {
+        'title': result.get('title', ''),
+        'channel': result.get('channel', ''),
+        'summary': result.get('summary', ''),
+        'concepts': '\n'.join(concepts),
+        'key_points': '\n'.join(key_points),
+        'keywords': ' '.join(str(keyword) for keyword in result.get('keywords') or []),
+    }
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Requête utilisateur -> expression MATCH FTS5
+
+    Chaque mot devient un terme entre guillemets (aucune syntaxe FTS5 ne passe),
+    tous requis; le dernier est un préfixe pour la recherche au fil de la frappe.
+    """
+    terms = _TERM.findall(query or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchIndex:
+    def __init__(self, db_path: Path):
+        """
+        Index FTS5 des résultats traités (titre, chaîne, résumé, concepts, points clés, mots-clés)
+
+        Une connexion par thread; le journal WAL laisse les lectures de plusieurs
+        workers se poursuivre pendant une écriture.
+
+        Args:
+            db_path: Fichier SQLite de l'index
+        """
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._columns = list(COLUMN_WEIGHTS)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS videos USING fts5("
+                "video_id UNINDEXED, category UNINDEXED, processed_at UNINDEXED, "
+                + ', '.join(self._columns) +
+                ", tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            # Rowid stable par vidéo: une ré-indexation remplace la ligne sans parcourir la table FTS
+            conn.execute("CREATE TABLE IF NOT EXISTS video_rows (video_id TEXT PRIMARY KEY)")
+            # Nombre de vidéos et état de construction, tenus à jour à chaque écriture (len() sans count(*))
+            conn.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            if self._meta(conn, 'rows') is None:
+                # Index créé avant index_meta: compté une seule fois
+                rows = conn.execute("SELECT count(*) FROM video_rows").fetchone()[0]
+                conn.executemany("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)",
+                                 [('rows', rows), ('built', int(rows > 0))])
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection, key: str) -> Optional[int]:
+        row = conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _rows(self, entries: Iterable[Tuple[str, str, str, Dict]]) -> List[Tuple]:
+        rows = []
+        for video_id, category, processed_at, result in entries:
+            fields = search_fields(result)
+            rows.append((video_id, category, processed_at, *(fields[column] for column in self._columns)))
+        return rows
+
+    def _insert_sql(self) -> str:
+        placeholders = ', '.join('?' * (4 + len(self._columns)))
+        return (f"INSERT INTO videos (rowid, video_id, category, processed_at, {', '.join(self._columns)}) "
+                f"VALUES ({placeholders})")
+
+    def upsert(self, video_id: str, category: str, processed_at: str, result: Dict):
+        """Indexe (ou ré-indexe) un résultat traité"""
+        row = self._rows([(video_id, category, processed_at, result)])[0]
+        conn = self._connection()
+        with conn:
+            if conn.execute("INSERT OR IGNORE INTO video_rows (video_id) VALUES (?)", (video_id,)).rowcount:
+                conn.execute("UPDATE index_meta SET value = value + 1 WHERE key = 'rows'")
+            rowid = conn.execute("SELECT rowid FROM video_rows WHERE video_id = ?", (video_id,)).fetchone()[0]
+            conn.execute("DELETE FROM videos WHERE rowid = ?", (rowid,))
+            conn.execute(self._insert_sql(), (rowid, *row))
+
+    def rebuild(self, entries: Iterable[Tuple[str, str, str, Dict]]) -> int:
+        """Remplace tout l'index en une seule transaction (la dernière entrée d'une vidéo gagne)"""
+        latest = {entry[0]: entry for entry in entries}
+        rows = self._rows(latest.values())
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM videos")
+            conn.execute("DELETE FROM video_rows")
+            conn.executemany("INSERT INTO video_rows (rowid, video_id) VALUES (?, ?)",
+                             [(rowid, row[0]) for rowid, row in enumerate(rows, 1)])
+            conn.executemany(self._insert_sql(), [(rowid, *row) for rowid, row in enumerate(rows, 1)])
+            conn.executemany("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)",
+                             [('rows', len(rows)), ('built', 1)])
+        return len(rows)
+
+    def search(self, query: str, category: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Recherche classée par bm25
+
+        Returns:
+            tuple: (résultats de la page, nombre total de correspondances)
+        """
+        expression = match_expression(query)
+        if expression is None:
+            return [], 0
+        where = "videos MATCH ?"
+        params: List = [expression]
+        if category:
+            where += " AND category = ?"
+            params.append(category)
+
+        conn = self._connection()
+        total = conn.execute(f"SELECT count(*) FROM videos WHERE {where}", params).fetchone()[0]
+        weights = ', '.join(['0', '0', '0'] + [str(weight) for weight in COLUMN_WEIGHTS.values()])
+        summary_column = 3 + self._columns.index('summary')
+        rows = conn.execute(
+            f"SELECT video_id, category, processed_at, title, channel, "
+            f"snippet(videos, {summary_column}, '[', ']', '…', 16) AS snippet, "
+            f"bm25(videos, {weights}) AS score "
+            f"FROM videos WHERE {where} ORDER BY score LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [
+            {
+                'video_id': row['video_id'],
+                'category': row['category'],
+                'processed_at': row['processed_at'],
+                'title': row['title'],
+                'channel': row['channel'],
+                'snippet': row['snippet'],
+                'score': round(-row['score'], 4),
+            }
+            for row in rows
+        ], total
+
+    @property
+    def built(self) -> bool:
+        """True une fois l'historique indexé par rebuild(), même s'il était vide"""
+        return bool(self._meta(self._connection(), 'built'))
+
+    def __len__(self) -> int:
+        return self._meta(self._connection(), 'rows') or 0
@@ -0,0 +1,243 @@
+# similarity_index.py - Index de similarité des résumés (TF-IDF haché, matrice NumPy mappée en mémoire)
+import os
+import re
+import json
+import math
+import hashlib
+import threading
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Dépendance optionnelle: l'index est alors désactivé
+    np = None
+
+from json_store import FileLock, atomic_write_json
+
+_WORD = re.compile(r'\w{3,}')
+
+
+@lru_cache(maxsize=65536)
+def _token_slot(token: str, dim: int) -> Tuple[int, float]:
+    """Colonne et signe d'un mot (hashing trick)"""
+    digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+    return digest % dim, (1.0 if digest >> 63 else -1.0)
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots normalisés (sans accents, minuscules, 3 caractères minimum)"""
+    text = unicodedata.normalize('NFD', text or '')
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn').lower()
+    return _WORD.findall(text)
+
+
+def result_text(result: Dict) -> str:
+    """Texte indexé d'un résultat Gemini: titre, résumé, concepts, points clés, mots-clés"""
+    parts = [result.get('title', ''), result.get('summary', ''),
+             result.get('applications', ''), result.get('key_takeaway', '')]
+    for concept in result.get('concepts') or []:
+        if isinstance(concept, dict):
+            parts.extend([concept.get('name', ''), concept.get('definition', '')])
+        else:
+            parts.append(str(concept))
+    parts.extend(str(point) for point in result.get('key_points') or [])
+    parts.extend(str(keyword) for keyword in result.get('keywords') or [])
+    return ' '.join(part for part in parts if isinstance(part, str))
+
+
+class SimilarityIndex:
+    def __init__(self, index_dir: Path, dim: int = 512):
+        """
+        Index des résultats traités pour la recherche de vidéos similaires
+
+        Chaque résultat devient un vecteur TF-IDF haché et normalisé, ajouté en
+        fin de vectors.f32; la matrice est lue via np.memmap et une requête est
+        un seul produit matrice-vecteur. L'idf est figé au moment de l'ajout
+        (les premières vidéos indexées ont donc un idf plus grossier).
+
+        Args:
+            index_dir: Dossier de l'index (vectors.f32, ids.txt, meta.json)
+            dim: Nombre de colonnes du hashing trick
+        """
+        self.index_dir = Path(index_dir)
+        self.dim = dim
+        self.vectors_file = self.index_dir / "vectors.f32"
+        self.ids_file = self.index_dir / "ids.txt"
+        self.meta_file = self.index_dir / "meta.json"
+        self._lock = threading.Lock()
+        self._signature = None
+        self._matrix = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def _row_bytes(self) -> int:
+        return self.dim * 4
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('dim') == self.dim:
+                return meta
+        except (OSError, ValueError):
+            pass
+        return self._empty_meta()
+
+    def _empty_meta(self) -> Dict:
+        return {'dim': self.dim, 'docs': 0, 'df': [0] * self.dim}
+
+    def _refresh(self):
+        """Remappe la matrice et relit les identifiants si un autre process a ajouté des lignes"""
+        try:
+            vectors_stat = os.stat(self.vectors_file)
+            ids_stat = os.stat(self.ids_file)
+            signature = (vectors_stat.st_size, ids_stat.st_size, ids_stat.st_mtime_ns)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+        self._signature = signature
+        if signature is None:
+            self._matrix, self._ids, self._rows = None, [], {}
+            return
+        with open(self.ids_file, 'r', encoding='utf-8') as f:
+            ids = f.read().splitlines()
+        # Une ligne n'est visible qu'une fois son vecteur et son identifiant écrits
+        count = min(len(ids), signature[0] // self._row_bytes())
+        self._ids = ids[:count]
+        self._rows = {video_id: row for row, video_id in enumerate(self._ids)}
+        self._matrix = np.memmap(self.vectors_file, dtype=np.float32, mode='r',
+                                 shape=(count, self.dim)) if count else None
+
+    def _slot_counts(self, text: str) -> Dict[Tuple[int, float], int]:
+        counts: Dict[Tuple[int, float], int] = {}
+        for token in tokenize(text):
+            slot = _token_slot(token, self.dim)
+            counts[slot] = counts.get(slot, 0) + 1
+        return counts
+
+    def _vectorize(self, counts: Dict[Tuple[int, float], int], df: List[int], docs: int):
+        """Vecteur TF-IDF haché normalisé (None si aucun mot)"""
+        values = [(column, sign * (1.0 + math.log(count)) * (math.log((1 + docs) / (1 + df[column])) + 1.0))
+                  for (column, sign), count in counts.items()]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        columns, weights = zip(*values)
+        np.add.at(vector, np.array(columns), np.array(weights, dtype=np.float32))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _learn(counts: Dict[Tuple[int, float], int], meta: Dict):
+        """Ajoute un document aux fréquences documentaires"""
+        for column in {column for column, _ in counts}:
+            meta['df'][column] += 1
+        meta['docs'] += 1
+
+    def _forget(self, row: int, meta: Dict):
+        """Retire des fréquences documentaires le document d'une ligne (colonnes non nulles de son vecteur)"""
+        for column in np.flatnonzero(self._matrix[row]):
+            meta['df'][column] = max(meta['df'][column] - 1, 0)
+        meta['docs'] = max(meta['docs'] - 1, 0)
+
+    def add(self, video_id: str, result: Dict) -> bool:
+        """
+        Ajoute (ou remplace) le vecteur d'un résultat traité
+
+        Returns:
+            bool: False si l'index est indisponible ou le résultat vide
+        """
+        if np is None:
+            return False
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, FileLock(self.index_dir / ".lock"):
+            self._refresh()
+            meta = self._load_meta()
+            row = self._rows.get(video_id)
+            counts = self._slot_counts(result_text(result))
+            if not counts:
+                return False
+            if row is not None:
+                # Remplacement: les mots de l'ancien résumé ne comptent plus
+                self._forget(row, meta)
+            self._learn(counts, meta)
+            vector = self._vectorize(counts, meta['df'], meta['docs'])
+            if row is None:
+                with open(self.vectors_file, 'ab') as f:
+                    f.truncate(len(self._ids) * self._row_bytes())  # ligne orpheline d'un ajout interrompu
+                    f.write(vector.tobytes())
+                with open(self.ids_file, 'a', encoding='utf-8') as f:
+                    f.write(video_id + '\n')
+            else:
+                with open(self.vectors_file, 'r+b') as f:
+                    f.seek(row * self._row_bytes())
+                    f.write(vector.tobytes())
+            atomic_write_json(self.meta_file, meta, indent=None)
+            self._signature = None
+        return True
+
+    def add_many(self, entries: List[Tuple[str, Dict]]) -> int:
+        """Indexe un historique complet en une seule écriture (index vide uniquement)"""
+        if np is None or not entries:
+            return 0
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, FileLock(self.index_dir / ".lock"):
+            self._refresh()
+            if self._ids:
+                return 0
+            # Première passe: fréquences documentaires sur tout l'historique
+            meta = self._empty_meta()
+            counts_by_id = {}
+            for video_id, result in dict(entries).items():
+                counts = self._slot_counts(result_text(result))
+                if counts:
+                    counts_by_id[video_id] = counts
+                    self._learn(counts, meta)
+            ids = list(counts_by_id)
+            rows = [self._vectorize(counts, meta['df'], meta['docs']) for counts in counts_by_id.values()]
+            if not rows:
+                return 0
+            with open(self.vectors_file, 'wb') as f:
+                f.write(np.vstack(rows).tobytes())
+            with open(self.ids_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(video_id + '\n' for video_id in ids))
+            atomic_write_json(self.meta_file, meta, indent=None)
+            self._signature = None
+        return len(ids)
+
+    def similar(self, video_id: str, k: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        Les k résultats les plus proches d'une vidéo indexée (similarité cosinus)
+
+        Returns:
+            List: [(video_id, score)] triés par score décroissant, None si la vidéo n'est pas indexée
+        """
+        if np is None:
+            return None
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(video_id)
+            if row is None or self._matrix is None:
+                return None
+            matrix, ids = self._matrix, self._ids
+        scores = matrix @ np.asarray(matrix[row])
+        scores[row] = -np.inf
+        k = min(k, len(ids) - 1)
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(ids[i], round(float(scores[i]), 4)) for i in best]
+
+    def __len__(self) -> int:
+        if np is None:
+            return 0
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
@@ -0,0 +1,133 @@
+# tag_index.py - Index inversé tag -> notes, pour remplir les "Notes Connectées"
+import json
+import math
+import heapq
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List
+
+from json_store import apply_changes, file_signature, merge_json_file
+
+
+class TagIndex:
+    def __init__(self, index_file: Path, max_posting_scan: int = 2000):
+        """
+        Index inversé persistant des tags normalisés (clean_tag) vers les video_id
+
+        Les notes liées sont trouvées en parcourant uniquement les listes des
+        tags de la nouvelle note, jamais le coffre entier. Les tags rares pèsent
+        plus lourd (pondération idf).
+
+        Args:
+            index_file: Fichier JSON de l'index
+            max_posting_scan: Nombre maximum d'entrées lues par tag (les plus récentes)
+        """
+        self.index_file = Path(index_file)
+        self.max_posting_scan = max_posting_scan
+        self._lock = threading.RLock()
+        self._changed = set()   # video_id modifiés depuis la dernière sauvegarde
+        self._signature = None  # signature du fichier au dernier chargement
+        self.postings: Dict[str, Dict[str, None]] = {}  # tag -> video_ids (ordre d'insertion)
+        self.note_tags: Dict[str, List[str]] = {}       # video_id -> tags
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Relit l'index si un autre worker l'a réécrit (mtime, taille, inode)
+
+        Les notes modifiées localement et pas encore sauvegardées gardent leur
+        valeur locale; seules les listes des notes changées sont recalculées.
+
+        Returns:
+            bool: True si le fichier a été relu
+        """
+        with self._lock:
+            signature = file_signature(self.index_file)
+            if signature is None or signature == self._signature:
+                return False
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    notes = json.load(f).get('notes', {})
+            except (OSError, ValueError, AttributeError):
+                return False
+            self._signature = signature
+            for video_id in set(self.note_tags) | set(notes):
+                if video_id in self._changed:
+                    continue
+                if video_id in notes:
+                    self._replace(video_id, notes[video_id])
+                else:
+                    self._replace(video_id, [])
+                    del self.note_tags[video_id]
+            return True
+
+    def save(self):
+        """Persiste les notes modifiées, fusionnées avec celles écrites par les autres workers"""
+        with self._lock:
+            if self._changed and self.index_file.parent.exists():
+                changed, self._changed = self._changed, set()
+                merge_json_file(self.index_file,
+                                lambda data: apply_changes(data.setdefault('notes', {}), self.note_tags, changed))
+                # Le fichier fusionné contient aussi les notes des autres workers
+                self.refresh()
+
+    def _replace(self, video_id: str, tags: List[str]) -> bool:
+        """Remplace les tags d'une note dans les listes (sous self._lock)"""
+        previous = self.note_tags.get(video_id, [])
+        if previous == tags:
+            return False
+        for tag in previous:
+            posting = self.postings.get(tag)
+            if posting is not None:
+                posting.pop(video_id, None)
+                if not posting:
+                    del self.postings[tag]
+        for tag in tags:
+            self.postings.setdefault(tag, {})[video_id] = None
+        self.note_tags[video_id] = tags
+        return True
+
+    def update(self, video_id: str, tags: List[str]):
+        """Remplace les tags d'une note (mise à jour incrémentale des listes)"""
+        tags = list(dict.fromkeys(tag for tag in tags if tag))
+        with self._lock:
+            if self._replace(video_id, tags):
+                self._changed.add(video_id)
+
+    def remove(self, video_id: str):
+        """Retire une note de l'index (note supprimée)"""
+        self.update(video_id, [])
+        with self._lock:
+            if self.note_tags.pop(video_id, None) is not None:
+                self._changed.add(video_id)
+
+    def related(self, video_id: str, tags: List[str], k: int = 5) -> List[str]:
+        """
+        Les k notes partageant le plus de tags (pondérés par rareté)
+
+        Args:
+            video_id: Note courante (exclue des résultats)
+            tags: Tags normalisés de la note courante
+            k: Nombre de notes à retourner
+        Returns:
+            List[str]: video_id des notes liées, du plus au moins proche
+        """
+        scores: Dict[str, float] = {}
+        with self._lock:
+            self.refresh()
+            total = max(len(self.note_tags), 1)
+            for tag in dict.fromkeys(tags):
+                posting = self.postings.get(tag)
+                if not posting:
+                    continue
+                weight = math.log(1 + total / len(posting))
+                candidates = posting.keys()
+                if len(posting) > self.max_posting_scan:
+                    # Tag très fréquent: ne lire que les entrées les plus récentes
+                    candidates = islice(reversed(posting), self.max_posting_scan)
+                for other_id in candidates:
+                    if other_id != video_id:
+                        scores[other_id] = scores.get(other_id, 0.0) + weight
+        best = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [other_id for other_id, _ in best]
@@ -0,0 +1,41 @@
+# conftest.py - Environnement commun des tests (clés factices, données dans un dossier temporaire)
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Le système refuse de démarrer sans clés; aucune API n'est appelée par les tests
+os.environ.setdefault('YOUTUBE_CLIENT_ID', 'test-client-id')
+os.environ.setdefault('YOUTUBE_CLIENT_SECRET', 'test-client-secret')
+os.environ.setdefault('GOOGLE_AI_API_KEY', 'test-api-key')
+os.environ.setdefault('FLASK_SECRET_KEY', 'test-secret-key')
+
+
+@pytest.fixture
+def system(tmp_path):
+    """YouTubeLikedSystem du compte par défaut sur un dossier de données vide"""
+    from youtube_liked_system import YouTubeLikedSystem
+    return YouTubeLikedSystem(data_root=str(tmp_path / 'data'))
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """Module de l'application Flask, avec un registre de comptes neuf sur tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    import app_liked_system
+    from youtube_liked_system import YouTubeSystemRegistry
+    registry = YouTubeSystemRegistry(data_root=str(tmp_path / 'data'))
+    monkeypatch.setattr(app_liked_system, 'system_registry', registry)
+    if 'asgi_app' in sys.modules:
+        monkeypatch.setattr(sys.modules['asgi_app'], 'system_registry', registry)
+    app_liked_system.app.config['TESTING'] = True
+    return app_liked_system
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,121 @@
+# test_accounts.py - Comptes liés à la session signée et vérification du state OAuth
+import json
+
+import pytest
+
+
+def test_default_account_is_open(client):
+    response = client.get('/api/staging')
+    assert response.status_code == 200
+
+
+def test_other_account_requires_session(client):
+    assert client.get('/api/staging?account=alice').status_code == 403
+    assert client.get('/api/staging', headers={'X-Account-Id': 'alice'}).status_code == 403
+
+
+def test_cookie_alone_does_not_select_account(client):
+    client.set_cookie('account', 'alice')
+    client.get('/api/staging')
+    assert client.get('/api/staging?account=alice').status_code == 403
+
+
+def test_session_account_is_allowed_and_remembered(client, app_module):
+    with client.session_transaction() as session:
+        session['accounts'] = ['alice']
+    assert client.get('/api/staging?account=alice').status_code == 200
+    with client.session_transaction() as session:
+        assert session['account'] == 'alice'
+    assert app_module.system_registry.accounts() == ['alice']
+
+
+def test_invalid_account_id_is_rejected(client):
+    assert client.get('/api/staging?account=../etc').status_code == 400
+
+
+def test_resolve_account(app_module):
+    resolve = app_module.resolve_account
+    assert resolve(None, {}) == 'default'
+    assert resolve(None, {'account': 'bob'}) == 'bob'
+    assert resolve('bob', {'accounts': ['bob']}) == 'bob'
+    with pytest.raises(app_module.AccountAccessError):
+        resolve('bob', {'accounts': ['alice']})
+
+
+def test_oauth_callback_requires_session_state(client, app_module):
+    response = client.get('/oauth/callback?code=abc&state=alice:forged')
+    assert response.status_code == 400
+
+    with client.session_transaction() as session:
+        session['oauth_state'] = 'alice:expected'
+    response = client.get('/oauth/callback?code=abc&state=alice:other')
+    assert response.status_code == 400
+    # Le state attendu est consommé même en cas d'échec (pas de rejeu)
+    with client.session_transaction() as session:
+        assert 'oauth_state' not in session
+
+
+def test_oauth_callback_checks_stored_flow_state(system):
+    (system.data_dir / "temp_flow_data.json").write_text(json.dumps({'state': 'default:expected'}))
+    assert system.handle_oauth_callback('code', 'default:forged') is False
+    # Le flow en attente n'est pas annulé par un callback forgé
+    assert (system.data_dir / "temp_flow_data.json").exists()
+
+
+def test_linked_account_cannot_be_claimed_again(client, app_module):
+    alice = app_module.system_registry.get('alice')
+    alice.token_file.with_suffix('.json').write_text('{}')
+    assert client.get('/auth/youtube?account=alice').status_code == 403
+
+
+def test_asgi_routes_use_the_same_session(client, app_module):
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    asgi_client = TestClient(asgi_app.app)
+    assert asgi_client.post('/api/sync?account=alice').status_code == 403
+
+    with client.session_transaction() as session:
+        session['accounts'] = ['alice']
+    asgi_client.cookies.set('session', client.get_cookie('session').value)
+    assert asgi_app.request_account(_request('/api/sync?account=alice', asgi_client.cookies)) == 'alice'
+
+
+def _request(path, cookies):
+    from starlette.requests import Request
+    path, _, query = path.partition('?')
+    cookie_header = '; '.join(f"{name}={value}" for name, value in cookies.items())
+    return Request({'type': 'http', 'path': path, 'query_string': query.encode(),
+                    'headers': [(b'cookie', cookie_header.encode())]})
+
+
+def test_slow_account_creation_does_not_block_other_accounts(tmp_path, monkeypatch):
+    import threading
+    import youtube_liked_system
+    from youtube_liked_system import YouTubeSystemRegistry
+
+    registry = YouTubeSystemRegistry(data_root=str(tmp_path / 'data'))
+    registry.get('bob')
+    release = threading.Event()
+    started = threading.Event()
+    real_system = youtube_liked_system.YouTubeLikedSystem
+
+    def slow_system(account_id, **kwargs):
+        if account_id == 'alice':
+            started.set()
+            assert release.wait(5)
+        return real_system(account_id, **kwargs)
+
+    monkeypatch.setattr(youtube_liked_system, 'YouTubeLikedSystem', slow_system)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(registry.get('alice'))) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    assert started.wait(5)
+    # Compte déjà chargé et nouveau compte servis pendant la création d'alice
+    assert registry.get('bob').account_id == 'bob'
+    assert registry.get('carol').account_id == 'carol'
+    release.set()
+    for worker in workers:
+        worker.join(5)
+    assert len(results) == 2 and results[0] is results[1]
@@ -0,0 +1,71 @@
+# test_api_utils.py - paramètres de requête et pagination par curseur
+import time
+from datetime import datetime
+
+import pytest
+
+from api_utils import (ApiQueryError, decode_cursor, encode_cursor, first_index_since,
+                       paginate_by_key, parse_limit, parse_since)
+
+
+@pytest.fixture
+def paris_tz(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/Paris')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_since_converts_to_local_time(paris_tz):
+    assert parse_since('2026-01-15T09:00:00Z') == '2026-01-15T10:00:00'
+    assert parse_since('2026-07-15T09:00:00+00:00') == '2026-07-15T11:00:00'
+
+
+def test_parse_since_keeps_naive_values():
+    assert parse_since('2026-01-15T09:00:00') == '2026-01-15T09:00:00'
+    assert parse_since(None) is None
+    with pytest.raises(ApiQueryError):
+        parse_since('hier')
+
+
+def test_parse_since_matches_stored_timestamps(paris_tz):
+    stored = datetime(2026, 3, 1, 12, 0).isoformat()
+    entries = [{'processed_at': '2026-03-01T11:59:00'}, {'processed_at': stored}]
+    assert first_index_since(entries, parse_since('2026-03-01T11:00:00Z')) == 1
+
+
+def test_parse_limit_bounds():
+    assert parse_limit(None) == 100
+    assert parse_limit('0') == 1
+    assert parse_limit('100000') == 500
+    with pytest.raises(ApiQueryError):
+        parse_limit('abc')
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor({'k': ['a', '1']})) == {'k': ['a', '1']}
+    with pytest.raises(ApiQueryError):
+        decode_cursor('%%%')
+
+
+def test_paginate_by_key_walks_all_items_once():
+    items = [{'id': f"v{i:02d}", 'day': str(i % 3)} for i in range(25)]
+    seen, cursor = [], None
+    while True:
+        page, next_cursor = paginate_by_key(items, ['day', 'id'], decode_cursor(cursor), 10)
+        seen.extend(item['id'] for item in page)
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert sorted(seen) == sorted(item['id'] for item in items)
+    assert len(seen) == len(set(seen))
+
+
+def test_paginate_by_key_survives_removed_items():
+    items = [{'id': f"v{i}"} for i in range(6)]
+    page, cursor = paginate_by_key(items, ['id'], None, 3)
+    remaining = [item for item in items if item['id'] != 'v2']
+    page, cursor = paginate_by_key(remaining, ['id'], decode_cursor(cursor), 3)
+    assert [item['id'] for item in page] == ['v3', 'v4', 'v5']
+    assert cursor is None
@@ -0,0 +1,13 @@
+# test_asgi_process_video.py - validation des requêtes de la route native /process-video
+import pytest
+
+
+@pytest.mark.parametrize('body', [b'{"video_id": ', b'[1, 2]', b'\xff'])
+def test_malformed_json_is_a_client_error(app_module, body):
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    response = TestClient(asgi_app.app).post(
+        '/process-video', content=body, headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+    assert response.json() == {"success": False, "error": "JSON invalide"}
@@ -0,0 +1,45 @@
+# test_category_classifier.py - prédiction locale de catégorie
+from category_classifier import CategoryClassifier
+
+
+def entry(title, category, channel='Chaîne'):
+    return {'video_id': title, 'category': category, 'result': {'title': title, 'channel': channel}}
+
+
+HISTORY = [
+    entry('Apprendre Python asyncio', 'tech'),
+    entry('Python et les générateurs', 'tech'),
+    entry('Recette du pain maison', 'cuisine', channel='Cuisine TV'),
+    entry('Tarte aux pommes facile', 'cuisine', channel='Cuisine TV'),
+    entry('Ignorée', 'skipped'),
+]
+
+
+def test_sync_learns_in_memory_only(tmp_path):
+    model = CategoryClassifier(tmp_path / 'model.json', dim=1 << 12)
+    assert model.sync(HISTORY, ['tech', 'cuisine']) == 4
+    assert model.sync(HISTORY, ['tech', 'cuisine']) == 0
+    assert model.predict({'title': 'Python asyncio avancé'})['category'] == 'tech'
+    assert not (tmp_path / 'model.json').exists()
+
+
+def test_save_if_due_is_debounced(tmp_path):
+    model = CategoryClassifier(tmp_path / 'model.json', dim=1 << 12, save_interval=3600)
+    model.sync(HISTORY[:2])
+    assert model.save_if_due() is False
+    model.save_interval = 0
+    assert model.save_if_due() is True
+    assert model.save_if_due() is False  # rien de nouveau
+    reloaded = CategoryClassifier(tmp_path / 'model.json', dim=1 << 12)
+    assert reloaded.trained_count == 2
+
+
+def test_staging_predictions_do_not_write(system):
+    system.category_model.save_interval = 0
+    for item in HISTORY[:4]:
+        system.processed_store.append(dict(item, processed_at='2026-01-01T10:00:00'))
+    model_file = system.category_model.model_file
+    system.predict_categories([{'video_id': 'x', 'title': 'Python asyncio', 'channel': 'Chaîne'}])
+    assert not model_file.exists()
+    system.mark_as_processed('y', 'skipped', {'status': 'skipped'})
+    assert model_file.exists()
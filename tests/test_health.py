@@ -0,0 +1,6 @@
+# test_health.py - sonde /health
+def test_health_without_vault_path_is_unavailable(client, monkeypatch):
+    monkeypatch.delenv('OBSIDIAN_VAULT_PATH', raising=False)
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.get_json() == {"ok": False, "error": "OBSIDIAN_VAULT_PATH not set"}
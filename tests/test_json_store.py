@@ -0,0 +1,126 @@
+# test_json_store.py - JsonStore et journal en ajout seul (AppendLogStore)
+import json
+
+from json_store import AppendLogStore, JsonStore, log_path_for, read_log_entries
+
+
+def entry(i):
+    return {'video_id': f"v{i}", 'n': i}
+
+
+def test_json_store_transaction_and_cache(tmp_path):
+    store = JsonStore(tmp_path / 'doc.json', lambda: {'items': []})
+    with store.transaction() as data:
+        data['items'].append(1)
+    assert store.read() is store.read()
+    other = JsonStore(tmp_path / 'doc.json', dict)
+    assert other.read() == {'items': [1]}
+
+
+def test_append_is_visible_to_other_instances(tmp_path):
+    writer = AppendLogStore(tmp_path / 'processed.json', 'items')
+    reader = AppendLogStore(tmp_path / 'processed.json', 'items')
+    assert reader.read() == []
+    writer.append(entry(1))
+    writer.append(entry(2))
+    assert reader.read() == [entry(1), entry(2)]
+    assert not (tmp_path / 'processed.json').exists()
+
+
+def test_append_does_not_rewrite_snapshot(tmp_path):
+    store = AppendLogStore(tmp_path / 'processed.json', 'items', compact_every=100)
+    store.replace([entry(i) for i in range(50)])
+    before = (tmp_path / 'processed.json').stat()
+    for i in range(50, 60):
+        store.append(entry(i))
+    after = (tmp_path / 'processed.json').stat()
+    assert (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns)
+    assert len(store.read()) == 60
+
+
+def test_readers_keep_their_list(tmp_path):
+    store = AppendLogStore(tmp_path / 'processed.json', 'items')
+    store.append(entry(1))
+    seen = store.read()
+    store.append(entry(2))
+    assert seen == [entry(1)]
+    assert store.read() == [entry(1), entry(2)]
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    store = AppendLogStore(tmp_path / 'processed.json', 'items', compact_every=3)
+    for i in range(7):
+        store.append(entry(i))
+    snapshot = json.loads((tmp_path / 'processed.json').read_text())
+    assert snapshot['log_generation'] == 2
+    assert snapshot['items'] == [entry(i) for i in range(6)]
+    assert read_log_entries(log_path_for(tmp_path / 'processed.json'), 2) == [entry(6)]
+    fresh = AppendLogStore(tmp_path / 'processed.json', 'items')
+    assert fresh.read() == [entry(i) for i in range(7)]
+
+
+def test_compactor_and_upgrade(tmp_path):
+    (tmp_path / 'index.json').write_text(json.dumps({'videos': {'a': {'x': 1}}}))
+
+    def latest(items):
+        return list({item['video_id']: item for item in items}.values())
+
+    store = AppendLogStore(tmp_path / 'index.json', 'records', compactor=latest,
+                           upgrade=lambda data: [{'video_id': k, **v} for k, v in data.get('videos', {}).items()])
+    assert store.read() == [{'video_id': 'a', 'x': 1}]
+    store.append({'video_id': 'a', 'x': 2})
+    store.compact()
+    assert json.loads((tmp_path / 'index.json').read_text())['records'] == [{'video_id': 'a', 'x': 2}]
+
+
+def test_interrupted_compaction_does_not_duplicate(tmp_path):
+    path = tmp_path / 'processed.json'
+    store = AppendLogStore(path, 'items', compact_every=100)
+    for i in range(3):
+        store.append(entry(i))
+    # Instantané écrit, journal pas encore remis à zéro (arrêt entre les deux étapes)
+    path.write_text(json.dumps({'log_generation': 1, 'items': [entry(i) for i in range(3)]}))
+    fresh = AppendLogStore(path, 'items', compact_every=100)
+    assert fresh.read() == [entry(i) for i in range(3)]
+    fresh.append(entry(3))
+    assert AppendLogStore(path, 'items').read() == [entry(i) for i in range(4)]
+
+
+def test_torn_last_line_is_ignored_then_truncated(tmp_path):
+    path = tmp_path / 'processed.json'
+    store = AppendLogStore(path, 'items')
+    store.append(entry(1))
+    with open(log_path_for(path), 'a') as f:
+        f.write('{"video_id": "v2", "n"')
+    fresh = AppendLogStore(path, 'items')
+    assert fresh.read() == [entry(1)]
+    fresh.append(entry(3))
+    assert AppendLogStore(path, 'items').read() == [entry(1), entry(3)]
+
+
+def test_legacy_snapshot_without_log(tmp_path):
+    path = tmp_path / 'processed.json'
+    path.write_text(json.dumps({'items': [entry(1)]}, indent=2))
+    store = AppendLogStore(path, 'items')
+    assert store.read() == [entry(1)]
+    store.append(entry(2))
+    assert AppendLogStore(path, 'items').read() == [entry(1), entry(2)]
+
+
+def test_iter_processed_entries_reads_snapshot_then_log(tmp_path):
+    from obsidian_generator import iter_processed_entries
+    path = tmp_path / 'processed_videos.json'
+    store = AppendLogStore(path, 'processed_videos', compact_every=2)
+    for i in range(5):
+        store.append(entry(i))
+    assert list(iter_processed_entries(str(path), chunk_size=16)) == [entry(i) for i in range(5)]
+
+
+def test_mark_as_processed_appends(system):
+    system.mark_as_processed('a', 'skipped', {'status': 'skipped'})
+    system.mark_as_processed('b', 'skipped', {'status': 'skipped'})
+    assert [e['video_id'] for e in system.get_processed_videos()] == ['a', 'b']
+    assert system.get_processed_entry('b')['category'] == 'skipped'
+    assert system._load_processed_video_ids() == {'a', 'b'}
+    assert not system.processed_file.exists()
+    assert log_path_for(system.processed_file).exists()
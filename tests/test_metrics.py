@@ -0,0 +1,29 @@
+# test_metrics.py - métriques au format texte Prometheus
+import pytest
+
+from metrics import MetricsRegistry, _Metric
+
+
+def test_metric_base_requires_samples():
+    with pytest.raises(TypeError):
+        _Metric('base', 'sans échantillons')
+
+    class Incomplete(_Metric):
+        kind = 'gauge'
+
+    with pytest.raises(TypeError):
+        Incomplete('incomplete', 'sans échantillons')
+
+
+def test_registry_renders_counters_and_histograms():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requêtes', ('route',))
+    assert registry.counter('requests_total', 'Requêtes', ('route',)) is requests
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    registry.histogram('latency_seconds', 'Latence', buckets=(0.1, 1.0)).observe(0.5)
+    text = registry.render()
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_count 1' in text
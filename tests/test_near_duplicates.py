@@ -0,0 +1,69 @@
+# test_near_duplicates.py - index MinHash/LSH en journal d'ajouts
+import json
+
+from json_store import log_path_for, read_log_entries
+from near_duplicates import NearDuplicateIndex
+
+TITLE = "Apprendre Python asyncio en une heure: le guide complet pour débutants"
+
+
+def video(video_id, title=TITLE):
+    return {'video_id': video_id, 'title': title, 'description': ''}
+
+
+def log_lines(path):
+    generation = json.loads(path.read_text())['log_generation']
+    return read_log_entries(log_path_for(path), generation)
+
+
+def test_finds_reuploads_within_and_across_batches(tmp_path):
+    index = NearDuplicateIndex(tmp_path / 'near_duplicates.json')
+    found = index.index_videos([video('a'), video('b', TITLE + ' (réupload)'), video('c', 'Recette de la tarte aux pommes')])
+    assert list(found) == ['b'] and found['b'][0]['video_id'] == 'a'
+    other = NearDuplicateIndex(tmp_path / 'near_duplicates.json')
+    assert {match['video_id'] for match in other.find_duplicates(video('d'))} == {'a', 'b'}
+    assert len(other) == 3
+
+
+def test_mark_processed_appends_one_record(tmp_path):
+    path = tmp_path / 'near_duplicates.json'
+    index = NearDuplicateIndex(path)
+    index.index_videos([video('a'), video('b', 'Recette de la tarte aux pommes')])
+    index.store.compact()
+    before = path.stat()
+    assert index.mark_processed('a') is True
+    assert index.mark_processed('a') is True
+    assert index.mark_processed('inconnue') is False
+    assert path.stat().st_mtime_ns == before.st_mtime_ns
+    assert log_lines(path) == [{'video_id': 'a', 'processed': True}]
+    assert NearDuplicateIndex(path).find_duplicates(video('x'))[0]['processed'] is True
+
+
+def test_reindexing_unchanged_videos_writes_nothing(tmp_path):
+    path = tmp_path / 'near_duplicates.json'
+    index = NearDuplicateIndex(path)
+    index.index_videos([video('a')])
+    size = log_path_for(path).stat().st_size
+    index.index_videos([video('a')])
+    assert log_path_for(path).stat().st_size == size
+
+
+def test_compaction_keeps_one_record_per_video(tmp_path):
+    path = tmp_path / 'near_duplicates.json'
+    index = NearDuplicateIndex(path, compact_every=3)
+    index.index_videos([video('a')])
+    index.mark_processed('a')
+    index.index_videos([video('b', 'Recette de la tarte aux pommes')])
+    records = json.loads(path.read_text())['records']
+    assert [record['video_id'] for record in records] == ['a', 'b']
+    assert records[0]['processed'] is True and records[0]['title'] == TITLE
+
+
+def test_reads_the_legacy_format(tmp_path):
+    path = tmp_path / 'near_duplicates.json'
+    legacy = NearDuplicateIndex(tmp_path / 'scratch.json')
+    signature = legacy._encode(legacy.signature(TITLE))
+    path.write_text(json.dumps({'videos': {'a': {'title': TITLE, 'signature': signature, 'processed': True}}}))
+    index = NearDuplicateIndex(path)
+    assert len(index) == 1
+    assert index.find_duplicates(video('b'))[0] == {'video_id': 'a', 'title': TITLE, 'similarity': 1.0, 'processed': True}
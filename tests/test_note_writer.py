@@ -0,0 +1,68 @@
+# test_note_writer.py - écritures de notes et manifeste d'empreintes
+import hashlib
+import json
+import os
+
+from obsidian_generator import NoteWriter
+
+
+def sha(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def test_reads_hash_only_manifest(tmp_path):
+    kept = tmp_path / 'Videos' / 'kept.md'
+    edited = tmp_path / 'Videos' / 'edited.md'
+    kept.parent.mkdir()
+    kept.write_text('contenu', encoding='utf-8')
+    edited.write_text('avant', encoding='utf-8')
+    manifest = tmp_path / '.note_hashes.json'
+    manifest.write_text(json.dumps({'Videos/kept.md': sha('contenu'), 'Videos/edited.md': sha('avant'),
+                                    'Videos/gone.md': sha('x')}))
+    later = os.stat(manifest).st_mtime_ns + 10**9
+    os.utime(edited, ns=(later, later))
+
+    writer = NoteWriter(tmp_path, manifest)
+    st = kept.stat()
+    assert writer._manifest == {'Videos/kept.md': [sha('contenu'), st.st_mtime_ns, st.st_size]}
+    assert writer.write(kept, 'contenu') is False
+    assert writer.write(edited, 'après') is True
+    saved = json.loads(manifest.read_text())
+    assert all(isinstance(entry, list) for entry in saved.values())
+
+
+def test_unchanged_content_is_not_rewritten(tmp_path):
+    writer = NoteWriter(tmp_path, tmp_path / '.note_hashes.json')
+    note = tmp_path / 'a.md'
+    assert writer.write(note, 'un') is True
+    inode = note.stat().st_ino
+    assert writer.write(note, 'un') is False
+    assert note.stat().st_ino == inode
+    assert writer.write(note, 'deux') is True
+    assert note.read_text(encoding='utf-8') == 'deux'
+
+
+def test_writes_outside_a_batch_are_not_deferred(tmp_path):
+    writer = NoteWriter(tmp_path, tmp_path / '.note_hashes.json')
+    batched = tmp_path / 'batched.md'
+    direct = tmp_path / 'direct.md'
+    with writer.batch() as batch:
+        batch.write(batched, 'v1')
+        batch.write(batched, 'v2')
+        # Sauvegarde d'une note par une autre requête pendant la régénération
+        assert writer.write(direct, 'immédiat') is True
+        assert direct.read_text(encoding='utf-8') == 'immédiat'
+        assert not batched.exists()
+    assert batched.read_text(encoding='utf-8') == 'v2'
+    assert batch.written == 1
+
+
+def test_concurrent_batches_flush_their_own_writes(tmp_path):
+    writer = NoteWriter(tmp_path, tmp_path / '.note_hashes.json')
+    with writer.batch() as outer:
+        outer.write(tmp_path / 'outer.md', 'a')
+        with writer.batch() as inner:
+            inner.write(tmp_path / 'inner.md', 'b')
+        assert inner.written == 1
+        assert not (tmp_path / 'outer.md').exists()
+    assert outer.written == 1
@@ -0,0 +1,124 @@
+# test_obsidian_generator.py - régénération en masse, index du coffre et des tags
+import pytest
+
+from json_store import AppendLogStore
+from obsidian_generator import ObsidianGenerator
+
+
+def result(video_id, title, keywords=(), processed_at='2026-02-03T10:00:00'):
+    return {
+        'video_id': video_id,
+        'title': title,
+        'channel': 'Chaîne',
+        'category': 'ai_technique_learning',
+        'processing_type': 'learning',
+        'processed_at': processed_at,
+        'summary': f"Résumé de {title}",
+        'keywords': list(keywords),
+        'concepts': [],
+        'applications': '',
+    }
+
+
+@pytest.fixture
+def generator(tmp_path):
+    (tmp_path / 'vault' / 'YouTube Knowledge').mkdir(parents=True)
+    return ObsidianGenerator(str(tmp_path / 'vault'))
+
+
+def write_history(path, results):
+    store = AppendLogStore(path, 'processed_videos')
+    for item in results:
+        store.append({'video_id': item['video_id'], 'category': item['category'], 'result': item,
+                      'processed_at': item['processed_at']})
+    return str(path)
+
+
+def test_bulk_generation_writes_notes_and_is_idempotent(generator, tmp_path):
+    history = write_history(tmp_path / 'processed_videos.json',
+                            [result('a', 'Premier'), result('b', 'Second')])
+    assert generator.bulk_generate_from_processed_data(history) == 2
+    assert generator.get_note_path('a').name == 'Premier.md'
+    assert generator.bulk_generate_from_processed_data(history) == 0
+
+
+def test_migrate_layout_moves_notes(generator, tmp_path):
+    generator.save_note(result('a', 'Premier'))
+    assert generator.migrate_layout('year') == 1
+    assert generator.get_note_path('a').parent.name == '2026'
+    assert generator.get_note_path('a').exists()
+
+
+def test_bulk_generation_keeps_duplicate_titles_apart(generator, tmp_path):
+    history = write_history(tmp_path / 'processed_videos.json',
+                            [result('a', 'Même titre'), result('b', 'Même titre'), result('c', 'Même titre')])
+    assert generator.bulk_generate_from_processed_data(history, batch_size=8) == 3
+    names = sorted(generator.get_note_path(video_id).name for video_id in 'abc')
+    assert names == ['Même titre (b).md', 'Même titre (c).md', 'Même titre.md']
+    assert all(generator.get_note_path(video_id).exists() for video_id in 'abc')
+    assert generator.bulk_generate_from_processed_data(history, batch_size=8) == 0
+
+
+def test_resolve_note_path_claims_within_a_batch(generator):
+    claimed = {}
+    first = generator.resolve_note_path(result('a', 'Titre'), claimed)
+    second = generator.resolve_note_path(result('b', 'Titre'), claimed)
+    again = generator.resolve_note_path(result('a', 'Titre'), claimed)
+    assert first != second and again == first
+    assert second.name == 'Titre (b).md'
+
+
+def test_index_saves_merge_between_workers(tmp_path):
+    (tmp_path / 'vault' / 'YouTube Knowledge').mkdir(parents=True)
+    first = ObsidianGenerator(str(tmp_path / 'vault'))
+    second = ObsidianGenerator(str(tmp_path / 'vault'))
+    first.save_note(result('a', 'Premier', keywords=['python']))
+    second.save_note(result('b', 'Second', keywords=['rust']))
+    fresh = ObsidianGenerator(str(tmp_path / 'vault'))
+    assert fresh.has_note('a') and fresh.has_note('b')
+    assert set(fresh.tag_index.note_tags) == {'a', 'b'}
+    for video_id in 'ab':
+        assert fresh.vault_index.relative(fresh.get_note_path(video_id)) in fresh.note_writer._manifest
+
+
+def test_bulk_generation_links_notes_from_the_whole_history(generator, tmp_path):
+    history = write_history(tmp_path / 'processed_videos.json', [
+        result('a', 'Premier', keywords=['python', 'asyncio']),
+        result('b', 'Second', keywords=['python', 'asyncio']),
+    ])
+    assert generator.bulk_generate_from_processed_data(history, batch_size=1) == 2
+    # La première note rendue voit déjà la seconde
+    assert 'Second' in generator.get_note_path('a').read_text(encoding='utf-8').split('Notes Connectées')[-1]
+    assert generator.bulk_generate_from_processed_data(history, batch_size=1) == 0
+
+
+def test_bulk_generation_renders_the_latest_entry_only(generator, tmp_path):
+    history = write_history(tmp_path / 'processed_videos.json', [
+        result('a', 'Ancien titre'), result('a', 'Nouveau titre'),
+    ])
+    assert generator.bulk_generate_from_processed_data(history) == 1
+    assert generator.get_note_path('a').name == 'Nouveau titre.md'
+    assert not (generator.get_note_path('a').parent / 'Ancien titre.md').exists()
+
+
+def test_deleted_note_leaves_the_tag_index(generator):
+    generator.save_note(result('a', 'Premier', keywords=['python']))
+    generator.save_note(result('b', 'Second', keywords=['python']))
+    generator.get_note_path('a').unlink()
+    generator.vault_index.refresh()
+    generator._vault_refreshed()
+    assert 'a' not in generator.tag_index.note_tags
+    assert generator.connected_notes(result('c', 'Autre', keywords=['python'])) == [
+        f"[[{generator.vault_index.relative(generator.get_note_path('b'))[:-3]}|Second]]"]
+
+
+def test_moc_includes_notes_saved_by_other_workers(tmp_path):
+    (tmp_path / 'vault' / 'YouTube Knowledge').mkdir(parents=True)
+    first = ObsidianGenerator(str(tmp_path / 'vault'))
+    second = ObsidianGenerator(str(tmp_path / 'vault'))
+    first.save_note(result('a', 'Premier'))
+    second.save_note(result('b', 'Second'))
+    moc = second.categories['ai_technique_learning']['moc']
+    content = second.moc_index.moc_path(moc).read_text(encoding='utf-8')
+    assert '|Premier]]' in content and '|Second]]' in content
+    assert second.vault_index.has_note('a')
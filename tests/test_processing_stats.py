@@ -0,0 +1,36 @@
+# test_processing_stats.py - compteurs dérivés de l'historique traité
+import json
+
+
+def process(system, video_id, category='skipped'):
+    system.mark_as_processed(video_id, category, {'status': category, 'processing_type': 'skipped'})
+
+
+def test_reprocessed_video_counts_once(system):
+    process(system, 'a')
+    process(system, 'a')
+    process(system, 'b')
+    assert system.get_stats()['processed_videos'] == 2
+    counters = system.get_processing_counters()
+    assert counters['entries'] == 3
+    assert counters['by_category'] == {'skipped': 3}
+
+
+def test_counters_catch_up_with_history(system):
+    process(system, 'a')
+    # Arrêt entre l'ajout au journal et la mise à jour des compteurs
+    system.processed_store.append({'video_id': 'b', 'category': 'tech', 'result': {}, 'processed_at': '2026-01-02T10:00:00'})
+    stats_before = system.stats_file.read_bytes()
+    counters = system.get_processing_counters()
+    assert counters['total'] == 2 and counters['by_category'] == {'skipped': 1, 'tech': 1}
+    assert system.stats_file.read_bytes() == stats_before  # lecture sans écriture
+    process(system, 'c')
+    assert json.loads(system.stats_file.read_text())['entries'] == 3
+
+
+def test_counters_without_position_are_recounted(system):
+    process(system, 'a')
+    system.stats_file.write_text(json.dumps({'total': 40, 'by_category': {}, 'by_processing_type': {}, 'by_day': {}}))
+    assert system.get_processing_counters()['total'] == 1
+    system.rebuild_stats()
+    assert json.loads(system.stats_file.read_text())['entries'] == 1
@@ -0,0 +1,37 @@
+# test_profiling.py - activation et autorisation du profilage à la demande
+from flask import Flask
+
+from profiling import install_profiling
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    return app
+
+
+def test_profiling_requires_a_token(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILING', 'header')
+    monkeypatch.delenv('PROFILING_TOKEN', raising=False)
+    app = make_app()
+    assert install_profiling(app, str(tmp_path)) is None
+    client = app.test_client()
+    assert 'X-Profile-Id' not in client.get('/ping', headers={'X-Profile': '1'}).headers
+    assert client.post('/debug/memory-snapshot').status_code == 404
+
+
+def test_profiling_only_for_the_token(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILING', 'header')
+    monkeypatch.setenv('PROFILING_TOKEN', 'secret')
+    monkeypatch.setenv('PROFILING_DIR', str(tmp_path / 'profiles'))
+    app = make_app()
+    assert install_profiling(app, str(tmp_path)) is not None
+    client = app.test_client()
+    assert 'X-Profile-Id' not in client.get('/ping', headers={'X-Profile': 'autre'}).headers
+    assert client.post('/debug/memory-snapshot', headers={'X-Profile': 'autre'}).status_code == 403
+    response = client.get('/ping', headers={'X-Profile': 'secret'})
+    assert (tmp_path / 'profiles' / f"{response.headers['X-Profile-Id']}.txt").exists()
@@ -0,0 +1,50 @@
+# test_search_index.py - index plein texte des résultats traités
+import sqlite3
+
+from search_index import SearchIndex
+
+
+def result(title, summary='Résumé'):
+    return {'title': title, 'channel': 'Chaîne', 'summary': summary, 'keywords': ['python']}
+
+
+def test_len_follows_upserts_and_rebuilds(tmp_path):
+    index = SearchIndex(tmp_path / 'search.db')
+    assert len(index) == 0 and not index.built
+    index.upsert('a', 'tech', '2026-01-01T10:00:00', result('Asyncio en pratique'))
+    index.upsert('a', 'tech', '2026-01-01T10:00:00', result('Asyncio en pratique, v2'))
+    index.upsert('b', 'tech', '2026-01-02T10:00:00', result('Rust pour pythonistes'))
+    assert len(index) == 2
+    assert index.rebuild([]) == 0
+    assert len(index) == 0 and index.built
+
+
+def test_search_ranks_title_matches(tmp_path):
+    index = SearchIndex(tmp_path / 'search.db')
+    index.rebuild([
+        ('a', 'tech', '2026-01-01', result('Asyncio en pratique')),
+        ('b', 'tech', '2026-01-02', result('Rust', summary='Une comparaison avec asyncio')),
+    ])
+    matches, total = index.search('asynci')
+    assert total == 2 and [match['video_id'] for match in matches] == ['a', 'b']
+    assert index.search('asyncio', category='autre') == ([], 0)
+
+
+def test_index_without_metadata_is_counted_once(tmp_path):
+    SearchIndex(tmp_path / 'search.db').upsert('a', 'tech', '', result('Titre'))
+    conn = sqlite3.connect(tmp_path / 'search.db')
+    with conn:
+        conn.execute("DROP TABLE index_meta")
+    conn.close()
+    index = SearchIndex(tmp_path / 'search.db')
+    assert len(index) == 1 and index.built
+
+
+def test_backfill_matches_incremental_indexing(system):
+    system.mark_as_processed('skip', 'skipped', {'title': 'Ignorée', 'summary': 'x'})
+    system.processed_store.append({'video_id': 'vide', 'category': 'tech', 'result': {'title': 'Sans résumé'},
+                                   'processed_at': '2026-01-01T10:00:00'})
+    system.processed_store.append({'video_id': 'a', 'category': 'tech', 'result': result('Asyncio'),
+                                   'processed_at': '2026-01-01T11:00:00'})
+    assert system.search_processed('asyncio')[1] == 1
+    assert len(system.search_index) == 1
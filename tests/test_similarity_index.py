@@ -0,0 +1,24 @@
+# test_similarity_index.py - index TF-IDF haché des résumés
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from similarity_index import SimilarityIndex
+
+
+def test_replacing_a_row_updates_document_frequencies(tmp_path):
+    index = SimilarityIndex(tmp_path / 'similarity')
+    index.add('a', {'title': 'python asyncio'})
+    index.add('b', {'title': 'python rust'})
+    index.add('a', {'title': 'kubernetes helm'})
+
+    reference = SimilarityIndex(tmp_path / 'reference')
+    reference.add('b', {'title': 'python rust'})
+    reference.add('a', {'title': 'kubernetes helm'})
+
+    meta = json.loads(index.meta_file.read_text())
+    assert meta == json.loads(reference.meta_file.read_text())
+    assert meta['docs'] == 2
+    assert len(index) == 2
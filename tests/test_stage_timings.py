@@ -0,0 +1,37 @@
+# test_stage_timings.py - chronométrage des étapes de traitement
+import json
+
+
+def timing_records(output):
+    return [json.loads(line) for line in output.splitlines()
+            if line.startswith('{') and '"stage_timings"' in line]
+
+
+def stub_processing(app_module, system, monkeypatch):
+    monkeypatch.setattr(system, 'process_video_with_gemini',
+                        lambda video, category: {'title': video['title'], 'summary': 'Résumé'})
+    monkeypatch.setattr(system, 'unlike_video', lambda video_id: True)
+    monkeypatch.setattr(app_module, 'save_obsidian_note', lambda result: None)
+
+
+def test_complete_processing_reports_its_own_timer(app_module, capsys):
+    system = app_module.system_registry.get('default')
+    system.save_to_staging([{'video_id': 'a', 'title': 'Titre', 'channel': 'Chaîne'}])
+    app_module.complete_processing(system, 'a', 'skipped', {'status': 'skipped'})
+    records = timing_records(capsys.readouterr().out)
+    assert [record['route'] for record in records] == ['complete_processing']
+    assert {'mark_as_processed', 'remove_from_staging'} <= set(records[0]['stages_ms'])
+
+
+def test_accept_predictions_reports_one_request_timer(app_module, client, monkeypatch, capsys):
+    system = app_module.system_registry.get('default')
+    stub_processing(app_module, system, monkeypatch)
+    monkeypatch.setattr(system, 'predict_categories', lambda videos: {
+        video['video_id']: {'category': 'ai_technique_learning', 'confidence': 0.99} for video in videos})
+    system.save_to_staging([{'video_id': f"v{i}", 'title': f"Titre {i}", 'channel': 'Chaîne'} for i in range(2)])
+    capsys.readouterr()
+    response = client.post('/api/staging/accept-predictions', json={'limit': 5})
+    assert response.get_json()['processed_count'] == 2
+    records = timing_records(capsys.readouterr().out)
+    assert [record['route'] for record in records] == ['accept_predictions']
+    assert {'predict', 'gemini', 'save_note', 'mark_as_processed', 'remove_from_staging'} <= set(records[0]['stages_ms'])
@@ -0,0 +1,36 @@
+# test_staging.py - fusion des synchronisations dans le staging
+def video(video_id):
+    return {'video_id': video_id, 'title': f"Titre {video_id}", 'channel': 'Chaîne'}
+
+
+def staged_ids(system):
+    return [v['video_id'] for v in system.get_staging_videos()]
+
+
+def test_sync_does_not_restage_video_processed_meanwhile(system):
+    system.save_to_staging([video('a'), video('b')])
+    # La synchronisation a lu l'historique avant que 'a' soit traitée
+    synced = [video('a'), video('b'), video('c')]
+    system.mark_as_processed('a', 'skipped', {'status': 'skipped'})
+    system.remove_from_staging('a')
+    system.save_to_staging(synced)
+    assert staged_ids(system) == ['b', 'c']
+
+
+def test_sync_keeps_staging_order_and_appends_new_videos(system):
+    system.save_to_staging([video('b'), video('a')])
+    system.save_to_staging([video('a'), video('c'), video('b')])
+    assert staged_ids(system) == ['b', 'a', 'c']
+
+
+def test_resync_keeps_detected_at_of_staged_videos(client, app_module):
+    system = app_module.system_registry.get('default')
+    system.save_to_staging([video('a')])
+    first = system.get_staging_videos()[0]['detected_at']
+
+    system.save_to_staging([video('a'), video('b')])
+    staged = {v['video_id']: v['detected_at'] for v in system.get_staging_videos()}
+    assert staged['a'] == first and staged['b'] > first
+
+    response = client.get('/api/staging', query_string={'since': staged['b']})
+    assert [v['video_id'] for v in response.get_json()['videos']] == ['b']
@@ -0,0 +1,51 @@
+# test_staging_events.py - flux SSE du staging (Flask limité, ASGI en coroutine)
+import threading
+
+
+def video(video_id):
+    return {'video_id': video_id, 'title': f"Titre {video_id}", 'channel': 'Chaîne',
+            'detected_at': f"2026-01-01T10:00:0{video_id[-1]}"}
+
+
+def test_staging_events_since_reports_changes(app_module):
+    system = app_module.system_registry.get('default')
+    system.save_to_staging([video('v1'), video('v2')])
+    events, known = app_module.staging_events_since(system, {'v0', 'v1'})
+    assert known == {'v1', 'v2'}
+    assert events[0].startswith('event: removed\n') and '"v0"' in events[0]
+    assert events[1].startswith('event: added\n') and '"v2"' in events[1]
+    assert app_module.staging_events_since(system, known) == ([], known)
+
+
+def test_flask_streams_are_capped(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'staging_event_streams', threading.BoundedSemaphore(1))
+    first = client.get('/api/staging/events')
+    assert first.status_code == 200
+    assert client.get('/api/staging/events').status_code == 503
+    first.close()
+    again = client.get('/api/staging/events')
+    assert again.status_code == 200
+    again.close()
+
+
+def test_asgi_route_streams_staging_events(app_module, monkeypatch):
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    monkeypatch.setattr(asgi_app, 'system_registry', app_module.system_registry)
+    monkeypatch.setattr(asgi_app, 'STAGING_EVENTS_INTERVAL', 0.01)
+    monkeypatch.setattr(asgi_app, 'STAGING_EVENTS_MAX_AGE', 0.1)
+    calls = []
+
+    def changes(system, known):
+        calls.append(known)
+        return (['event: removed\ndata: {"video_ids": ["v1"], "count": 0}\n\n'], set()) if known else ([], known)
+
+    monkeypatch.setattr(asgi_app, 'staging_events_since', changes)
+    app_module.system_registry.get('default').save_to_staging([video('v1')])
+    response = TestClient(asgi_app.app).get('/api/staging/events')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.text.startswith('retry: 10\n\n')
+    assert response.text.count('event: removed') == 1
+    assert calls[0] == {'v1'} and len(calls) > 1
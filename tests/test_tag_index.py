@@ -0,0 +1,61 @@
+# test_tag_index.py - index inversé des tags
+import json
+
+from tag_index import TagIndex
+
+
+def test_related_prefers_shared_rare_tags(tmp_path):
+    index = TagIndex(tmp_path / '.tag_index.json')
+    index.update('a', ['python', 'rust'])
+    index.update('b', ['python'])
+    index.update('c', ['rust', 'python'])
+    assert index.related('x', ['python', 'rust'], k=2) == ['a', 'c']
+    assert index.related('a', ['python', 'rust'], k=5) == ['c', 'b']
+
+
+def test_remove_drops_note_from_postings(tmp_path):
+    index = TagIndex(tmp_path / '.tag_index.json')
+    index.update('a', ['python'])
+    index.update('b', ['python'])
+    index.remove('a')
+    assert index.related('x', ['python']) == ['b']
+    index.save()
+    assert json.loads((tmp_path / '.tag_index.json').read_text()) == {'notes': {'b': ['python']}}
+
+
+def test_save_merges_with_other_workers(tmp_path):
+    first = TagIndex(tmp_path / '.tag_index.json')
+    second = TagIndex(tmp_path / '.tag_index.json')
+    first.update('a', ['python'])
+    second.update('b', ['rust'])
+    first.save()
+    second.save()
+    assert TagIndex(tmp_path / '.tag_index.json').note_tags == {'a': ['python'], 'b': ['rust']}
+    first.remove('a')
+    first.save()
+    assert TagIndex(tmp_path / '.tag_index.json').note_tags == {'b': ['rust']}
+
+
+def test_related_sees_notes_saved_by_other_workers(tmp_path):
+    first = TagIndex(tmp_path / '.tag_index.json')
+    second = TagIndex(tmp_path / '.tag_index.json')
+    first.update('a', ['python'])
+    second.update('b', ['python', 'rust'])
+    first.save()
+    second.save()
+    assert first.related('x', ['rust']) == ['b']
+    assert second.related('x', ['python']) == ['a', 'b']
+    second.remove('b')
+    second.save()
+    assert first.related('x', ['python', 'rust']) == ['a']
+
+
+def test_refresh_keeps_unsaved_local_changes(tmp_path):
+    first = TagIndex(tmp_path / '.tag_index.json')
+    second = TagIndex(tmp_path / '.tag_index.json')
+    second.update('a', ['python'])
+    second.save()
+    first.update('a', ['rust'])
+    assert first.refresh()
+    assert first.note_tags == {'a': ['rust']}
+    assert first.related('x', ['python']) == []
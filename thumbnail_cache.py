@@ -0,0 +1,206 @@
+# thumbnail_cache.py - Cache local des miniatures YouTube (adressé par contenu, éviction par taille)
+import os
+import re
+import time
+import hashlib
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from json_store import JsonStore, atomic_write_bytes
+from metrics import external_call
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+}
+MAX_THUMBNAIL_BYTES = 2 * 1024 * 1024
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.jpg|\.png|\.webp)$')
+# Précision de l'horodatage d'usage: au plus une mise à jour par heure et par fichier
+_TOUCH_INTERVAL = 3600
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024, workers: int = 8,
+                 timeout: float = 10):
+        """
+        Miniatures téléchargées une fois, stockées sous le SHA-256 de leur contenu
+
+        Deux vidéos à la miniature identique partagent le même fichier; un nom de
+        fichier ne désigne jamais deux contenus, d'où des en-têtes de cache immuables.
+        Au-delà de max_bytes, les fichiers les moins récemment utilisés sont supprimés.
+
+        Args:
+            cache_dir: Dossier du cache (blobs/ et index video_id -> fichier)
+            max_bytes: Taille maximale du cache
+            workers: Téléchargements simultanés lors du préchargement
+            timeout: Délai maximal d'un téléchargement
+        """
+        self.cache_dir = Path(cache_dir).resolve()
+        self.blob_dir = self.cache_dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index = JsonStore(self.cache_dir / "index.json", dict)
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.timeout = timeout
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _blob_file(self, name: str) -> Optional[Path]:
+        match = _BLOB_NAME.match(name)
+        if not match:
+            return None
+        return self.blob_dir / match.group(1)[:2] / name
+
+    def lookup_many(self, video_ids: Iterable[str]) -> Dict[str, str]:
+        """Nom de fichier local des miniatures en cache, par video_id"""
+        index = self.index.read()
+        found = {}
+        for video_id in video_ids:
+            entry = index.get(video_id)
+            if entry:
+                found[video_id] = entry['file']
+        return found
+
+    def blob_path(self, name: str) -> Optional[Path]:
+        """Chemin d'un fichier du cache (None si nom invalide ou fichier évincé); marque l'usage"""
+        path = self._blob_file(name)
+        if path is None:
+            return None
+        try:
+            if path.stat().st_mtime < time.time() - _TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _download(self, url: str) -> Optional[Tuple[str, bytes]]:
+        """(extension, contenu) d'une image, None si la réponse n'en est pas une"""
+        request = urllib.request.Request(url, headers={'User-Agent': 'youtube-liked-system'})
+        with external_call('youtube', 'thumbnail'):
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                extension = IMAGE_EXTENSIONS.get(response.headers.get_content_type())
+                content = response.read(MAX_THUMBNAIL_BYTES + 1)
+        if extension is None or not content or len(content) > MAX_THUMBNAIL_BYTES:
+            return None
+        return extension, content
+
+    def _store(self, video_id: str, url: str) -> Optional[str]:
+        """Télécharge et range une miniature; retourne son nom de fichier"""
+        try:
+            downloaded = self._download(url)
+        except Exception:
+            return None
+        if downloaded is None:
+            return None
+        extension, content = downloaded
+        name = hashlib.sha256(content).hexdigest() + extension
+        path = self._blob_file(name)
+        if path.exists():
+            os.utime(path)  # contenu déjà en cache (autre vidéo): récemment utilisé
+        else:
+            path.parent.mkdir(exist_ok=True)
+            atomic_write_bytes(path, content)
+        return name
+
+    def fetch(self, video_id: str, url: str) -> Optional[str]:
+        """Nom de fichier local de la miniature, téléchargée si absente"""
+        cached = self.lookup_many([video_id]).get(video_id)
+        if cached and self.blob_path(cached):
+            return cached
+        stored = self._store_many([(video_id, url)])
+        return stored.get(video_id)
+
+    def _store_many(self, items: List[Tuple[str, str]]) -> Dict[str, str]:
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items)) or 1,
+                                thread_name_prefix='thumbnails') as pool:
+            names = list(pool.map(lambda item: self._store(*item), items))
+        stored = {video_id: name for (video_id, _), name in zip(items, names) if name}
+        if stored:
+            # Une seule écriture de l'index par lot
+            with self.index.transaction() as index:
+                for (video_id, url) in items:
+                    if video_id in stored:
+                        index[video_id] = {'file': stored[video_id], 'url': url}
+            self.evict()
+        return stored
+
+    def prefetch(self, videos: List[Dict]) -> int:
+        """
+        Télécharge en arrière-plan les miniatures absentes du cache (sans bloquer l'appelant)
+
+        Returns:
+            int: Nombre de miniatures mises en téléchargement
+        """
+        cached = self.lookup_many(video['video_id'] for video in videos)
+        with self._lock:
+            todo = [(video['video_id'], video['thumbnail']) for video in videos
+                    if video.get('thumbnail') and video['video_id'] not in cached
+                    and video['video_id'] not in self._pending]
+            self._pending.update(video_id for video_id, _ in todo)
+        if not todo:
+            return 0
+
+        def run():
+            try:
+                stored = self._store_many(todo)
+                print(f"🖼️ {len(stored)}/{len(todo)} miniatures mises en cache")
+            finally:
+                with self._lock:
+                    self._pending.difference_update(video_id for video_id, _ in todo)
+
+        threading.Thread(target=run, name='thumbnail-prefetch', daemon=True).start()
+        return len(todo)
+
+    def evict(self) -> int:
+        """Supprime les fichiers les moins récemment utilisés au-delà de max_bytes (jusqu'à 90 %)"""
+        blobs = []
+        total = 0
+        for shard in os.scandir(self.blob_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if _BLOB_NAME.match(entry.name):
+                    st = entry.stat()
+                    blobs.append((st.st_mtime, st.st_size, entry.name, entry.path))
+                    total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = set()
+        target = self.max_bytes * 0.9
+        for _, size, name, path in sorted(blobs):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            removed.add(name)
+            total -= size
+        with self.index.transaction() as index:
+            for video_id in [video_id for video_id, entry in index.items() if entry['file'] in removed]:
+                del index[video_id]
+        print(f"🧹 Cache miniatures: {len(removed)} fichiers évincés")
+        return len(removed)
+
+
+_caches: Dict[str, ThumbnailCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_thumbnail_cache(cache_dir: Path) -> ThumbnailCache:
+    """Cache unique par process et par dossier (partagé par tous les comptes)"""
+    key = str(Path(cache_dir).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ThumbnailCache(
+                cache_dir,
+                max_bytes=int(float(os.getenv('THUMBNAIL_CACHE_MAX_MB', '256')) * 1024 * 1024),
+                workers=int(os.getenv('THUMBNAIL_PREFETCH_WORKERS', '8'))
+            )
+        return cache
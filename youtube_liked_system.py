@@ -1,10 +1,17 @@
 # youtube_liked_system.py - Système complet YouTube Liked Videos + Gemini
 import os
+import re
+import asyncio
 import json
+import time
+import copy
 import pickle
+import secrets
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import hashlib
 
 # APIs
@@ -14,11 +21,188 @@ from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from json_store import AppendLogStore, JsonStore, atomic_write_json
+from metrics import external_call, CACHE_REQUESTS, QUEUE_DEPTH
+from near_duplicates import NearDuplicateIndex
+from similarity_index import SimilarityIndex
+from search_index import SearchIndex
+from category_classifier import CategoryClassifier
+from thumbnail_cache import get_thumbnail_cache
+
+DEFAULT_ACCOUNT = 'default'
+ACCOUNT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+GEMINI_MODEL_NAME = 'models/gemini-2.5-flash'
+
+
+class GeminiRateLimiter:
+    """Limiteur de débit (token bucket) partagé par tous les comptes du process"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Réserve un jeton et retourne le temps d'attente nécessaire (en secondes)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'un appel Gemini soit autorisé"""
+        wait = self._reserve()
+        if wait > 0:
+            with QUEUE_DEPTH.track_inprogress(queue='gemini_rate_limiter', account=''):
+                time.sleep(wait)
+
+    async def acquire_async(self):
+        """Version asynchrone: attend sans bloquer la boucle d'événements"""
+        wait = self._reserve()
+        if wait > 0:
+            with QUEUE_DEPTH.track_inprogress(queue='gemini_rate_limiter', account=''):
+                await asyncio.sleep(wait)
+
+
+class GeminiResponseCache:
+    """Cache LRU des réponses Gemini, indexé par le hash du prompt"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, prompt: str) -> Optional[str]:
+        key = self.key_for(prompt)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache='gemini_response', result='miss' if text is None else 'hit')
+        return text
+
+    def put(self, prompt: str, text: str):
+        key = self.key_for(prompt)
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Ressources Gemini partagées par toutes les instances du process
+gemini_limiter = GeminiRateLimiter(float(os.getenv('GEMINI_RATE_PER_MINUTE', '60')))
+gemini_cache = GeminiResponseCache(int(os.getenv('GEMINI_CACHE_SIZE', '512')))
+
+# Points d'accès alternatifs des API (serveurs de substitution du banc de charge, proxy)
+YOUTUBE_API_ENDPOINT = os.getenv('YOUTUBE_API_ENDPOINT')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+
+
+def get_shared_gemini_model(api_key: str):
+    """Configure Gemini une seule fois par process et retourne le modèle partagé"""
+    with _gemini_lock:
+        model = _gemini_models.get(api_key)
+        if model is None:
+            if GEMINI_API_ENDPOINT:
+                genai.configure(api_key=api_key, transport='rest',
+                                client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            _gemini_models[api_key] = model
+        return model
+
+
+def empty_processing_counters() -> Dict:
+    """Compteurs vides de l'historique de traitement"""
+    return {
+        'entries': 0,
+        'total': 0,
+        'by_category': {},
+        'by_processing_type': {},
+        'by_day': {}
+    }
+
+
+def count_processed_entry(counters: Dict, entry: Dict):
+    """Ajoute une entrée de processed_videos.json aux compteurs"""
+    category = entry.get('category', 'unknown')
+    result = entry.get('result') or {}
+    processing_type = result.get('processing_type') or ('skipped' if category == 'skipped' else 'unknown')
+    day = (entry.get('processed_at') or '')[:10] or 'unknown'
+    
+    counters['total'] = counters.get('total', 0) + 1
+    for key, value in (('by_category', category), ('by_processing_type', processing_type), ('by_day', day)):
+        bucket = counters.setdefault(key, {})
+        bucket[value] = bucket.get(value, 0) + 1
+
+
+def counters_caught_up(counters: Dict, history: List[Dict]) -> Dict:
+    """
+    Compteurs complétés avec les entrées de l'historique pas encore comptées
+
+    'entries' est la position atteinte dans l'historique: les compteurs
+    restent dérivés de processed_videos même si un arrêt survient entre
+    l'ajout au journal et l'écriture des compteurs.
+
+    Returns:
+        Dict: counters lui-même s'il est à jour, sinon une nouvelle copie
+    """
+    counted = counters.get('entries')
+    if counted is None or counted > len(history):
+        # Compteurs antérieurs à 'entries' ou historique raccourci: recalcul complet
+        counters, counted = empty_processing_counters(), 0
+    elif counted == len(history):
+        return counters
+    else:
+        counters = copy.deepcopy(counters)
+    for entry in history[counted:]:
+        count_processed_entry(counters, entry)
+    counters['entries'] = len(history)
+    return counters
+
+
+class InvalidAccountError(ValueError):
+    """Identifiant de compte refusé"""
+
+
+class AccountAccessError(InvalidAccountError):
+    """Compte non lié à la session du client (réponse 403)"""
+
+
+def validate_account_id(account_id: Optional[str]) -> str:
+    """Valide un identifiant de compte (utilisé comme nom de dossier)"""
+    account_id = account_id or DEFAULT_ACCOUNT
+    if not ACCOUNT_ID_PATTERN.match(account_id) or account_id in ('.', '..'):
+        raise InvalidAccountError(f"Identifiant de compte invalide: {account_id}")
+    return account_id
+
+
 class YouTubeLikedSystem:
-    def __init__(self):
-        """Système complet pour traiter les vidéos likées YouTube"""
+    def __init__(self, account_id: Optional[str] = None, data_root: str = "youtube_data"):
+        """
+        Système complet pour traiter les vidéos likées YouTube
+        
+        Args:
+            account_id: Compte utilisateur (None = compte par défaut)
+            data_root: Dossier racine des données
+        """
         
         # Configuration
+        self.account_id = validate_account_id(account_id)
         self.client_id = os.getenv('YOUTUBE_CLIENT_ID')
         self.client_secret = os.getenv('YOUTUBE_CLIENT_SECRET')
         self.redirect_uri = os.getenv('YOUTUBE_REDIRECT_URI', 'http://localhost:5000/oauth/callback')
@@ -28,22 +212,53 @@ class YouTubeLikedSystem:
         if not all([self.client_id, self.client_secret, self.gemini_api_key]):
             raise ValueError("Clés API manquantes dans .env")
         
-        # Configuration Gemini
-        genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+        # Configuration Gemini (modèle, cache et limiteur partagés entre comptes)
+        self.model = get_shared_gemini_model(self.gemini_api_key)
         
         # Configuration OAuth - Scopes minimaux pour éviter les conflits
         self.scopes = [
             'https://www.googleapis.com/auth/youtube.readonly'
         ]
         
-        # Stockage sécurisé
-        self.data_dir = Path("youtube_data")
-        self.data_dir.mkdir(exist_ok=True)
+        # Stockage sécurisé - le compte par défaut garde l'ancien emplacement
+        if self.account_id == DEFAULT_ACCOUNT:
+            self.data_dir = Path(data_root)
+        else:
+            self.data_dir = Path(data_root) / "accounts" / self.account_id
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         self.token_file = self.data_dir / "oauth_token.pickle"
         self.processed_file = self.data_dir / "processed_videos.json"
         self.staging_file = self.data_dir / "staging_videos.json"
         
+        # Stores verrouillés et écrits atomiquement (sûrs entre workers); l'historique
+        # traité est en ajout seul: une ligne de journal par vidéo, compactée par lots
+        self.processed_store = AppendLogStore(self.processed_file, 'processed_videos',
+                                              compact_every=int(os.getenv('PROCESSED_COMPACT_EVERY', '1000')))
+        self.staging_store = JsonStore(self.staging_file, lambda: {'videos': []})
+        
+        # Compteurs matérialisés, tenus à jour à chaque mark_as_processed
+        self.stats_file = self.data_dir / "processed_stats.json"
+        self.stats_store = JsonStore(self.stats_file, empty_processing_counters)
+        
+        # Index MinHash/LSH pour repérer les ré-uploads et vidéos quasi-identiques
+        self.duplicate_index = NearDuplicateIndex(
+            self.data_dir / "near_duplicates.json",
+            threshold=float(os.getenv('DUPLICATE_THRESHOLD', '0.6'))
+        )
+        
+        # Miniatures publiques: un cache commun à tous les comptes
+        self.thumbnail_cache = get_thumbnail_cache(Path(data_root) / "thumbnails")
+        
+        # Vecteurs TF-IDF des résumés traités (vidéos similaires)
+        self.similarity_index = SimilarityIndex(self.data_dir / "similarity")
+        self._processed_by_id = {}
+        self._processed_by_id_count = 0
+        self._processed_by_id_epoch = None
+        self._processed_by_id_lock = threading.Lock()
+        
+        # Index plein texte (SQLite FTS5) des résultats traités
+        self.search_index = SearchIndex(self.data_dir / "search_index.db")
+        
         # Variables
         self.youtube_service = None
         self.credentials = None
@@ -81,9 +296,20 @@ class YouTubeLikedSystem:
                 'folder': 'Culture G Knowledge'
             }
         }
+        
+        # Prédiction locale de catégorie, apprise sur l'historique (aucun appel LLM)
+        self.category_model = CategoryClassifier(
+            self.data_dir / "category_model.json",
+            save_interval=float(os.getenv('CATEGORY_MODEL_SAVE_INTERVAL', '60'))
+        )
     
-    def get_auth_url(self) -> str:
-        """Génère l'URL d'authentification OAuth"""
+    def get_auth_url(self) -> Tuple[str, str]:
+        """
+        Génère l'URL d'authentification OAuth
+        
+        Returns:
+            tuple: (URL d'autorisation, state à vérifier au retour du callback)
+        """
         client_config = {
             "web": {
                 "client_id": self.client_id,
@@ -110,10 +336,12 @@ class YouTubeLikedSystem:
         )
         flow.redirect_uri = self.redirect_uri
         
+        # Le state porte le compte pour que le callback retrouve le bon namespace
         auth_url, state = flow.authorization_url(
             prompt='consent',
             access_type='offline',
-            include_granted_scopes='true'
+            include_granted_scopes='true',
+            state=f"{self.account_id}:{secrets.token_urlsafe(16)}"
         )
         
         # Sauvegarder seulement les données nécessaires pour reconstruire le flow
@@ -127,15 +355,24 @@ class YouTubeLikedSystem:
         with open(self.data_dir / "temp_flow_data.json", 'w') as f:
             json.dump(flow_data, f)
         
-        return auth_url
+        return auth_url, state
     
-    def handle_oauth_callback(self, authorization_code: str) -> bool:
-        """Traite le callback OAuth et sauvegarde les credentials"""
+    def has_credentials(self) -> bool:
+        """Des credentials sont déjà enregistrés pour ce compte (sans les charger)"""
+        return self.token_file.with_suffix('.json').exists() or self.token_file.exists()
+    
+    def handle_oauth_callback(self, authorization_code: str, state: str) -> bool:
+        """Traite le callback OAuth (state vérifié contre celui du flow) et sauvegarde les credentials"""
         try:
             # Récupérer les données du flow
             with open(self.data_dir / "temp_flow_data.json", 'r') as f:
                 flow_data = json.load(f)
             
+            # Le callback doit répondre à la dernière demande émise pour ce compte
+            if not state or not secrets.compare_digest(str(flow_data.get('state', '')), state):
+                print("❌ State OAuth invalide: callback refusé")
+                return False
+            
             # Reconstruire le flow
             flow = Flow.from_client_config(
                 flow_data['client_config'],
@@ -165,8 +402,7 @@ class YouTubeLikedSystem:
                 'expiry': flow.credentials.expiry.isoformat() if flow.credentials.expiry else None
             }
             
-            with open(self.token_file.with_suffix('.json'), 'w') as f:
-                json.dump(creds_data, f)
+            atomic_write_json(self.token_file.with_suffix('.json'), creds_data, indent=None)
             
             # Nettoyer le fichier temporaire
             if (self.data_dir / "temp_flow_data.json").exists():
@@ -218,7 +454,8 @@ class YouTubeLikedSystem:
                 
                 # Vérifier si le token a expiré
                 if self.credentials.expired and self.credentials.refresh_token:
-                    self.credentials.refresh(Request())
+                    with external_call('oauth', 'token_refresh'):
+                        self.credentials.refresh(Request())
                     # Sauvegarder le token rafraîchi
                     self._save_credentials_json()
                 
@@ -236,7 +473,8 @@ class YouTubeLikedSystem:
                 
                 # Vérifier si le token a expiré
                 if self.credentials.expired and self.credentials.refresh_token:
-                    self.credentials.refresh(Request())
+                    with external_call('oauth', 'token_refresh'):
+                        self.credentials.refresh(Request())
                     # Migrer vers le format JSON
                     self._save_credentials_json()
                 
@@ -262,15 +500,15 @@ class YouTubeLikedSystem:
             }
             
             json_token_file = self.token_file.with_suffix('.json')
-            with open(json_token_file, 'w') as f:
-                json.dump(creds_data, f)
+            atomic_write_json(json_token_file, creds_data, indent=None)
                 
         except Exception as e:
             print(f"❌ Erreur sauvegarde credentials: {e}")
     
     def _build_youtube_service(self):
         """Construit le service YouTube API"""
-        self.youtube_service = build('youtube', 'v3', credentials=self.credentials)
+        client_options = {'api_endpoint': YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+        self.youtube_service = build('youtube', 'v3', credentials=self.credentials, client_options=client_options)
     
     def is_authenticated(self) -> bool:
         """Vérifie si l'utilisateur est authentifié"""
@@ -288,7 +526,8 @@ class YouTubeLikedSystem:
                 myRating="like",
                 maxResults=max_results
             )
-            response = request.execute()
+            with external_call('youtube', 'videos.list'):
+                response = request.execute()
             
             videos = []
             for item in response['items']:
@@ -300,8 +539,7 @@ class YouTubeLikedSystem:
                     'published_at': item['snippet']['publishedAt'],
                     'duration': item['contentDetails']['duration'],
                     'url': f"https://www.youtube.com/watch?v={item['id']}",
-                    'thumbnail': item['snippet']['thumbnails']['medium']['url'],
-                    'detected_at': datetime.now().isoformat()
+                    'thumbnail': item['snippet']['thumbnails']['medium']['url']
                 }
                 videos.append(video_data)
             
@@ -324,47 +562,222 @@ class YouTubeLikedSystem:
             if video['video_id'] not in processed_ids
         ]
         
+        self._flag_duplicates(new_videos)
+        
+        # Miniatures téléchargées en arrière-plan: la synchronisation n'attend pas
+        self.thumbnail_cache.prefetch(new_videos)
+        
         print(f"📊 {len(new_videos)} nouvelles vidéos likées détectées")
         return new_videos
     
+    def _flag_duplicates(self, videos: List[Dict]):
+        """Indexe les vidéos et annote celles qui ressemblent à une vidéo déjà vue"""
+        if not len(self.duplicate_index):
+            self._backfill_duplicate_index()
+        duplicates = self.duplicate_index.index_videos(videos)
+        for video in videos:
+            matches = duplicates.get(video['video_id'])
+            if matches:
+                video['duplicates'] = matches
+        if duplicates:
+            print(f"♻️ {len(duplicates)} doublons probables signalés")
+    
+    def _backfill_duplicate_index(self):
+        """Indexe l'historique existant (titres seulement: les descriptions n'y sont pas conservées)"""
+        history = [
+            {'video_id': entry['video_id'], 'title': entry['result'].get('title', '')}
+            for entry in self.get_processed_videos()
+            if isinstance(entry.get('result'), dict) and entry['result'].get('title')
+        ]
+        if history:
+            self.duplicate_index.index_videos(history, processed=True)
+    
+    def reuse_processed_result(self, video_data: Dict, source_video_id: str, category: Optional[str] = None) -> Optional[Dict]:
+        """
+        Construit le résultat d'une vidéo à partir de celui d'un doublon déjà traité (sans appel Gemini)
+        
+        Args:
+            video_data: Vidéo en staging
+            source_video_id: Vidéo déjà traitée dont on réutilise le résultat
+            category: Catégorie voulue (défaut: celle de la vidéo source)
+        Returns:
+            Dict: Nouveau résultat, ou None si la source n'a pas de résultat exploitable
+        """
+        source = None
+        for entry in reversed(self.get_processed_videos()):
+            if entry['video_id'] == source_video_id:
+                source = entry
+                break
+        if source is None or not isinstance(source.get('result'), dict) or 'summary' not in source['result']:
+            return None
+        
+        result = dict(source['result'])
+        category = category or result.get('category') or source.get('category')
+        if category not in self.categories or self.categories[category]['type'] != result.get('processing_type'):
+            return None
+        result.update({
+            'video_id': video_data['video_id'],
+            'title': video_data['title'],
+            'url': video_data['url'],
+            'channel': video_data['channel'],
+            'category': category,
+            'processing_type': self.categories[category]['type'],
+            'processed_at': datetime.now().isoformat(),
+            'reused_from': source_video_id
+        })
+        return result
+    
+    def _backfill_similarity_index(self) -> int:
+        """Indexe tout l'historique traité (index vide, ex: première utilisation)"""
+        entries = [
+            (entry['video_id'], entry['result'])
+            for entry in self.get_processed_videos()
+            if entry.get('category') != 'skipped'
+            and isinstance(entry.get('result'), dict) and entry['result'].get('summary')
+        ]
+        indexed = self.similarity_index.add_many(entries)
+        if indexed:
+            print(f"🧭 Index de similarité construit: {indexed} vidéos")
+        return indexed
+    
+    def predict_categories(self, videos: List[Dict]) -> Dict[str, Dict]:
+        """
+        Catégorie suggérée pour chaque vidéo, après apprentissage des nouvelles entrées de l'historique
+        
+        Returns:
+            Dict: video_id -> {'category', 'confidence'} (vide tant qu'aucune vidéo n'a été traitée)
+        """
+        categories = list(self.categories)
+        self.category_model.sync(self.get_processed_videos(), categories)
+        predictions = {}
+        for video in videos:
+            prediction = self.category_model.predict(video, categories)
+            if prediction:
+                predictions[video['video_id']] = prediction
+        return predictions
+    
+    def _backfill_search_index(self) -> int:
+        """Indexe tout l'historique traité dans l'index plein texte (mêmes entrées que mark_as_processed)"""
+        entries = [
+            (entry['video_id'], entry.get('category', ''), entry.get('processed_at', ''), entry['result'])
+            for entry in self.get_processed_videos()
+            if entry.get('category') != 'skipped' and isinstance(entry.get('result'), dict)
+            and entry['result'].get('summary')
+        ]
+        indexed = self.search_index.rebuild(entries)
+        print(f"🔎 Index de recherche construit: {indexed} vidéos")
+        return indexed
+    
+    def search_processed(self, query: str, category: Optional[str] = None,
+                         limit: int = 20, offset: int = 0):
+        """
+        Recherche plein texte dans les résultats traités
+        
+        Returns:
+            tuple: (résultats classés, nombre total de correspondances)
+        """
+        if not self.search_index.built:
+            self._backfill_search_index()
+        return self.search_index.search(query, category, limit, offset)
+    
+    def _processed_index(self) -> Dict[str, Dict]:
+        """video_id -> dernière entrée traitée, complété avec les seules nouvelles entrées de l'historique"""
+        with self._processed_by_id_lock:
+            processed_videos = self.get_processed_videos()
+            if (self._processed_by_id_epoch != self.processed_store.epoch
+                    or len(processed_videos) < self._processed_by_id_count):
+                self._processed_by_id = {}
+                self._processed_by_id_count = 0
+                self._processed_by_id_epoch = self.processed_store.epoch
+            for entry in processed_videos[self._processed_by_id_count:]:
+                self._processed_by_id[entry['video_id']] = entry
+            self._processed_by_id_count = len(processed_videos)
+            return self._processed_by_id
+    
+    def get_processed_entry(self, video_id: str) -> Optional[Dict]:
+        """Dernière entrée traitée d'une vidéo"""
+        return self._processed_index().get(video_id)
+    
+    def get_similar_videos(self, video_id: str, k: int = 10) -> Optional[List[Dict]]:
+        """
+        Vidéos traitées dont le résumé ressemble le plus à celui de video_id
+        
+        Returns:
+            List[Dict]: [{'video_id', 'title', 'category', 'score'}], None si la vidéo n'est pas indexée
+        """
+        if not len(self.similarity_index):
+            self._backfill_similarity_index()
+        matches = self.similarity_index.similar(video_id, k)
+        if matches is None:
+            return None
+        similar = []
+        for other_id, score in matches:
+            entry = self.get_processed_entry(other_id) or {}
+            result = entry.get('result') if isinstance(entry.get('result'), dict) else {}
+            similar.append({
+                'video_id': other_id,
+                'title': result.get('title', ''),
+                'category': entry.get('category'),
+                'score': score
+            })
+        return similar
+    
+    def get_processed_videos(self) -> List[Dict]:
+        """Retourne l'historique des vidéos traitées (lecture seule)"""
+        return self.processed_store.read()
+    
     def _load_processed_video_ids(self) -> set:
         """Charge la liste des IDs de vidéos déjà traitées"""
-        if not self.processed_file.exists():
-            return set()
-        
-        try:
-            with open(self.processed_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(video['video_id'] for video in data.get('processed_videos', []))
-        except:
-            return set()
+        return set(self._processed_index())
     
     def save_to_staging(self, videos: List[Dict]):
-        """Sauvegarde les vidéos dans le staging"""
-        staging_data = {
-            'videos': videos,
-            'created_at': datetime.now().isoformat()
-        }
+        """
+        Fusionne une synchronisation dans le staging (lecture-modification-écriture sous verrou)
         
-        with open(self.staging_file, 'w', encoding='utf-8') as f:
-            json.dump(staging_data, f, ensure_ascii=False, indent=2)
+        L'historique est relu sous le verrou: une vidéo traitée pendant la
+        synchronisation n'est pas remise en staging. detected_at n'est posé
+        qu'à l'entrée en staging (since et curseurs de /api/staging en dépendent).
+        """
+        with self.staging_store.transaction() as staging_data:
+            processed_ids = self._load_processed_video_ids()
+            incoming = {
+                video['video_id']: video for video in videos
+                if video['video_id'] not in processed_ids
+            }
+            # Ordre du staging conservé, nouvelles vidéos ajoutées à la fin
+            detected_at = datetime.now().isoformat()
+            merged = [
+                {**incoming.pop(video['video_id']), 'detected_at': video.get('detected_at') or detected_at}
+                for video in staging_data.get('videos', [])
+                if video['video_id'] in incoming
+            ]
+            merged.extend({'detected_at': detected_at, **video} for video in incoming.values())
+            staging_data['videos'] = merged
+            staging_data['created_at'] = datetime.now().isoformat()
         
-        print(f"💾 {len(videos)} vidéos sauvegardées en staging")
+        print(f"💾 {len(merged)} vidéos sauvegardées en staging")
+    
+    def remove_from_staging(self, video_id: str) -> bool:
+        """
+        Retire une vidéo du staging (lecture-modification-écriture sous verrou)
+        
+        Args:
+            video_id: L'ID de la vidéo à retirer
+        Returns:
+            bool: True si la vidéo était en staging
+        """
+        with self.staging_store.transaction() as staging_data:
+            videos = staging_data.get('videos', [])
+            remaining = [v for v in videos if v['video_id'] != video_id]
+            staging_data['videos'] = remaining
+        return len(remaining) != len(videos)
     
     def get_staging_videos(self) -> List[Dict]:
         """Récupère les vidéos en staging"""
-        if not self.staging_file.exists():
-            return []
-        
-        try:
-            with open(self.staging_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('videos', [])
-        except:
-            return []
+        return self.staging_store.read().get('videos', [])
     
-    def process_video_with_gemini(self, video_data: Dict, category: str) -> Dict:
-        """Traite une vidéo avec Gemini selon sa catégorie"""
+    def _prepare_gemini_request(self, video_data: Dict, category: str):
+        """Retourne (processing_type, prompt) pour une vidéo et sa catégorie"""
         category_info = self.categories.get(category)
         if not category_info:
             raise ValueError(f"Catégorie inconnue: {category}")
@@ -377,25 +790,63 @@ class YouTubeLikedSystem:
         else:  # knowledge
             prompt = self._build_knowledge_prompt(video_data)
         
+        return processing_type, prompt
+    
+    def _build_result(self, response_text: str, video_data: Dict, category: str, processing_type: str) -> Dict:
+        """Parse la réponse Gemini et ajoute les métadonnées de la vidéo"""
+        result = self._parse_gemini_response(response_text, processing_type)
+        
+        result.update({
+            'video_id': video_data['video_id'],
+            'title': video_data['title'],
+            'url': video_data['url'],
+            'channel': video_data['channel'],
+            'thumbnail': video_data.get('thumbnail'),
+            'category': category,
+            'processing_type': processing_type,
+            'processed_at': datetime.now().isoformat()
+        })
+        
+        return result
+    
+    def process_video_with_gemini(self, video_data: Dict, category: str) -> Dict:
+        """Traite une vidéo avec Gemini selon sa catégorie"""
+        processing_type, prompt = self._prepare_gemini_request(video_data, category)
+        
         try:
-            # Appel à Gemini
-            response = self.model.generate_content(prompt)
+            # Appel à Gemini (cache partagé entre comptes, débit limité par process)
+            response_text = gemini_cache.get(prompt)
+            if response_text is None:
+                gemini_limiter.acquire()
+                with external_call('gemini', 'generate_content'):
+                    response = self.model.generate_content(prompt)
+                response_text = response.text
+                gemini_cache.put(prompt, response_text)
             
-            # Parser la réponse
-            result = self._parse_gemini_response(response.text, processing_type)
+            return self._build_result(response_text, video_data, category, processing_type)
             
-            # Ajouter les métadonnées
-            result.update({
-                'video_id': video_data['video_id'],
-                'title': video_data['title'],
-                'url': video_data['url'],
-                'channel': video_data['channel'],
-                'category': category,
-                'processing_type': processing_type,
-                'processed_at': datetime.now().isoformat()
-            })
+        except Exception as e:
+            print(f"❌ Erreur Gemini pour {video_data['title']}: {e}")
+            return self._create_fallback_result(video_data, category, processing_type)
+    
+    async def process_video_with_gemini_async(self, video_data: Dict, category: str) -> Dict:
+        """Version asynchrone de process_video_with_gemini (mode ASGI)"""
+        processing_type, prompt = self._prepare_gemini_request(video_data, category)
+        
+        try:
+            response_text = gemini_cache.get(prompt)
+            if response_text is None:
+                await gemini_limiter.acquire_async()
+                with external_call('gemini', 'generate_content_async'):
+                    if GEMINI_API_ENDPOINT:
+                        # Transport REST (point d'accès alternatif): pas de client asynchrone natif
+                        response = await asyncio.to_thread(self.model.generate_content, prompt)
+                    else:
+                        response = await self.model.generate_content_async(prompt)
+                response_text = response.text
+                gemini_cache.put(prompt, response_text)
             
-            return result
+            return self._build_result(response_text, video_data, category, processing_type)
             
         except Exception as e:
             print(f"❌ Erreur Gemini pour {video_data['title']}: {e}")
@@ -554,32 +1005,62 @@ Sois concis, factuel et orienté information utile."""
     
     def mark_as_processed(self, video_id: str, category: str, result: Dict):
         """Marque une vidéo comme traitée"""
-        # Charger l'historique existant
-        processed_data = {'processed_videos': []}
-        if self.processed_file.exists():
-            try:
-                with open(self.processed_file, 'r', encoding='utf-8') as f:
-                    processed_data = json.load(f)
-            except:
-                pass
-        
-        # Ajouter la nouvelle vidéo traitée
         processed_entry = {
             'video_id': video_id,
             'category': category,
             'result': result,
             'processed_at': datetime.now().isoformat()
         }
-        processed_data['processed_videos'].append(processed_entry)
         
-        # Sauvegarder
-        with open(self.processed_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_data, f, ensure_ascii=False, indent=2)
+        # Une ligne ajoutée au journal sous verrou (aucune mise à jour perdue entre workers)
+        self.processed_store.append(processed_entry)
+        # Compteurs écrits après l'historique, rattrapés depuis leur position dans celui-ci
+        with self.stats_store.transaction() as counters:
+            updated = counters_caught_up(counters, self.get_processed_videos())
+            if updated is not counters:
+                counters.clear()
+                counters.update(updated)
+        
+        # Un résultat réel devient réutilisable pour les doublons futurs
+        if category != 'skipped' and isinstance(result, dict) and result.get('title'):
+            if not self.duplicate_index.mark_processed(video_id):
+                self.duplicate_index.index_videos([{'video_id': video_id, 'title': result['title']}], processed=True)
+        
+        if category != 'skipped' and isinstance(result, dict) and result.get('summary'):
+            if len(self.similarity_index) or not self._backfill_similarity_index():
+                self.similarity_index.add(video_id, result)
+            if self.search_index.built:
+                self.search_index.upsert(video_id, category, processed_entry['processed_at'], result)
+            else:
+                # L'historique contient déjà cette entrée
+                self._backfill_search_index()
+        
+        # Le modèle apprend la nouvelle entrée; écrit au plus une fois par intervalle
+        # (les lectures du staging n'écrivent jamais)
+        self.category_model.sync(self.get_processed_videos(), list(self.categories))
+        self.category_model.save_if_due()
+    
+    def rebuild_stats(self):
+        """Reconstruit les compteurs depuis l'historique traité (migration / réparation)"""
+        counters = counters_caught_up(empty_processing_counters(), self.get_processed_videos())
+        self.stats_store.write(counters)
+        print(f"📊 Compteurs reconstruits: {counters['total']} entrées")
+    
+    def get_processing_counters(self) -> Dict:
+        """
+        Compteurs par catégorie, type de traitement et jour (lecture seule)
+        
+        Les entrées de l'historique pas encore comptées sont ajoutées en mémoire,
+        sans écrire: mark_as_processed persiste le rattrapage.
+        
+        Returns:
+            Dict: entries, total, by_category, by_processing_type, by_day
+        """
+        return counters_caught_up(self.stats_store.read(), self.get_processed_videos())
     
     def clear_staging(self):
         """Vide le staging"""
-        if self.staging_file.exists():
-            os.remove(self.staging_file)
+        self.staging_store.delete()
         print("🧹 Staging vidé")
     
     def get_categories(self) -> Dict:
@@ -588,7 +1069,8 @@ Sois concis, factuel et orienté information utile."""
     
     def get_stats(self) -> Dict:
         """Retourne des statistiques du système"""
-        processed_count = len(self._load_processed_video_ids())
+        # Une vidéo retraitée n'est comptée qu'une fois
+        processed_count = len(self._processed_index())
         staging_count = len(self.get_staging_videos())
         
         return {
@@ -616,7 +1098,8 @@ Sois concis, factuel et orienté information utile."""
                 id=video_id,
                 rating="none"  # Supprimer le like
             )
-            request.execute()
+            with external_call('youtube', 'videos.rate'):
+                request.execute()
             
             print(f"✅ Vidéo {video_id} unlikée avec succès")
             return True
@@ -626,4 +1109,85 @@ Sois concis, factuel et orienté information utile."""
             return False
         except Exception as e:
             print(f"❌ Erreur inattendue lors du unlike: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+def account_from_oauth_state(state: Optional[str]) -> str:
+    """Retrouve le compte encodé dans le paramètre state OAuth"""
+    if not state or ':' not in state:
+        return DEFAULT_ACCOUNT
+    return validate_account_id(state.rsplit(':', 1)[0])
+
+
+class YouTubeSystemRegistry:
+    """Registre des instances YouTubeLikedSystem, une par compte, avec éviction LRU"""
+
+    def __init__(self, max_instances: int = 32, idle_timeout: float = 1800, data_root: str = "youtube_data"):
+        """
+        Args:
+            max_instances: Nombre maximum d'instances gardées en mémoire
+            idle_timeout: Durée (secondes) après laquelle une instance inactive est évincée
+            data_root: Dossier racine des données de tous les comptes
+        """
+        self.max_instances = max_instances
+        self.idle_timeout = idle_timeout
+        self.data_root = data_root
+        self._instances = OrderedDict()  # account_id -> (system, last_used)
+        self._lock = threading.Lock()
+        self._creating: Dict[str, threading.Lock] = {}  # account_id -> verrou de création
+
+    def _touch(self, account_id: str) -> Optional[YouTubeLikedSystem]:
+        """Instance chargée du compte, marquée comme la plus récente (appelé sous self._lock)"""
+        entry = self._instances.get(account_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        self._instances[account_id] = (entry[0], now)
+        self._instances.move_to_end(account_id)
+        self._evict(now)
+        return entry[0]
+
+    def get(self, account_id: Optional[str] = None) -> YouTubeLikedSystem:
+        """
+        Retourne (ou crée) l'instance du compte demandé
+
+        La création (identifiants, stores) se fait hors du verrou du registre:
+        un compte lent à charger ne bloque pas les requêtes des autres comptes.
+        """
+        account_id = validate_account_id(account_id)
+        with self._lock:
+            system = self._touch(account_id)
+            if system is not None:
+                return system
+            creating = self._creating.setdefault(account_id, threading.Lock())
+        with creating:
+            with self._lock:
+                system = self._touch(account_id)
+                if system is not None:
+                    return system
+            system = YouTubeLikedSystem(account_id, data_root=self.data_root)
+            with self._lock:
+                now = time.monotonic()
+                self._instances[account_id] = (system, now)
+                self._evict(now)
+                self._creating.pop(account_id, None)
+            return system
+
+    def _evict(self, now: float):
+        """Évince les instances inactives puis les moins récemment utilisées"""
+        for account_id, (_, last_used) in list(self._instances.items()):
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._instances[account_id]
+        while len(self._instances) > self.max_instances:
+            self._instances.popitem(last=False)
+
+    def loaded_systems(self) -> List:
+        """Instances chargées [(account_id, système)], sans rafraîchir leur dernier usage"""
+        with self._lock:
+            return [(account_id, system) for account_id, (system, _) in self._instances.items()]
+    
+    def accounts(self) -> List[str]:
+        """Liste des comptes actuellement chargés (du moins au plus récent)"""
+        with self._lock:
+            return list(self._instances.keys())